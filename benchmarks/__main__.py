@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks the sync engines against an in-process fake Kong admin API, and compares the results to the stored
+baselines (see: baselines.json). Exits with status 1 when a scenario regressed.
+
+    python -m benchmarks
+    python -m benchmarks --apis 200 --plugins 5 --consumers 200 --credentials 3 --latency 0.005
+    python -m benchmarks --update-baselines
+"""
+from __future__ import unicode_literals, print_function
+import argparse
+import os
+import sys
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apis', type=int, default=20, help='The number of APIs to seed')
+    parser.add_argument('--plugins', type=int, default=3, help='The number of plugin configurations per API (max. 5)')
+    parser.add_argument('--consumers', type=int, default=20, help='The number of consumers to seed')
+    parser.add_argument('--credentials', type=int, default=3, help='The number of credentials per consumer')
+    parser.add_argument('--latency', type=float, default=0.002, help='The time (in s) every admin request takes')
+    parser.add_argument('--workers', type=int, default=1, help='The number of objects to publish concurrently')
+    parser.add_argument('--scenario', action='append', dest='scenarios', help='Only report this scenario')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='The fraction by which wall time and memory may exceed their baseline')
+    parser.add_argument('--baselines', default=None, help='The baselines file (defaults to benchmarks/baselines.json)')
+    parser.add_argument('--update-baselines', action='store_true', default=False,
+                        help='Store the results as the baselines of this profile, instead of comparing them')
+    return parser
+
+
+def main(argv=None):
+    options = get_parser().parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+
+    from django.db import connection
+    from . import baselines
+    from .runner import Benchmark
+
+    path = options.baselines or baselines.BASELINES_PATH
+    benchmark = Benchmark(
+        apis=options.apis, plugins=options.plugins, consumers=options.consumers, credentials=options.credentials,
+        latency=options.latency, workers=options.workers)
+
+    connection.creation.create_test_db(verbosity=0)
+    measurements = benchmark.run(scenarios=options.scenarios)
+
+    print('Profile: %s, latency: %.3fs' % (benchmark.profile, options.latency))
+    print('%-24s %10s %10s %10s %12s' % ('scenario', 'time (s)', 'requests', 'queries', 'memory (KiB)'))
+    for m in measurements:
+        memory = '%.1f' % (m.memory / 1024.0) if m.memory is not None else '-'
+        print('%-24s %10.3f %10d %10d %12s' % (m.scenario, m.duration, m.requests, m.queries, memory))
+
+    stored = baselines.load(path)
+    if options.update_baselines:
+        stored.setdefault(benchmark.profile, {}).update(baselines.to_baseline(measurements))
+        baselines.save(stored, path)
+        print('Stored the baselines of %s in %s' % (benchmark.profile, path))
+        return 0
+
+    if benchmark.profile not in stored:
+        print('There are no baselines for %s (see: --update-baselines)' % benchmark.profile)
+        return 0
+
+    regressions = baselines.compare(measurements, stored[benchmark.profile], tolerance=options.tolerance)
+    for regression in regressions:
+        print('REGRESSION %s' % regression, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import io
+import json
+import os
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# The counts are deterministic, so any increase is a regression. Wall time and memory vary between runs and machines,
+# they are only a regression when they exceed the baseline by more than the tolerance.
+EXACT = ('requests', 'queries')
+RELATIVE = ('duration', 'memory')
+
+# Differences in wall time below this (in s) are noise, even when they exceed the tolerance
+DURATION_SLACK = 0.05
+
+
+def load(path=BASELINES_PATH):
+    """
+    :rtype: dict
+    :return: profile: {scenario: {metric: value}} (see: runner.Benchmark.profile)
+    """
+    if not os.path.exists(path):
+        return {}
+    with io.open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(baselines, path=BASELINES_PATH):
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(baselines, sort_keys=True, indent=2, separators=(',', ': ')) + '\n')
+
+
+def to_baseline(measurements):
+    return dict((m.scenario, {
+        'duration': round(m.duration, 4), 'requests': m.requests, 'queries': m.queries, 'memory': m.memory,
+    }) for m in measurements)
+
+
+def compare(measurements, baseline, tolerance=0.5):
+    """
+    :param measurements: The measurements of a run
+    :type measurements: list
+    :param baseline: The baseline of the profile of the run (see: to_baseline)
+    :type baseline: dict
+    :param tolerance: The fraction by which wall time and memory may exceed their baseline
+    :type tolerance: float
+    :rtype: list
+    :return: A description of every regression
+    """
+    regressions = []
+    for measurement in measurements:
+        expected = baseline.get(measurement.scenario)
+        if expected is None:
+            continue
+
+        for metric in EXACT + RELATIVE:
+            value, limit = getattr(measurement, metric), expected.get(metric)
+            if value is None or limit is None:
+                continue
+            if metric in RELATIVE:
+                limit *= 1 + tolerance
+            if metric == 'duration':
+                limit += DURATION_SLACK
+            if value > limit:
+                regressions.append('%s: %s is %s, the baseline is %s' % (
+                    measurement.scenario, metric, _format(metric, value), _format(metric, expected[metric])))
+    return regressions
+
+
+def _format(metric, value):
+    if metric == 'duration':
+        return '%.3fs' % value
+    if metric == 'memory':
+        return '%.1fKiB' % (value / 1024.0)
+    return '%d' % value
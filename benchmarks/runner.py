@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import time
+from collections import namedtuple, OrderedDict
+from contextlib import closing, contextmanager
+
+import mock
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+
+from kong_admin import logic, factory, views
+from kong_admin.client import KongClientProvider
+from kong_admin.models import APIReference, ConsumerReference
+from kong_admin.sync.instrumentation import count_queries
+from kong_admin.testing.adapter import FakeKongAdapter
+
+from .seed import seed_apis, seed_consumers
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+# The outcome of a single scenario. memory is the peak of the memory allocated during the scenario (in bytes), or None
+# when it can not be measured (Python 2).
+Measurement = namedtuple('Measurement', ['scenario', 'duration', 'requests', 'queries', 'memory'])
+
+
+class Benchmark(object):
+    """
+    Runs the sync engines against a FakeKongAdmin, which answers the requests of a regular (pooled) client in process,
+    after a configurable latency. Every scenario is measured on its own: wall time, admin requests, database queries and
+    peak memory.
+
+    The scenarios run in order, and build on each other: the first synchronization publishes all objects, the second
+    one should find nothing to do, and so on.
+    """
+
+    def __init__(self, apis=20, plugins=3, consumers=20, credentials=3, latency=0.002, workers=1):
+        self.apis = apis
+        self.plugins = plugins
+        self.consumers = consumers
+        self.credentials = credentials
+        self.latency = latency
+        self.workers = workers
+
+        self.adapter = FakeKongAdapter(latency=latency)
+        self.provider = KongClientProvider('http://kong.benchmark:8001', adapter=self.adapter)
+
+    @property
+    def profile(self):
+        """
+        :rtype: six.text_type
+        :return: The parameters that determine the counts of the scenarios, which is what baselines are stored for
+        """
+        return 'apis=%d,plugins=%d,consumers=%d,credentials=%d,workers=%d' % (
+            self.apis, self.plugins, self.consumers, self.credentials, self.workers)
+
+    def get_scenarios(self):
+        """
+        :rtype: collections.OrderedDict
+        :return: name: callable, in the order in which they should run
+        """
+        # The objects are synchronized again without any change, incrementally, like 'manage.py kong_sync' does
+        return OrderedDict([
+            ('synchronize_apis', lambda client: logic.synchronize_apis(client, workers=self.workers)),
+            ('resynchronize_apis', lambda client: logic.synchronize_apis(
+                client, workers=self.workers, incremental=True)),
+            ('synchronize_consumers', lambda client: logic.synchronize_consumers(client, workers=self.workers)),
+            ('resynchronize_consumers', lambda client: logic.synchronize_consumers(
+                client, workers=self.workers, incremental=True)),
+            ('publish_api', lambda client: logic.publish_api(client, self._first(APIReference))),
+            ('withdraw_api', lambda client: logic.withdraw_api(client, self._first(APIReference))),
+            ('publish_consumer', lambda client: logic.publish_consumer(client, self._first(ConsumerReference))),
+            ('withdraw_consumer', lambda client: logic.withdraw_consumer(client, self._first(ConsumerReference))),
+            ('show_config', self.show_config),
+        ])
+
+    def run(self, scenarios=None):
+        """
+        Seeds the database and runs the scenarios
+
+        :param scenarios: The names of the scenarios to run (defaults to all). The others are still run, as later
+            scenarios depend on them, but they are not measured.
+        :type scenarios: list
+        :rtype: list
+        :return: A Measurement per scenario
+        """
+        seed_apis(self.apis, self.plugins)
+        seed_consumers(self.consumers, self.credentials)
+
+        measurements = []
+        for name, func in self.get_scenarios().items():
+            with closing(self.provider.get_client()) as client:
+                with self.measure(name) as measurement:
+                    func(client)
+            if scenarios is None or name in scenarios:
+                measurements.append(measurement[0])
+        return measurements
+
+    @contextmanager
+    def measure(self, name):
+        """
+        Measures the code in the with block
+
+        :return: A list, that contains the Measurement once the with block has finished
+        """
+        result = []
+        self.adapter.reset_counters()
+
+        if tracemalloc is not None:
+            tracemalloc.start()
+
+        try:
+            with count_queries() as queries:
+                started_at = time.time()
+                yield result
+                duration = time.time() - started_at
+        finally:
+            memory = None
+            if tracemalloc is not None:
+                memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+        result.append(Measurement(name, duration, self.adapter.requests, queries(), memory))
+
+    def show_config(self, client):
+        request = RequestFactory().get('/showconfig/')
+        request.user = User(username='benchmark', is_staff=True)
+
+        with mock.patch.object(factory, 'get_kong_client', return_value=client):
+            response = views.show_config(request)
+        assert response.status_code == 200
+
+    @staticmethod
+    def _first(model):
+        return model.objects.order_by('id').first()
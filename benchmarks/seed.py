@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+from kong_admin.enums import Plugins
+from kong_admin.models import APIReference, PluginConfigurationReference, ConsumerReference, BasicAuthReference, \
+    KeyAuthReference, OAuth2Reference
+
+# The plugins that are configured on every API, in order (a plugin can only be configured once per API)
+PLUGINS = (
+    (Plugins.RATE_LIMITING, {'second': 10}),
+    (Plugins.REQUEST_SIZE_LIMITING, {'allowed_payload_size': 128}),
+    (Plugins.CORS, {}),
+    (Plugins.IP_RESTRICTION, {'whitelist': '127.0.0.1'}),
+    (Plugins.ACL, {'whitelist': 'staff'}),
+)
+
+# The credentials that are added to every consumer, in turn
+CREDENTIALS = (BasicAuthReference, KeyAuthReference, OAuth2Reference)
+
+BATCH_SIZE = 500
+
+
+def seed_apis(count, plugins_per_api):
+    """
+    Creates count APIs with plugins_per_api plugin configurations each. Unlike the factories of the test suite, the
+    objects are inserted in bulk, so seeding thousands of objects only takes a few queries.
+
+    :rtype: list
+    :return: The APIs
+    """
+    assert plugins_per_api <= len(PLUGINS)
+
+    APIReference.objects.bulk_create([
+        APIReference(
+            name='api-%d' % i, request_host='api-%d.example.com' % i, upstream_url='http://upstream-%d.example.com' % i)
+        for i in range(count)], batch_size=BATCH_SIZE)
+
+    # SQLite does not return the primary keys of bulk inserted rows
+    apis = list(APIReference.objects.order_by('id'))
+
+    PluginConfigurationReference.objects.bulk_create([
+        PluginConfigurationReference(api=api, plugin=plugin, config=config)
+        for api in apis for plugin, config in PLUGINS[:plugins_per_api]], batch_size=BATCH_SIZE)
+
+    return apis
+
+
+def seed_consumers(count, credentials_per_consumer):
+    """
+    Creates count consumers with credentials_per_consumer credentials each (basic-auth, key-auth and oauth2 in turn),
+    in bulk.
+
+    :rtype: list
+    :return: The consumers
+    """
+    ConsumerReference.objects.bulk_create([
+        ConsumerReference(username='consumer-%d' % i) for i in range(count)], batch_size=BATCH_SIZE)
+
+    consumers = list(ConsumerReference.objects.order_by('id'))
+
+    credentials = dict((model, []) for model in CREDENTIALS)
+    for consumer in consumers:
+        for i in range(credentials_per_consumer):
+            model = CREDENTIALS[i % len(CREDENTIALS)]
+            credentials[model].append(_credential(model, consumer, i))
+
+    for model, objects in credentials.items():
+        model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+
+    return consumers
+
+
+def _credential(model, consumer, i):
+    suffix = '%d-%d' % (consumer.id, i)
+    if model is BasicAuthReference:
+        return BasicAuthReference(consumer=consumer, username='user-%s' % suffix, password='secret-%s' % suffix)
+    if model is KeyAuthReference:
+        return KeyAuthReference(consumer=consumer, key='key-%s' % suffix)
+    return OAuth2Reference(
+        consumer=consumer, name='app-%s' % suffix, redirect_uri='http://app-%s.example.com/callback' % suffix)
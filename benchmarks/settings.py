@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+from tests.settings.base import SITE_ROOT, SECRET_KEY, ALLOWED_HOSTS, INSTALLED_APPS, MIDDLEWARE_CLASSES, TEMPLATES, \
+    LANGUAGE_CODE, TIME_ZONE, USE_I18N, USE_L10N, USE_TZ, STATIC_URL, ROOT_URLCONF
+
+DEBUG = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+# Never reached, the requests are answered in process by a kong_admin.testing.adapter.FakeKongAdapter
+KONG_ADMIN_URL = 'http://kong.benchmark:8001'
+KONG_ADMIN_SIMULATOR = False
+
+# The benchmarks measure the requests of a single worker, which makes the counts deterministic
+KONG_ADMIN_SYNC_WORKERS = 1
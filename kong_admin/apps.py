@@ -10,3 +10,7 @@ class KongAdminConfig(AppConfig):
     def ready(self):
         # See: http://stackoverflow.com/a/22924754/591217
         from kong_admin import receivers
+
+        from kong_admin import metrics
+        if metrics.is_enabled():
+            metrics.connect()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from kong.client import KongAdminClient, APIAdminClient, ConsumerAdminClient, PluginAdminClient, \
+    APIPluginConfigurationAdminClient, BasicAuthAdminClient, KeyAuthAdminClient, OAuth2AdminClient
+
+from .limiter import AdminLimiter
+
+
+def get_default_pool_size():
+    return getattr(settings, 'KONG_ADMIN_HTTP_POOL_SIZE', 10)
+
+
+def get_default_idle_timeout():
+    return getattr(settings, 'KONG_ADMIN_HTTP_IDLE_TIMEOUT', 30)
+
+
+class LimitedHTTPAdapter(HTTPAdapter):
+    """
+    Sends every request through an AdminLimiter, and reports 5xx responses and transport errors to it
+    """
+
+    def __init__(self, limiter, *args, **kwargs):
+        self.limiter = limiter
+        super(LimitedHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        started_at = self.limiter.acquire()
+        overloaded = True
+        try:
+            response = super(LimitedHTTPAdapter, self).send(request, *args, **kwargs)
+            overloaded = response.status_code >= 500
+            return response
+        finally:
+            self.limiter.release(started_at, overloaded=overloaded)
+
+
+class KongClientProvider(object):
+    """
+    Provides Kong admin clients that share a single pool of keep-alive connections per process. Every thread uses its
+    own requests session, but all sessions send their requests through the same (thread-safe) connection pool.
+
+    Connections that have been idle for longer than idle_timeout seconds are dropped before they are reused, so they
+    are never closed underneath us by Kong. When the process has been forked (e.g. by a preforking server), the pool of
+    the parent process is abandoned and a new pool is created.
+
+    All requests are sent through a single AdminLimiter (see: KONG_ADMIN_RATE_LIMIT and KONG_ADMIN_CONCURRENCY_LIMIT),
+    so concurrent synchronizations in the same process share its budget.
+
+    An adapter can be passed to send the requests with instead, e.g. a kong_admin.testing.adapter.FakeKongAdapter.
+    """
+
+    def __init__(self, api_url, pool_size=None, idle_timeout=None, limiter=None, adapter=None):
+        self.api_url = api_url
+        self.pool_size = get_default_pool_size() if pool_size is None else pool_size
+        self.idle_timeout = get_default_idle_timeout() if idle_timeout is None else idle_timeout
+        self._limiter = limiter
+        self._given_adapter = adapter
+
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self.limiter = self._limiter if self._limiter is not None else AdminLimiter()
+        self._adapter = self._given_adapter if self._given_adapter is not None else LimitedHTTPAdapter(
+            self.limiter, pool_connections=1, pool_maxsize=self.pool_size)
+        self._used_at = time.time()
+
+    def get_session(self):
+        """
+        :rtype: requests.Session
+        :return: The session of the current thread
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            elif self.idle_timeout is not None and time.time() - self._used_at > self.idle_timeout:
+                self._adapter.close()
+            self._used_at = time.time()
+
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+        return session
+
+    def get_client(self):
+        """
+        :rtype: PooledKongAdminClient
+        """
+        return PooledKongAdminClient(self)
+
+    def close(self):
+        """
+        Closes all pooled connections. The provider can still be used afterwards.
+        """
+        with self._lock:
+            self._adapter.close()
+
+
+class PooledRestClientMixin(object):
+    """
+    Sends the requests of a python-kong RestClient through the connection pool of a KongClientProvider
+    """
+    provider = None
+
+    @property
+    def session(self):
+        return self.provider.get_session()
+
+
+def _pooled(client_class, provider, *args):
+    client = client_class(*args)
+    client.provider = provider
+    return client
+
+
+class PooledAPIPluginConfigurationAdminClient(PooledRestClientMixin, APIPluginConfigurationAdminClient):
+    pass
+
+
+class PooledAPIAdminClient(PooledRestClientMixin, APIAdminClient):
+    def plugins(self, name_or_id):
+        return _pooled(PooledAPIPluginConfigurationAdminClient, self.provider, self, name_or_id, self.api_url)
+
+
+class PooledBasicAuthAdminClient(PooledRestClientMixin, BasicAuthAdminClient):
+    pass
+
+
+class PooledKeyAuthAdminClient(PooledRestClientMixin, KeyAuthAdminClient):
+    pass
+
+
+class PooledOAuth2AdminClient(PooledRestClientMixin, OAuth2AdminClient):
+    pass
+
+
+class PooledConsumerAdminClient(PooledRestClientMixin, ConsumerAdminClient):
+    def basic_auth(self, username_or_id):
+        return _pooled(PooledBasicAuthAdminClient, self.provider, self, username_or_id, self.api_url)
+
+    def key_auth(self, username_or_id):
+        return _pooled(PooledKeyAuthAdminClient, self.provider, self, username_or_id, self.api_url)
+
+    def oauth2(self, username_or_id):
+        return _pooled(PooledOAuth2AdminClient, self.provider, self, username_or_id, self.api_url)
+
+
+class PooledPluginAdminClient(PooledRestClientMixin, PluginAdminClient):
+    pass
+
+
+class PooledKongAdminClient(KongAdminClient):
+    """
+    A KongAdminClient that uses the connection pool of a KongClientProvider. Closing the client does not close the
+    pooled connections, so it is cheap to create (and close) a client per operation.
+    """
+
+    def __init__(self, provider):
+        # Skips KongAdminClient.__init__, which creates clients that have a session of their own
+        super(KongAdminClient, self).__init__(
+            apis=_pooled(PooledAPIAdminClient, provider, provider.api_url),
+            consumers=_pooled(PooledConsumerAdminClient, provider, provider.api_url),
+            plugins=_pooled(PooledPluginAdminClient, provider, provider.api_url))
+        self.provider = provider
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_client_provider():
+    """
+    :rtype: KongClientProvider
+    :return: The client provider of this process, for KONG_ADMIN_URL
+    """
+    global _provider
+
+    api_url = getattr(settings, 'KONG_ADMIN_URL')
+
+    with _provider_lock:
+        if _provider is None or _provider.api_url != api_url:
+            _provider = KongClientProvider(api_url)
+        return _provider
@@ -44,3 +44,13 @@ class Plugins(enum.Enum):
         JWT: 'jwt',
         MASHAPE_ANALYTICS: 'mashape-analytics'
     }
+
+
+class OutboxActions(enum.Enum):
+    PUBLISH = 1
+    WITHDRAW = 2
+
+    labels = {
+        PUBLISH: 'publish',
+        WITHDRAW: 'withdraw'
+    }
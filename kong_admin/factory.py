@@ -2,9 +2,9 @@
 from __future__ import unicode_literals, print_function
 from django.conf import settings
 
-from kong.client import KongAdminClient
 from kong.simulator import KongAdminSimulator
 
+from .client import get_client_provider
 from .sync.apis import APISyncEngine
 from .sync.consumers import ConsumerSyncEngine
 
@@ -18,10 +18,15 @@ def get_consumer_sync_engine():
 
 
 def get_kong_client():
+    """
+    :rtype: kong.contract.KongAdminContract
+    :return: A client that shares the pooled connections of this process (see: client.KongClientProvider), or a
+        simulator when KONG_ADMIN_SIMULATOR is set
+    """
     api_url = getattr(settings, 'KONG_ADMIN_URL')
     simulator_enabled = getattr(settings, 'KONG_ADMIN_SIMULATOR')
 
     if simulator_enabled is True:
         return KongAdminSimulator(api_url)
 
-    return KongAdminClient(api_url)
+    return get_client_provider().get_client()
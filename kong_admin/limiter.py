@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_default_rate():
+    return getattr(settings, 'KONG_ADMIN_RATE_LIMIT', None)
+
+
+def get_default_burst():
+    return getattr(settings, 'KONG_ADMIN_RATE_LIMIT_BURST', None)
+
+
+def get_default_max_concurrency():
+    return getattr(settings, 'KONG_ADMIN_CONCURRENCY_LIMIT', 10)
+
+
+def get_default_latency_threshold():
+    return getattr(settings, 'KONG_ADMIN_LATENCY_THRESHOLD', 2)
+
+
+class TokenBucket(object):
+    """
+    Limits the number of requests per second, allowing bursts of up to burst requests
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = max(1, int(rate)) if burst is None else burst
+
+        self._tokens = float(self.burst)
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token from the bucket. Requests that find the bucket empty reserve a future token, so they are served in
+        the order they arrived.
+
+        :rtype: float
+        :return: The time (in s) to wait before the request can be sent
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0
+
+
+class AdminLimiter(object):
+    """
+    Limits the admin calls to Kong with a token bucket (requests per second) and an AIMD concurrency window: the number
+    of calls in flight grows by one per window of healthy responses, and is halved on a 5xx response, a timeout (or any
+    other transport error) or a response that took longer than latency_threshold seconds. This way a synchronization
+    runs as fast as Kong allows, without starving the proxy traffic that shares its datastore.
+
+    acquire and release block the calling thread, see kong_admin.sync.aio.transport.LimitedTransport for asyncio.
+    """
+
+    def __init__(self, rate=None, burst=None, max_concurrency=None, min_concurrency=1, latency_threshold=None):
+        rate = get_default_rate() if rate is None else rate
+        burst = get_default_burst() if burst is None else burst
+
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.max_concurrency = get_default_max_concurrency() if max_concurrency is None else max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_threshold = get_default_latency_threshold() if latency_threshold is None else latency_threshold
+
+        self._window = float(self.max_concurrency)
+        self._in_flight = 0
+        self._queued = 0
+        self._decreased_at = 0
+        self._condition = threading.Condition()
+
+    @property
+    def window(self):
+        return max(self.min_concurrency, int(self._window))
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def queue_depth(self):
+        return self._queued
+
+    def reserve(self):
+        """
+        :rtype: float
+        :return: The time (in s) to wait for the token bucket (see: TokenBucket.reserve)
+        """
+        return self.bucket.reserve() if self.bucket is not None else 0
+
+    def try_enter(self):
+        """
+        :rtype: bool
+        :return: Whether a call could be added to the concurrency window
+        """
+        with self._condition:
+            if self._in_flight >= self.window:
+                return False
+            self._in_flight += 1
+            return True
+
+    def enqueue(self, count=1):
+        with self._condition:
+            self._queued += count
+
+    def leave(self, started_at, overloaded=False):
+        """
+        Removes a call from the concurrency window, and adjusts the window to its outcome
+
+        :param started_at: The time the call was sent at
+        :type started_at: float
+        :param overloaded: Whether the call failed with a 5xx response or a transport error
+        :type overloaded: bool
+        """
+        latency = time.time() - started_at
+        if self.latency_threshold and latency > self.latency_threshold:
+            overloaded = True
+
+        with self._condition:
+            self._in_flight -= 1
+
+            if not overloaded:
+                self._window = min(self.max_concurrency, self._window + 1.0 / self._window)
+            elif started_at >= self._decreased_at:
+                # The calls that were already in flight when the window was halved do not halve it again
+                self._window = max(self.min_concurrency, self._window / 2)
+                self._decreased_at = time.time()
+                logger.warning('Kong admin API is overloaded (latency: %.2fs), limiting to %d concurrent calls' % (
+                    latency, self.window))
+
+            self._condition.notify_all()
+
+    def acquire(self):
+        """
+        Blocks until a call can be sent
+
+        :rtype: float
+        :return: The time the call is sent at, to pass to release
+        """
+        self.enqueue()
+        try:
+            wait = self.reserve()
+            if wait > 0:
+                time.sleep(wait)
+
+            with self._condition:
+                while not self.try_enter():
+                    self._condition.wait()
+        finally:
+            self.enqueue(-1)
+
+        return time.time()
+
+    def release(self, started_at, overloaded=False):
+        self.leave(started_at, overloaded=overloaded)
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        return {
+            'window': self.window,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'rate': self.bucket.rate if self.bucket is not None else None,
+        }
+
+    def __repr__(self):
+        return '<AdminLimiter: window=%(window)d, in_flight=%(in_flight)d, queue_depth=%(queue_depth)d, ' \
+               'rate=%(rate)s>' % self.stats()
@@ -1,23 +1,35 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, print_function
+from django.conf import settings
 
 from .factory import get_api_sync_engine, get_consumer_sync_engine
 from .models import APIReference, ConsumerReference, PluginConfigurationReference
+from .sync import writeback
+
+
+def get_default_incremental():
+    """
+    Whether 'manage.py kong_sync' only publishes the objects that changed since they were last synchronized. The other
+    synchronizations (e.g. the admin actions) always publish all objects, so changes made in Kong itself are repaired.
+    """
+    return getattr(settings, 'KONG_ADMIN_SYNC_INCREMENTAL', True)
 
 
 def publish_api(client, obj):
-    obj = get_api_sync_engine().publish(client, obj)
-    if not obj.enabled:
-        obj.enabled = True
-        APIReference.objects.filter(id=obj.id).update(enabled=obj.enabled)
+    with writeback.buffered():
+        obj = get_api_sync_engine().publish(client, obj)
+        if not obj.enabled:
+            obj.enabled = True
+            writeback.update(APIReference, obj.id, enabled=obj.enabled)
     return obj
 
 
 def withdraw_api(client, obj):
-    obj = get_api_sync_engine().withdraw(client, obj)
-    if obj.enabled:
-        obj.enabled = False
-        APIReference.objects.filter(id=obj.id).update(enabled=obj.enabled)
+    with writeback.buffered():
+        obj = get_api_sync_engine().withdraw(client, obj)
+        if obj.enabled:
+            obj.enabled = False
+            writeback.update(APIReference, obj.id, enabled=obj.enabled)
     return obj
 
 
@@ -27,8 +39,11 @@ def synchronize_api(client, obj, toggle=False):
     return publish_api(client, obj)
 
 
-def synchronize_apis(client, queryset=None):
-    return get_api_sync_engine().synchronize(client, queryset=queryset, delete=True)
+def synchronize_apis(
+        client, queryset=None, reconcile=False, workers=None, incremental=False, stream=False, continue_on_error=False):
+    return get_api_sync_engine().synchronize(
+        client, queryset=queryset, delete=True, reconcile=reconcile, workers=workers, incremental=incremental,
+        stream=stream, continue_on_error=continue_on_error)
 
 
 def publish_plugin_configuration(client, obj):
@@ -41,10 +56,11 @@ def withdraw_plugin_configuration(client, obj):
 
 def enable_plugin_configuration(client, obj, enabled=True):
     obj.enabled = enabled
-    obj = get_api_sync_engine().plugins().publish(client, obj)
+    with writeback.buffered():
+        obj = get_api_sync_engine().plugins().publish(client, obj)
 
-    # Updated enabled state without triggering another save
-    PluginConfigurationReference.objects.filter(id=obj.id).update(enabled=obj.enabled)
+        # Updated enabled state without triggering another save
+        writeback.update(PluginConfigurationReference, obj.id, enabled=obj.enabled)
 
     return obj
 
@@ -54,22 +70,27 @@ def synchronize_plugin_configuration(client, obj, toggle=False):
     return enable_plugin_configuration(client, obj, enabled=enabled)
 
 
-def synchronize_plugin_configurations(client, queryset=None):
-    return get_api_sync_engine().plugins().synchronize(client, queryset=queryset, delete=True)
+def synchronize_plugin_configurations(
+        client, queryset=None, reconcile=False, workers=None, incremental=False, stream=False, continue_on_error=False):
+    return get_api_sync_engine().plugins().synchronize(
+        client, queryset=queryset, delete=True, reconcile=reconcile, workers=workers, incremental=incremental,
+        stream=stream, continue_on_error=continue_on_error)
 
 
 def publish_consumer(client, obj):
-    obj = get_consumer_sync_engine().publish(client, obj)
-    if not obj.enabled:
-        obj.enabled = True
-        ConsumerReference.objects.filter(id=obj.id).update(enabled=obj.enabled)
+    with writeback.buffered():
+        obj = get_consumer_sync_engine().publish(client, obj)
+        if not obj.enabled:
+            obj.enabled = True
+            writeback.update(ConsumerReference, obj.id, enabled=obj.enabled)
 
 
 def withdraw_consumer(client, obj):
-    obj = get_consumer_sync_engine().withdraw(client, obj)
-    if obj.enabled:
-        obj.enabled = False
-        ConsumerReference.objects.filter(id=obj.id).update(enabled=obj.enabled)
+    with writeback.buffered():
+        obj = get_consumer_sync_engine().withdraw(client, obj)
+        if obj.enabled:
+            obj.enabled = False
+            writeback.update(ConsumerReference, obj.id, enabled=obj.enabled)
 
 
 def synchronize_consumer(client, obj, toggle=False):
@@ -78,5 +99,8 @@ def synchronize_consumer(client, obj, toggle=False):
     return publish_consumer(client, obj)
 
 
-def synchronize_consumers(client, queryset=None):
-    return get_consumer_sync_engine().synchronize(client, queryset=queryset, delete=True)
+def synchronize_consumers(
+        client, queryset=None, reconcile=False, workers=None, incremental=False, stream=False, continue_on_error=False):
+    return get_consumer_sync_engine().synchronize(
+        client, queryset=queryset, delete=True, reconcile=reconcile, workers=workers, incremental=incremental,
+        stream=stream, continue_on_error=continue_on_error)
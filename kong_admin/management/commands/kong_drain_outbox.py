@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import time
+from contextlib import closing
+
+from django.core.management.base import BaseCommand
+
+from kong_admin.factory import get_kong_client
+from kong_admin.outbox import drain
+
+
+class Command(BaseCommand):
+    help = 'Applies the pending outbox events to Kong (see: KONG_ADMIN_OUTBOX)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='The number of events per batch (defaults to KONG_ADMIN_OUTBOX_BATCH_SIZE)')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='The number of changes to apply concurrently (defaults to KONG_ADMIN_SYNC_WORKERS)')
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Keep draining, every INTERVAL seconds. By default, the outbox is drained once.')
+
+    def handle(self, *args, **options):
+        while True:
+            with closing(get_kong_client()) as client:
+                result = drain(client, batch_size=options['batch_size'], workers=options['workers'])
+
+            if result or options['interval'] is None:
+                self.stdout.write('Drained the outbox: %r' % result)
+
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from kong_admin.client import KongClientProvider, LimitedHTTPAdapter, get_default_pool_size
+from kong_admin.factory import get_kong_client, get_api_sync_engine, get_consumer_sync_engine
+from kong_admin.limiter import AdminLimiter
+from kong_admin.logic import get_default_incremental
+from kong_admin.sync import writeback
+from kong_admin.sync.plan import filter_changed
+from kong_admin.sync.session import get_session
+from kong_admin.sync.trace import RecordingAdapter
+
+# The engines per entity type, in the order they are synchronized
+ENTITIES = OrderedDict([
+    ('apis', lambda: [get_api_sync_engine()]),
+    ('plugins', lambda: [get_api_sync_engine().plugins()]),
+    ('consumers', lambda: [get_consumer_sync_engine()]),
+    ('credentials', lambda: [
+        get_consumer_sync_engine().basic_auth(), get_consumer_sync_engine().key_auth(),
+        get_consumer_sync_engine().oauth2()]),
+])
+
+# The entity types that are synchronized when none are given. The plugins and credentials are already reconciled with
+# their API or consumer when it is published (see: after_publish), synchronizing them separately is opt-in.
+DEFAULT_ENTITIES = ('apis', 'consumers')
+
+
+class Command(BaseCommand):
+    help = 'Synchronizes the local references with Kong (by default: %s)' % ', '.join(DEFAULT_ENTITIES)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'entities', nargs='*', metavar='entity',
+            help='The entity types to synchronize: %s' % ', '.join(ENTITIES.keys()))
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='The number of objects to publish concurrently (defaults to KONG_ADMIN_SYNC_WORKERS)')
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='The number of synchronized objects to write back to the database at once (defaults to '
+                 'KONG_ADMIN_SYNC_WRITE_BATCH_SIZE)')
+        parser.add_argument(
+            '--incremental', action='store_true', default=None,
+            help='Only publish the objects that changed since they were last synchronized (the default, see: '
+                 'KONG_ADMIN_SYNC_INCREMENTAL)')
+        parser.add_argument(
+            '--full', action='store_false', dest='incremental',
+            help='Publish all objects, whether they changed or not')
+        parser.add_argument(
+            '--stream', action='store_true', default=False,
+            help='Load the objects in chunks of KONG_ADMIN_SYNC_CHUNK_SIZE, for very large tables')
+        parser.add_argument(
+            '--delete-orphans', action='store_true', default=False,
+            help='Delete the remote objects that have no local reference')
+        parser.add_argument(
+            '--continue-on-error', action='store_true', default=False,
+            help='Report the objects that could not be synchronized, instead of stopping at the first one')
+        parser.add_argument(
+            '--dry-run', action='store_true', default=False,
+            help='Only show what would be synchronized')
+        parser.add_argument(
+            '--record-trace', metavar='PATH', default=None,
+            help='Record every admin call, with its response and timing, to a trace file (gzipped if it ends with '
+                 '.gz), which can be replayed by kong_admin.testing.trace.ReplayAdapter')
+
+    def handle(self, *args, **options):
+        entities = options['entities'] or list(DEFAULT_ENTITIES)
+        unknown = [entity for entity in entities if entity not in ENTITIES]
+        if unknown:
+            raise CommandError('Unknown entity type(s): %s (choose from: %s)' % (
+                ', '.join(unknown), ', '.join(ENTITIES.keys())))
+
+        incremental = get_default_incremental() if options['incremental'] is None else options['incremental']
+
+        recorder = None
+        if options['record_trace']:
+            recorder = RecordingAdapter(LimitedHTTPAdapter(AdminLimiter(), pool_maxsize=get_default_pool_size()))
+            provider = KongClientProvider(getattr(settings, 'KONG_ADMIN_URL'), adapter=recorder)
+            client = provider.get_client()
+        else:
+            client = get_kong_client()
+
+        with closing(get_session(client)) as session:
+            started_at = time.time()
+            total = 0
+
+            for entity in ENTITIES.keys():
+                if entity not in entities:
+                    continue
+
+                for engine in ENTITIES[entity]():
+                    if options['dry_run']:
+                        self.plan(session, engine, incremental, options)
+                        continue
+                    total += self.synchronize(session, engine, incremental, options)
+
+            elapsed = time.time() - started_at
+
+        if recorder is not None:
+            provider.close()
+            recorder.trace.save(options['record_trace'])
+            self.stdout.write('Recorded %d admin calls to %s' % (len(recorder.trace), options['record_trace']))
+
+        if options['dry_run']:
+            return
+
+        statistics = '%.1f objects/s' % (total / elapsed if elapsed else 0)
+        if not options['stream']:
+            statistics += ', %d remote calls' % _count_remote_calls(session)
+        self.stdout.write('Synchronized %d objects in %.2fs (%s)' % (total, elapsed, statistics))
+
+        limiter = getattr(getattr(session.client, 'provider', None), 'limiter', None)
+        if limiter is not None:
+            self.stdout.write('Kong admin limiter: %r' % limiter)
+
+    def plan(self, session, engine, incremental, options):
+        queryset = engine.get_queryset()
+        if incremental:
+            queryset = filter_changed(queryset)
+
+        plan = engine.plan(session, queryset=queryset, delete=options['delete_orphans'])
+        self.stdout.write('%s: %r' % (engine.get_proxy_class().__name__, plan))
+
+    def synchronize(self, session, engine, incremental, options):
+        started_at = time.time()
+
+        # A streaming synchronization does not memoize the remote listings (see: KongProxySyncEngine.synchronize)
+        client = session.client if options['stream'] else session
+
+        with writeback.buffered(batch_size=options['batch_size']):
+            result = engine.synchronize(
+                client, delete=options['delete_orphans'], workers=options['workers'], incremental=incremental,
+                stream=options['stream'], continue_on_error=options['continue_on_error'])
+
+        elapsed = time.time() - started_at
+        self.stdout.write('%s: %r in %.2fs (%.1f objects/s)' % (
+            engine.get_proxy_class().__name__, result, elapsed, len(result) / elapsed if elapsed else 0))
+
+        for outcome in result.errors:
+            self.stderr.write('  %s %s failed after %.2fs: %s' % (
+                engine.get_proxy_class().__name__, outcome.obj if outcome.obj is not None else outcome.kong_id,
+                outcome.duration, outcome.error))
+        return len(result)
+
+
+def _count_remote_calls(session):
+    return sum(count for name, count in session.counters.items() if not name.endswith('.cache_hit'))
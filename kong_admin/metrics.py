@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import atexit
+import bisect
+import errno
+import glob
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from six import text_type
+from django.conf import settings
+from django.db.models import Count, Min
+from django.http.response import HttpResponse
+from django.utils import timezone
+
+from .models import APIReference, PluginConfigurationReference, ConsumerReference, BasicAuthReference, \
+    KeyAuthReference, OAuth2Reference, OutboxEvent
+from .signals import sync_phase_finished, admin_call_finished
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# The upper bounds (in s) of the buckets of the latency histograms
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PROXY_MODELS = (APIReference, PluginConfigurationReference, ConsumerReference, BasicAuthReference, KeyAuthReference,
+                OAuth2Reference)
+
+# The files of KONG_ADMIN_METRICS_MULTIPROCESS_DIR: one per live process (named after its pid and a token that is unique
+# per process, so a reused pid never overwrites the file of an earlier process), and one with the samples of all
+# processes that have exited (see: flush and merge_process)
+PROCESS_FILE_PATTERN = re.compile(r'^kong_admin_(\d+)_[0-9a-f]+\.json$')
+DEAD_PROCESSES_FILE = 'kong_admin_dead.json'
+LOCK_FILE = '.kong_admin.lock'
+
+# name: (type, help)
+METRICS = {
+    'kong_admin_sync_objects_total': (
+        'counter', 'The number of objects that have been synchronized with Kong, per entity type and outcome'),
+    'kong_admin_publish_duration_seconds': (
+        'histogram', 'The time it took to publish a single object to Kong, per entity type'),
+    'kong_admin_admin_call_duration_seconds': (
+        'histogram', 'The latency of the admin calls to Kong, per operation'),
+    'kong_admin_unsynchronized_objects': (
+        'gauge', 'The number of objects that have changed since they were last synchronized, per entity type'),
+    'kong_admin_sync_lag_seconds': (
+        'gauge', 'The age of the oldest change that has not been synchronized, per entity type'),
+    'kong_admin_outbox_events': (
+        'gauge', 'The number of pending outbox events'),
+    'kong_admin_outbox_lag_seconds': (
+        'gauge', 'The age of the oldest pending outbox event'),
+}
+
+
+def is_enabled():
+    return getattr(settings, 'KONG_ADMIN_METRICS', False)
+
+
+def get_multiprocess_dir():
+    return getattr(settings, 'KONG_ADMIN_METRICS_MULTIPROCESS_DIR', None)
+
+
+def get_flush_interval():
+    return getattr(settings, 'KONG_ADMIN_METRICS_FLUSH_INTERVAL', 1)
+
+
+class Registry(object):
+    """
+    Aggregates the counters and histograms of this process. Samples are keyed by metric name and labels (a tuple of
+    (name, value) tuples). Histograms are stored as a list of cumulative bucket counts, followed by the sum and count.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.setdefault(key, [0] * (len(BUCKETS) + 2))
+            for i in range(bisect.bisect_left(BUCKETS, value), len(BUCKETS)):
+                histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def dump(self):
+        """
+        :rtype: dict
+        :return: The samples, in a JSON serializable format (see: load)
+        """
+        with self._lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    def load(self, data):
+        """
+        Adds the samples of another registry (see: dump)
+        """
+        for name, labels, value in data['counters']:
+            self.inc(name, dict(labels), value)
+
+        with self._lock:
+            for name, labels, values in data['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                histogram = self.histograms.setdefault(key, [0] * (len(BUCKETS) + 2))
+                for i, value in enumerate(values):
+                    histogram[i] += value
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+registry = Registry()
+
+_flushed_at = 0
+_flush_lock = threading.Lock()
+_process = {'pid': None, 'token': None, 'exited': False}
+
+
+def on_sync_phase(sender, event, **kwargs):
+    _check_fork()
+    if event.phase == 'publish':
+        if event.error is not None:
+            outcome = 'failed'
+        elif event.outcome == 'skipped':
+            # The object did not change since it was last published, so there was no admin call to time
+            outcome = 'skipped'
+        else:
+            outcome = 'published'
+            registry.observe('kong_admin_publish_duration_seconds', {'entity': event.entity}, event.duration)
+        registry.inc('kong_admin_sync_objects_total', {'entity': event.entity, 'outcome': outcome})
+    elif event.phase in ('withdraw', 'on_withdraw_by_id'):
+        registry.inc('kong_admin_sync_objects_total', {
+            'entity': event.entity, 'outcome': 'withdrawn' if event.error is None else 'failed'})
+    else:
+        return
+    flush()
+
+
+def on_admin_call(sender, operation, duration, error, **kwargs):
+    _check_fork()
+    registry.observe('kong_admin_admin_call_duration_seconds', {'operation': operation}, duration)
+    flush()
+
+
+def connect():
+    """
+    Starts collecting the metrics of the sync engines (see: KONG_ADMIN_METRICS)
+    """
+    sync_phase_finished.connect(on_sync_phase, dispatch_uid='kong_admin.metrics')
+    admin_call_finished.connect(on_admin_call, dispatch_uid='kong_admin.metrics')
+    if get_multiprocess_dir() is not None:
+        atexit.register(merge_process)
+
+
+def _check_fork():
+    pid = os.getpid()
+    if _process['pid'] != pid:
+        if _process['pid'] is not None:
+            # A forked child starts with a copy of the samples of its parent, which are already counted by the parent
+            registry.clear()
+        _process.update(pid=pid, token=uuid.uuid4().hex, exited=False)
+
+
+def get_process_file(directory):
+    """
+    :rtype: six.text_type
+    :return: The path of the file of this process in the multiprocess directory
+    """
+    _check_fork()
+    return os.path.join(directory, 'kong_admin_%d_%s.json' % (_process['pid'], _process['token']))
+
+
+def flush(force=False):
+    """
+    Writes the samples of this process to KONG_ADMIN_METRICS_MULTIPROCESS_DIR (if set), at most once per
+    KONG_ADMIN_METRICS_FLUSH_INTERVAL seconds. Every live process writes a file of its own, which it merges into the
+    file of the dead processes when it exits (see: merge_process). The files of all processes are aggregated by collect.
+    """
+    global _flushed_at
+
+    directory = get_multiprocess_dir()
+    if directory is None:
+        return
+
+    with _flush_lock:
+        path = get_process_file(directory)
+        if _process['exited']:
+            return
+        if not force and time.time() - _flushed_at < get_flush_interval():
+            return
+        _flushed_at = time.time()
+
+        try:
+            _write(path, registry.dump())
+        except (IOError, OSError) as e:
+            # Metrics never break a synchronization
+            logger.warning('flush: could not write to %s: %s' % (directory, e))
+
+
+def merge_process():
+    """
+    Called when this process exits (see: connect): adds its samples to the file of the dead processes, and removes its
+    own file, so the counters of the process are kept without a file per process that ever ran.
+    """
+    directory = get_multiprocess_dir()
+    if directory is None:
+        return
+
+    flush(force=True)
+
+    with _flush_lock:
+        path = get_process_file(directory)
+        _process['exited'] = True
+        try:
+            with _locked(directory):
+                _merge(directory, [path])
+        except (IOError, OSError, ValueError) as e:
+            logger.warning('merge_process: could not write to %s: %s' % (directory, e))
+
+
+def collect():
+    """
+    :rtype: Registry
+    :return: The samples of this process, or of all processes (see: flush)
+    """
+    directory = get_multiprocess_dir()
+    if directory is None:
+        return registry
+
+    flush(force=True)
+
+    result = Registry()
+    # Processes merge their file when they exit, which must not happen half-way through reading the files
+    with _locked(directory):
+        _merge_killed(directory)
+
+        for path in glob.glob(os.path.join(directory, 'kong_admin_*.json')):
+            try:
+                result.load(_read(path))
+            except (IOError, ValueError) as e:
+                logger.warning('collect: could not read %s: %s' % (path, e))
+    return result
+
+
+@contextmanager
+def _locked(directory):
+    """
+    Locks the multiprocess directory for the other processes (a no-op without fcntl)
+    """
+    if fcntl is None:
+        yield
+        return
+
+    with open(os.path.join(directory, LOCK_FILE), 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _merge(directory, paths):
+    """
+    Adds the samples of the files to the file of the dead processes, and removes them. The caller holds the lock.
+    """
+    dead = Registry()
+    dead_path = os.path.join(directory, DEAD_PROCESSES_FILE)
+    if os.path.exists(dead_path):
+        dead.load(_read(dead_path))
+
+    paths = [path for path in paths if os.path.exists(path)]
+    for path in paths:
+        dead.load(_read(path))
+
+    _write(dead_path, dead.dump())
+    for path in paths:
+        os.remove(path)
+
+
+def _merge_killed(directory):
+    """
+    Merges the files of the processes that did not get to merge their own file, e.g. because they were killed. The
+    caller holds the lock.
+    """
+    if fcntl is None:
+        # Without POSIX signals, there is no safe way to check whether a process is still alive
+        return
+
+    paths = []
+    for name in os.listdir(directory):
+        match = PROCESS_FILE_PATTERN.match(name)
+        if match is not None and not _is_alive(int(match.group(1))):
+            paths.append(os.path.join(directory, name))
+
+    if paths:
+        try:
+            _merge(directory, paths)
+        except (IOError, OSError, ValueError) as e:
+            logger.warning('collect: could not merge the files of the dead processes: %s' % e)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        # EPERM: the process exists, but belongs to another user
+        return e.errno != errno.ESRCH
+    return True
+
+
+def _read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write(path, data):
+    # Written to a temporary file first, so a scrape never reads a partial file
+    fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.kong_admin_')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f)
+    os.rename(temporary_path, path)
+
+
+def get_gauges():
+    """
+    :rtype: list
+    :return: (name, labels, value) tuples of the backlog of unsynchronized objects and pending outbox events
+    """
+    now = timezone.now()
+    gauges = []
+
+    for model in PROXY_MODELS:
+        labels = {'entity': model._meta.model_name}
+        backlog = model.objects.filter(synchronized=False).aggregate(count=Count('id'), oldest=Min('updated_at'))
+        gauges.append(('kong_admin_unsynchronized_objects', labels, backlog['count']))
+        gauges.append(('kong_admin_sync_lag_seconds', labels, _age(now, backlog['oldest'])))
+
+    outbox = OutboxEvent.objects.aggregate(count=Count('id'), oldest=Min('created_at'))
+    gauges.append(('kong_admin_outbox_events', {}, outbox['count']))
+    gauges.append(('kong_admin_outbox_lag_seconds', {}, _age(now, outbox['oldest'])))
+
+    return gauges
+
+
+def _age(now, timestamp):
+    return (now - timestamp).total_seconds() if timestamp is not None else 0
+
+
+def render(registry, gauges=()):
+    """
+    :rtype: six.text_type
+    :return: The samples, in the Prometheus text exposition format
+    """
+    # name: [(labels, lines)], so every series can be sorted by its labels, while its buckets stay in order
+    series = dict((name, []) for name in METRICS)
+
+    for (name, labels), value in registry.counters.items():
+        series[name].append((labels, [_format_sample(name, labels, value)]))
+
+    for (name, labels), values in registry.histograms.items():
+        lines = [_format_sample(name + '_bucket', labels + (('le', _format_value(float(upper_bound))),), count)
+                 for upper_bound, count in zip(BUCKETS, values)]
+        lines.append(_format_sample(name + '_bucket', labels + (('le', '+Inf'),), values[-1]))
+        lines.append(_format_sample(name + '_sum', labels, values[-2]))
+        lines.append(_format_sample(name + '_count', labels, values[-1]))
+        series[name].append((labels, lines))
+
+    for name, labels, value in gauges:
+        labels = tuple(sorted(labels.items()))
+        series[name].append((labels, [_format_sample(name, labels, value)]))
+
+    lines = []
+    for name in sorted(METRICS.keys()):
+        metric_type, description = METRICS[name]
+        lines.append('# HELP %s %s' % (name, description))
+        lines.append('# TYPE %s %s' % (name, metric_type))
+        for labels, sample_lines in sorted(series[name], key=lambda item: item[0]):
+            lines.extend(sample_lines)
+
+    return '\n'.join(lines) + '\n'
+
+
+def _format_sample(name, labels, value):
+    if labels:
+        name += '{%s}' % ','.join('%s="%s"' % (label, text_type(label_value).replace('\\', '\\\\').replace('"', '\\"'))
+                                  for label, label_value in labels)
+    return '%s %s' % (name, _format_value(value))
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else text_type(value)
+
+
+def metrics_view(request):
+    """
+    Exposes the metrics in the Prometheus text exposition format. This view does not require a login, so it can be
+    mounted on a url that is only reachable by Prometheus (see: kong_admin.views.show_metrics for a staff-only view).
+    """
+    return HttpResponse(render(collect(), get_gauges()), content_type=CONTENT_TYPE)
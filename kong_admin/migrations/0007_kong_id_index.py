@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kong_admin', '0006_auto_20150923_0818'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apireference',
+            name='kong_id',
+            field=models.UUIDField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AlterField(
+            model_name='basicauthreference',
+            name='kong_id',
+            field=models.UUIDField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AlterField(
+            model_name='consumerreference',
+            name='kong_id',
+            field=models.UUIDField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AlterField(
+            model_name='keyauthreference',
+            name='kong_id',
+            field=models.UUIDField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AlterField(
+            model_name='oauth2reference',
+            name='kong_id',
+            field=models.UUIDField(db_index=True, null=True, editable=False, blank=True),
+        ),
+        migrations.AlterField(
+            model_name='pluginconfigurationreference',
+            name='kong_id',
+            field=models.UUIDField(db_index=True, null=True, editable=False, blank=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kong_admin', '0007_kong_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='apireference',
+            index_together=set([('synchronized', 'updated_at', 'synchronized_at')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='basicauthreference',
+            index_together=set([('synchronized', 'updated_at', 'synchronized_at')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='consumerreference',
+            index_together=set([('synchronized', 'updated_at', 'synchronized_at')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='keyauthreference',
+            index_together=set([('synchronized', 'updated_at', 'synchronized_at')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='oauth2reference',
+            index_together=set([('synchronized', 'updated_at', 'synchronized_at')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='pluginconfigurationreference',
+            index_together=set([('synchronized', 'updated_at', 'synchronized_at')]),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kong_admin', '0008_sync_state_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apireference',
+            name='payload_hash',
+            field=models.CharField(max_length=64, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='basicauthreference',
+            name='payload_hash',
+            field=models.CharField(max_length=64, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='consumerreference',
+            name='payload_hash',
+            field=models.CharField(max_length=64, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='keyauthreference',
+            name='payload_hash',
+            field=models.CharField(max_length=64, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='oauth2reference',
+            name='payload_hash',
+            field=models.CharField(max_length=64, null=True, editable=False, blank=True),
+        ),
+        migrations.AddField(
+            model_name='pluginconfigurationreference',
+            name='payload_hash',
+            field=models.CharField(max_length=64, null=True, editable=False, blank=True),
+        ),
+    ]
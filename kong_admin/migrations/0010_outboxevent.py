@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kong_admin', '0009_payload_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('action', models.IntegerField(default=1)),
+                ('entity', models.CharField(max_length=64)),
+                ('object_id', models.IntegerField(null=True, blank=True)),
+                ('kong_id', models.UUIDField(null=True, blank=True)),
+                ('parent_kong_id', models.UUIDField(null=True, blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(null=True, blank=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox Event',
+                'verbose_name_plural': 'Outbox Events',
+            },
+        ),
+    ]
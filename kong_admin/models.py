@@ -8,20 +8,27 @@ from django.utils.translation import ugettext_lazy as _
 from django_enumfield import enum
 from jsonfield2 import JSONField, JSONAwareManager
 
-from .enums import Plugins
+from .enums import Plugins, OutboxActions
 from .validators import name_validator
 
 logger = logging.getLogger(__name__)
 
 
+# Supports finding the objects that have changed since they were last synchronized (see: incremental synchronization)
+SYNC_STATE_INDEX = ('synchronized', 'updated_at', 'synchronized_at')
+
+
 class KongProxyModel(models.Model):
-    kong_id = models.UUIDField(null=True, blank=True, editable=False)
+    kong_id = models.UUIDField(null=True, blank=True, editable=False, db_index=True)
 
     created_at = models.DateTimeField(_('created'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated'), auto_now=True)
     synchronized = models.BooleanField(default=False)
     synchronized_at = models.DateTimeField(_('synchronized'), null=True, blank=True, editable=False)
 
+    # A fingerprint of the payload that has last been published to Kong (see: KongProxySyncEngine.get_payload)
+    payload_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+
     class Meta:
         abstract = True
 
@@ -51,6 +58,7 @@ class APIReference(KongProxyModel):
     class Meta:
         verbose_name = _('API Reference')
         verbose_name_plural = _('API References')
+        index_together = [SYNC_STATE_INDEX]
 
     def __str__(self):
         return text_type(self.upstream_url if not self.name else '%s (%s)' % (self.name, self.upstream_url))
@@ -86,6 +94,7 @@ class PluginConfigurationReference(KongProxyModel):
         verbose_name = _('Plugin Configuration Reference')
         verbose_name_plural = _('Plugin Configuration References')
         unique_together = [('plugin', 'api')]
+        index_together = [SYNC_STATE_INDEX]
 
     def __str__(self):
         return text_type(Plugins.label(self.plugin))
@@ -103,6 +112,7 @@ class ConsumerReference(KongProxyModel):
     class Meta:
         verbose_name = _('Consumer Reference')
         verbose_name_plural = _('Consumer References')
+        index_together = [SYNC_STATE_INDEX]
 
     def __str__(self):
         return self.username or self.custom_id
@@ -128,6 +138,7 @@ class BasicAuthReference(ConsumerAuthentication):
     class Meta:
         verbose_name = _('Basic Auth Reference')
         verbose_name_plural = _('Basic Auth References')
+        index_together = [SYNC_STATE_INDEX]
 
     def __str__(self):
         return 'BasicAuthReference(consumer: %s, username: %s)' % (self.consumer, self.username)
@@ -142,6 +153,7 @@ class KeyAuthReference(ConsumerAuthentication):
     class Meta:
         verbose_name = _('Key Auth Reference')
         verbose_name_plural = _('Key Auth References')
+        index_together = [SYNC_STATE_INDEX]
 
     def __str__(self):
         key = self.key
@@ -164,6 +176,35 @@ class OAuth2Reference(ConsumerAuthentication):
     class Meta:
         verbose_name = _('OAuth2 Reference')
         verbose_name_plural = _('OAuth2 References')
+        index_together = [SYNC_STATE_INDEX]
 
     def __str__(self):
         return 'OAuth2Reference(name: %s)' % self.name
+
+
+@python_2_unicode_compatible
+class OutboxEvent(models.Model):
+    """
+    A change that still has to be propagated to Kong (see: kong_admin.outbox). Events are recorded by the receivers, in
+    the transaction of the save or delete, when KONG_ADMIN_OUTBOX is enabled.
+    """
+    action = enum.EnumField(OutboxActions, default=OutboxActions.PUBLISH)
+    # The model_name of the KongProxyModel (e.g. 'apireference')
+    entity = models.CharField(max_length=64)
+    object_id = models.IntegerField(null=True, blank=True)
+
+    # Withdrawn objects are already deleted locally, so their remote identity is recorded
+    kong_id = models.UUIDField(null=True, blank=True)
+    parent_kong_id = models.UUIDField(null=True, blank=True)
+
+    created_at = models.DateTimeField(_('created'), auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Outbox Event')
+        verbose_name_plural = _('Outbox Events')
+
+    def __str__(self):
+        return 'OutboxEvent(%s %s: %s)' % (
+            OutboxActions.label(self.action), self.entity, self.object_id if self.kong_id is None else self.kong_id)
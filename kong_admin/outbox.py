@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import closing
+
+from six import text_type
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .enums import OutboxActions
+from .factory import get_kong_client, get_api_sync_engine, get_consumer_sync_engine
+from .models import OutboxEvent
+from .sync import writeback
+from .sync.executor import execute
+from .sync.result import SyncResult
+from .sync.session import get_session
+
+logger = logging.getLogger(__name__)
+
+# The withdrawals that have been recorded by the current thread, and are waiting for the commit of their transaction
+_local = threading.local()
+
+
+def is_enabled():
+    return getattr(settings, 'KONG_ADMIN_OUTBOX', False)
+
+
+def get_default_batch_size():
+    return getattr(settings, 'KONG_ADMIN_OUTBOX_BATCH_SIZE', 500)
+
+
+def get_default_withdraw_workers():
+    return getattr(settings, 'KONG_ADMIN_WITHDRAW_WORKERS', 10)
+
+
+def get_sync_engine(entity):
+    """
+    :param entity: The model_name of a KongProxyModel
+    :type entity: six.text_type
+    :rtype: kong_admin.sync.base.KongProxySyncEngine
+    """
+    return {
+        'apireference': lambda: get_api_sync_engine(),
+        'pluginconfigurationreference': lambda: get_api_sync_engine().plugins(),
+        'consumerreference': lambda: get_consumer_sync_engine(),
+        'basicauthreference': lambda: get_consumer_sync_engine().basic_auth(),
+        'keyauthreference': lambda: get_consumer_sync_engine().key_auth(),
+        'oauth2reference': lambda: get_consumer_sync_engine().oauth2(),
+    }[entity]()
+
+
+def record_publish(obj):
+    """
+    Records that a KongProxyModel has to be (re)published. Plugin configurations and credentials are published together
+    with their parent object, so the parent object is recorded instead.
+
+    :param obj:
+    :type obj: kong_admin.models.APIReference | kong_admin.models.ConsumerReference
+    :rtype: kong_admin.models.OutboxEvent
+    """
+    return OutboxEvent.objects.create(action=OutboxActions.PUBLISH, entity=obj._meta.model_name, object_id=obj.pk)
+
+
+def record_withdraw(obj):
+    """
+    Records that a KongProxyModel, which is about to be deleted, has to be withdrawn from Kong. Objects that have never
+    been published are ignored.
+
+    :param obj:
+    :type obj: kong_admin.models.KongProxyModel
+    :rtype: kong_admin.models.OutboxEvent
+    """
+    if obj.kong_id is None:
+        return None
+
+    parent_object = get_sync_engine(obj._meta.model_name).get_parent_object(obj)
+    return OutboxEvent.objects.create(
+        action=OutboxActions.WITHDRAW, entity=obj._meta.model_name, object_id=obj.pk, kong_id=obj.kong_id,
+        parent_kong_id=parent_object.kong_id if parent_object is not None else None)
+
+
+def defer_withdraw(obj):
+    """
+    Records that a KongProxyModel, which is about to be deleted, has to be withdrawn from Kong (see: record_withdraw).
+    Unless the outbox is drained by a worker (see: KONG_ADMIN_OUTBOX), the pending withdrawals are applied as a single
+    concurrent batch once the transaction of the delete has been committed. Django < 1.9 has no commit hooks, there they
+    are applied right after the delete (see: withdraw_deleted).
+
+    :param obj:
+    :type obj: kong_admin.models.KongProxyModel
+    """
+    event = record_withdraw(obj)
+    if event is None or is_enabled():
+        return
+
+    pending = _get_pending()
+    if pending and not OutboxEvent.objects.filter(pk=pending[0].pk, created_at=pending[0].created_at).exists():
+        # The transaction (or savepoint) of these withdrawals has been rolled back, and its commit hook with it. The
+        # timestamp is compared as well, because the primary key of a rolled back row can be reused.
+        del pending[:]
+
+    if not pending:
+        hook = getattr(transaction, 'on_commit', None)
+        if hook is not None:
+            hook(_withdraw_after_commit)
+    pending.append(event)
+
+
+def withdraw_deleted():
+    """
+    Called after an object has been deleted. Django < 1.9 has no commit hooks, so the withdrawals that have been
+    recorded by the delete (including those of the objects it cascaded to) are applied right away, as a single batch.
+    Unlike after a commit, Kong is not restored when the delete is rolled back afterwards.
+    """
+    if _get_pending() and getattr(transaction, 'on_commit', None) is None:
+        _withdraw_after_commit()
+
+
+def withdraw_pending(client=None, workers=None):
+    """
+    Applies all pending withdrawals (see: drain). Withdrawals that fail remain pending, and are retried by the next call
+    (or by the drain worker).
+
+    :param client: The client to use (defaults to a new client)
+    :type client: kong.contract.KongAdminContract
+    :param workers: The number of objects to withdraw concurrently (defaults to KONG_ADMIN_WITHDRAW_WORKERS)
+    :type workers: int
+    :rtype: kong_admin.sync.result.SyncResult
+    """
+    workers = get_default_withdraw_workers() if workers is None else workers
+
+    if not OutboxEvent.objects.filter(action=OutboxActions.WITHDRAW).exists():
+        return SyncResult(keep_outcomes=False)
+
+    if client is not None:
+        return drain(client, workers=workers, action=OutboxActions.WITHDRAW)
+    with closing(get_kong_client()) as client:
+        return drain(client, workers=workers, action=OutboxActions.WITHDRAW)
+
+
+def _get_pending():
+    if not hasattr(_local, 'pending'):
+        _local.pending = []
+    return _local.pending
+
+
+def _withdraw_after_commit():
+    # The next delete schedules a hook of its own. All pending withdrawals are applied, not just the ones of this
+    # transaction, so withdrawals that failed before are retried.
+    del _get_pending()[:]
+
+    # The local objects have already been deleted, so errors are logged instead of raised. The withdrawals remain in
+    # the outbox, and are retried by the next commit (or by the drain worker).
+    try:
+        withdraw_pending()
+    except Exception as e:
+        logger.exception('Failed to withdraw the deleted objects from Kong: %s' % e)
+
+    pending = OutboxEvent.objects.filter(action=OutboxActions.WITHDRAW).count()
+    if pending:
+        logger.error('%d withdrawals remain pending in the outbox' % pending)
+
+
+def coalesce(events):
+    """
+    Reduces a batch of events to the changes that have to be made in Kong:
+
+    - An object that has been changed repeatedly is published once
+    - Objects that have been withdrawn are not published anymore
+    - Children of a withdrawn object are not withdrawn separately, Kong removes them together with their parent
+
+    :param events: The events, in the order they have been recorded
+    :type events: list
+    :rtype: tuple
+    :return: An OrderedDict of (entity, object_id): events to publish, and an OrderedDict of kong_id: events to withdraw
+    """
+    publish, withdraw = OrderedDict(), OrderedDict()
+
+    for event in events:
+        if event.action == OutboxActions.WITHDRAW:
+            withdraw.setdefault(text_type(event.kong_id), []).append(event)
+        else:
+            publish.setdefault((event.entity, event.object_id), []).append(event)
+
+    withdrawn = dict(((events[0].entity, events[0].object_id), kong_id) for kong_id, events in withdraw.items())
+    for key in list(publish.keys()):
+        if key in withdrawn:
+            # The object has been deleted, its publish events are handled by the withdrawal
+            withdraw[withdrawn[key]].extend(publish.pop(key))
+
+    for kong_id, events in list(withdraw.items()):
+        parent_kong_id = events[0].parent_kong_id
+        if parent_kong_id is not None and text_type(parent_kong_id) in withdraw:
+            withdraw[text_type(parent_kong_id)].extend(withdraw.pop(kong_id))
+
+    return publish, withdraw
+
+
+def drain(client, batch_size=None, workers=None, action=None):
+    """
+    Applies the pending outbox events to Kong, in batches of batch_size events (in the order they have been recorded).
+    Every batch is coalesced (see: coalesce), the remaining changes are applied through the sync engines, and the events
+    are removed once their change has been applied. Events of changes that failed remain pending, their number of
+    attempts and last error are recorded. Every event is handled at most once per call.
+
+    Withdrawals can safely be drained concurrently, but only a single drain of all events should run at a time.
+
+    :param client: The client to use
+    :type client: kong.contract.KongAdminContract
+    :param batch_size: The number of events per batch (defaults to KONG_ADMIN_OUTBOX_BATCH_SIZE)
+    :type batch_size: int
+    :param workers: The number of changes to apply concurrently (defaults to KONG_ADMIN_SYNC_WORKERS)
+    :type workers: int
+    :param action: Only drain the events of this action (see: enums.OutboxActions)
+    :type action: int
+    :rtype: kong_admin.sync.result.SyncResult
+    :return: A summary of the changes that have been applied
+    """
+    batch_size = get_default_batch_size() if batch_size is None else batch_size
+    client = get_session(client)
+    result = SyncResult(keep_outcomes=False)
+
+    last_pk = None
+    while True:
+        queryset = OutboxEvent.objects.order_by('pk')
+        if action is not None:
+            queryset = queryset.filter(action=action)
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+
+        events = list(queryset[:batch_size])
+        if not events:
+            break
+
+        apply_events(client, events, workers=workers, result=result)
+
+        if len(events) < batch_size:
+            break
+        last_pk = events[-1].pk
+
+    return result
+
+
+def apply_events(client, events, workers=None, result=None):
+    """
+    Applies a single batch of events (see: drain)
+
+    :param client: The client to use
+    :type client: kong.contract.KongAdminContract
+    :param events: The events, in the order they have been recorded
+    :type events: list
+    :param workers: The number of changes to apply concurrently (defaults to KONG_ADMIN_SYNC_WORKERS)
+    :type workers: int
+    :param result: The result to add the outcome of every change to
+    :type result: kong_admin.sync.result.SyncResult
+    """
+    publish, withdraw = coalesce(events)
+    done, failed = [], []
+
+    def apply(change):
+        func, events = change
+        try:
+            func()
+        except Exception as e:
+            logger.warning('apply_events: %s failed: %s' % (events[0], e))
+            failed.append((events, e))
+        else:
+            done.extend(events)
+
+    changes = []
+
+    for withdraw_events in withdraw.values():
+        changes.append((_withdraw_by_id(client, withdraw_events[0], result), withdraw_events))
+
+    for entity, object_ids in _group_by_entity(publish.keys()).items():
+        engine = get_sync_engine(entity)
+        objects = dict((obj.pk, obj) for obj in engine.get_queryset().filter(pk__in=object_ids))
+
+        for object_id in object_ids:
+            publish_events = publish[(entity, object_id)]
+            if object_id not in objects:
+                # The object has been deleted since (and withdrawn, by another event)
+                done.extend(publish_events)
+                continue
+            changes.append((_synchronize(client, engine, objects[object_id], result), publish_events))
+
+    with writeback.buffered():
+        execute(apply, changes, workers=workers)
+
+    if done:
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in done]).delete()
+
+    for failed_events, error in failed:
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in failed_events]).update(
+            attempts=F('attempts') + 1, last_error=text_type(error))
+
+
+def _group_by_entity(keys):
+    entities = OrderedDict()
+    for entity, object_id in keys:
+        entities.setdefault(entity, []).append(object_id)
+    return entities
+
+
+def _withdraw_by_id(client, event, result):
+    def withdraw():
+        get_sync_engine(event.entity).on_withdraw_by_id(
+            client, text_type(event.kong_id),
+            text_type(event.parent_kong_id) if event.parent_kong_id is not None else None)
+        if result is not None:
+            result.add(SyncResult.WITHDRAWN, kong_id=event.kong_id)
+    return withdraw
+
+
+def _synchronize(client, engine, obj, result):
+    def synchronize():
+        # Disabled objects are withdrawn, just like they are by kong_admin.logic
+        if getattr(obj, 'enabled', True):
+            action = engine._publish(client, obj)
+        elif obj.kong_id is not None:
+            engine.withdraw(client, obj)
+            action = SyncResult.WITHDRAWN
+        else:
+            action = SyncResult.SKIPPED
+
+        if result is not None:
+            result.add(action, obj=obj)
+    return synchronize
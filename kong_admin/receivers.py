@@ -1,13 +1,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, print_function
-from contextlib import closing
-
-from django.db.models.signals import pre_save, pre_delete
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch.dispatcher import receiver
 
 from .models import APIReference, ConsumerReference, BasicAuthReference, KeyAuthReference, OAuth2Reference, \
     PluginConfigurationReference
-from .factory import get_kong_client, get_api_sync_engine, get_consumer_sync_engine
+from . import outbox
 
 
 @receiver(pre_save, sender=APIReference)
@@ -15,10 +13,15 @@ def before_saving_api(sender, instance, **kwargs):
     instance.synchronized = False
 
 
+@receiver(post_save, sender=APIReference)
+def after_saving_api(sender, instance, **kwargs):
+    if outbox.is_enabled():
+        outbox.record_publish(instance)
+
+
 @receiver(pre_delete, sender=APIReference)
 def before_delete_api(sender, instance, **kwargs):
-    with closing(get_kong_client()) as client:
-        get_api_sync_engine().withdraw(client, instance)
+    outbox.defer_withdraw(instance)
 
 
 @receiver(pre_save, sender=ConsumerReference)
@@ -26,10 +29,15 @@ def before_saving_consumer(sender, instance, **kwargs):
     instance.synchronized = False
 
 
+@receiver(post_save, sender=ConsumerReference)
+def after_saving_consumer(sender, instance, **kwargs):
+    if outbox.is_enabled():
+        outbox.record_publish(instance)
+
+
 @receiver(pre_delete, sender=ConsumerReference)
 def before_delete_consumer(sender, instance, **kwargs):
-    with closing(get_kong_client()) as client:
-        get_consumer_sync_engine().withdraw(client, instance)
+    outbox.defer_withdraw(instance)
 
 
 @receiver(pre_save, sender=BasicAuthReference)
@@ -59,27 +67,63 @@ def before_saving_oauth(sender, instance, **kwargs):
     ConsumerReference.objects.filter(id=instance.consumer.id, synchronized=True).update(synchronized=False)
 
 
+@receiver(post_save, sender=BasicAuthReference)
+@receiver(post_save, sender=KeyAuthReference)
+@receiver(post_save, sender=OAuth2Reference)
+def after_saving_consumer_auth(sender, instance, **kwargs):
+    if outbox.is_enabled():
+        outbox.record_publish(instance.consumer)
+
+
+@receiver(pre_delete, sender=BasicAuthReference)
+@receiver(pre_delete, sender=KeyAuthReference)
+@receiver(pre_delete, sender=OAuth2Reference)
+def before_delete_consumer_auth(sender, instance, **kwargs):
+    outbox.defer_withdraw(instance)
+
+
 @receiver(pre_save, sender=PluginConfigurationReference)
 def before_saving_plugin_configuration(sender, instance, **kwargs):
     instance.synchronized = False
     APIReference.objects.filter(id=instance.api.id, synchronized=True).update(synchronized=False)
 
 
+@receiver(post_save, sender=PluginConfigurationReference)
+def after_saving_plugin_configuration(sender, instance, **kwargs):
+    if outbox.is_enabled():
+        outbox.record_publish(instance.api)
+
+
 @receiver(pre_delete, sender=PluginConfigurationReference)
 def before_delete_plugin_configuration(sender, instance, **kwargs):
-    with closing(get_kong_client()) as client:
-        get_api_sync_engine().plugins().withdraw(client, instance)
+    outbox.defer_withdraw(instance)
+
+
+@receiver(post_delete, sender=APIReference)
+@receiver(post_delete, sender=ConsumerReference)
+@receiver(post_delete, sender=BasicAuthReference)
+@receiver(post_delete, sender=KeyAuthReference)
+@receiver(post_delete, sender=OAuth2Reference)
+@receiver(post_delete, sender=PluginConfigurationReference)
+def after_delete(sender, instance, **kwargs):
+    """
+    Withdraws the deleted objects right away on Django < 1.9, which has no commit hooks (see: outbox.defer_withdraw)
+    """
+    outbox.withdraw_deleted()
 
 __all__ = [
     # API Reference Signals
-    'before_saving_api', 'before_delete_api',
+    'before_saving_api', 'after_saving_api', 'before_delete_api',
 
     # Consumer Reference Signals
-    'before_saving_consumer', 'before_delete_consumer',
+    'before_saving_consumer', 'after_saving_consumer', 'before_delete_consumer',
 
     # Auth Reference Signals
-    'before_saving_basic_auth', 'before_saving_key_auth', 'before_saving_oauth',
+    'before_saving_basic_auth', 'before_saving_key_auth', 'before_saving_oauth', 'after_saving_consumer_auth',
+    'before_delete_consumer_auth',
 
     # PluginConfiguration Reference Signals
-    'before_saving_plugin_configuration', 'before_delete_plugin_configuration'
+    'before_saving_plugin_configuration', 'after_saving_plugin_configuration', 'before_delete_plugin_configuration',
+
+    'after_delete'
 ]
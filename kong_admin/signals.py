@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+from django.dispatch import Signal
+
+# Sent after every phase of a sync engine (e.g. on_publish), the sender is the class of the engine. The event is a
+# kong_admin.sync.instrumentation.SyncEvent.
+sync_phase_finished = Signal(providing_args=['event'])
+
+# Sent after every admin call to Kong that is made through a kong_admin.sync.retry.ResilientClient (every attempt of a
+# retried call is sent separately), the sender is the class of the client. operation is the name of the call (e.g.
+# retrieve), duration the time it took (in s) and error the exception it raised (if any).
+admin_call_finished = Signal(providing_args=['operation', 'duration', 'error'])
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio counterparts of the synchronization engines (Python 3.5+ only).
+"""
+from __future__ import unicode_literals, print_function
+import sys
+
+if sys.version_info < (3, 5):
+    raise ImportError('kong_admin.sync.aio requires Python 3.5+ (async def)')
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+from kong.exceptions import ConflictError
+from kong_admin.models import APIReference, PluginConfigurationReference
+from kong_admin.enums import Plugins
+
+from ..apis import APISyncEngine, PluginConfigurationSyncEngine
+from .base import AsyncKongProxySyncEngine
+from .. import writeback
+
+
+class AsyncAPISyncEngine(AsyncKongProxySyncEngine):
+    def plugins(self):
+        return AsyncPluginConfigurationSyncEngine()
+
+    get_payload = APISyncEngine.get_payload
+    get_compared_fields = APISyncEngine.get_compared_fields
+
+    def get_proxy_class(self):
+        return APIReference
+
+    async def on_retrieve_all(self, client):
+        async for api_struct in client.apis.iterate():
+            yield api_struct
+
+    async def is_published(self, client, kong_id, parent_kong_id=None):
+        try:
+            result = await client.apis.retrieve(str(kong_id))
+        except ValueError:
+            return False
+        return result is not None
+
+    async def on_publish(self, client, obj):
+        fields = dict(
+            upstream_url=obj.upstream_url, name=(obj.name or None), request_host=(obj.request_host or None),
+            request_path=(obj.request_path or None), strip_request_path=obj.strip_request_path,
+            preserve_host=obj.preserve_host)
+
+        try:
+            api_struct = await client.apis.create_or_update(id=obj.kong_id, **fields)
+        except ConflictError:
+            api_struct = await client.apis.update(obj.name or obj.request_host, **fields)
+
+        name = api_struct['name']
+
+        if obj.name != name:
+            obj.name = name
+            writeback.update(self.get_proxy_class(), obj.id, name=obj.name)
+
+        return api_struct['id']
+
+    async def on_withdraw_by_id(self, client, kong_id, parent_kong_id=None):
+        await client.apis.delete(str(kong_id))
+
+    async def after_publish(self, client, obj):
+        await self.plugins().synchronize_children(client, obj, delete=True)
+        await super(AsyncAPISyncEngine, self).after_publish(client, obj)
+
+    async def before_withdraw(self, client, obj):
+        for plugin in self.plugins().get_queryset().filter(api=obj):
+            await self.plugins().withdraw(client, plugin)
+        return await super(AsyncAPISyncEngine, self).before_withdraw(client, obj)
+
+
+class AsyncPluginConfigurationSyncEngine(AsyncKongProxySyncEngine):
+    get_payload = PluginConfigurationSyncEngine.get_payload
+    get_compared_fields = PluginConfigurationSyncEngine.get_compared_fields
+    get_related_fields = PluginConfigurationSyncEngine.get_related_fields
+
+    def get_proxy_class(self):
+        return PluginConfigurationReference
+
+    async def on_retrieve_all(self, client):
+        async for api_struct in client.apis.iterate():
+            api_kong_id = api_struct.get('id', None)
+            assert api_kong_id is not None
+
+            for plugin_struct in await self.on_retrieve_children(client, api_kong_id):
+                yield plugin_struct
+
+    async def on_retrieve_children(self, client, parent_kong_id):
+        return await client.plugins(parent_kong_id).list_all()
+
+    async def is_published(self, client, kong_id, parent_kong_id=None):
+        try:
+            result = await client.plugins(parent_kong_id).retrieve(str(kong_id))
+        except ValueError:
+            return False
+        return result is not None
+
+    def get_parent_object(self, obj):
+        return obj.api
+
+    def get_parent_key(self):
+        return 'api_id'
+
+    def get_parent_field(self):
+        return 'api'
+
+    async def on_publish(self, client, obj):
+        api_kong_id = obj.api.kong_id
+        consumer_kong_id = obj.consumer.kong_id if obj.consumer is not None else None
+
+        fields = dict(('config.%s' % key, value) for key, value in obj.config.items())
+        fields.update(enabled=obj.enabled, consumer_id=consumer_kong_id)
+
+        try:
+            plugin_configuration_struct = await client.plugins(api_kong_id).create_or_update(
+                id=obj.kong_id, name=Plugins.label(obj.plugin), **fields)
+        except ConflictError:
+            plugin_configuration_struct = await client.plugins(api_kong_id).update(obj.name, **fields)
+
+        config = plugin_configuration_struct['config']
+
+        if obj.config != config:
+            obj.config = config
+            writeback.update(self.get_proxy_class(), obj.id, config=obj.config)
+
+        return plugin_configuration_struct['id']
+
+    async def on_withdraw_by_id(self, client, kong_id, parent_kong_id=None):
+        """
+        Because a PluginConfiguration always has a parent object (API), we explicitly check whether it is not None
+        """
+        assert kong_id is not None
+        assert parent_kong_id is not None
+
+        await client.plugins(parent_kong_id).delete(kong_id)
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import logging
+from abc import abstractmethod
+
+from six import text_type
+
+from ..base import BaseKongProxySyncEngine
+from ..plan import iterate_chunks
+from ..result import SyncResult
+from .executor import execute
+from .. import writeback
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncKongProxySyncEngine(BaseKongProxySyncEngine):
+    """
+    The asyncio counterpart of kong_admin.sync.base.KongProxySyncEngine. All calls to Kong are coroutines, working on a
+    kong_admin.sync.aio.client.AsyncKongAdminClient; the payloads, plans and local updates are shared with the
+    synchronous engines (see: kong_admin.sync.base.BaseKongProxySyncEngine). The database is accessed synchronously
+    from the event loop, and only outside of the calls to Kong.
+    """
+
+    @abstractmethod
+    async def on_retrieve_all(self, client):
+        """
+        Called to retrieve all objects from kong. An async generator, that yields the objects page by page.
+
+        :param client:
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :rtype: collections.AsyncIterable
+        """
+
+    @abstractmethod
+    async def is_published(self, client, kong_id, parent_kong_id=None):
+        """
+        Called to check whether an object is known at kong
+
+        :param client:
+        :param kong_id:
+        :param parent_kong_id:
+        :return:
+        """
+
+    @abstractmethod
+    async def on_publish(self, client, obj):
+        """
+        Called to publish a KongProxyModel to Kong
+
+        :param client:
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param obj:
+        :type obj: kong_admin.models.KongProxyModel
+        :rtype: uuid.UUID
+        :return: The uuid of the newly published object
+        """
+
+    @abstractmethod
+    async def on_withdraw_by_id(self, client, kong_id, parent_kong_id=None):
+        """
+        Called to withdraw an object from Kong by its 'Kong ID'
+
+        :param client:
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param kong_id:
+        :type kong_id: uuid.UUID
+        :param parent_kong_id: Optional reference to a parent object
+        :type parent_kong_id: six.text_type | uuid.UUID
+        """
+
+    async def on_withdraw(self, client, obj):
+        parent_object = self.get_parent_object(obj)
+
+        if obj.kong_id is None:
+            return obj
+
+        return await self.on_withdraw_by_id(
+            client, text_type(obj.kong_id), str(parent_object.kong_id) if parent_object is not None else None)
+
+    async def on_retrieve_children(self, client, parent_kong_id):
+        """
+        Called to retrieve all objects from kong that belong to a single parent object
+
+        :param client:
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param parent_kong_id:
+        :type parent_kong_id: six.text_type | uuid.UUID
+        :rtype: list
+        """
+        raise NotImplementedError('%s has no parent object' % self.__class__.__name__)
+
+    async def before_publish(self, client, obj):
+        parent_object = self.get_parent_object(obj)
+
+        if obj.kong_id is None:
+            return
+
+        if not await self.is_published(
+                client, obj.kong_id, parent_object.kong_id if parent_object is not None else None):
+            self.mark_unknown(obj)
+
+    async def after_publish(self, client, obj):
+        self.mark_synchronized(obj)
+
+    async def before_withdraw(self, client, obj):
+        pass
+
+    async def after_withdraw(self, client, obj):
+        self.mark_synchronized(obj, synchronized=False)
+
+    async def publish(self, client, obj, verify=True):
+        """
+        Publish a KongProxyModel to Kong (see: kong_admin.sync.base.KongProxySyncEngine.publish)
+
+        :param client:
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param obj:
+        :type obj: kong_admin.models.KongProxyModel
+        :param verify: Whether or not to check if the kong_id of the object is still known by Kong
+        :type verify: bool
+        :rtype: kong_admin.models.KongProxyModel
+        :return: The KongProxyModel that has been published to Kong
+        """
+        await self._publish(client, obj, verify=verify)
+        return obj
+
+    async def _publish(self, client, obj, verify=True):
+        """
+        Publishes a KongProxyModel to Kong (see: kong_admin.sync.base.KongProxySyncEngine._publish)
+        """
+        with writeback.buffered():
+            if verify:
+                await self.before_publish(client, obj)
+
+            if self.is_unchanged(obj):
+                # The object is known by Kong (either verified, or established by the caller) and did not change
+                logger.debug('publish: %s %s is unchanged' % (self.get_proxy_class(), obj.kong_id))
+                action = SyncResult.SKIPPED
+            else:
+                self.mark_published(obj, await self.on_publish(client, obj))
+                action = SyncResult.PUBLISHED
+
+            await self.after_publish(client, obj)
+            return action
+
+    async def withdraw(self, client, obj):
+        """
+        Withdraw a KongProxy model from Kong
+
+        :param client:
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param obj:
+        :type obj: kong_admin.models.KongProxyModel
+        :rtype: kong_admin.models.KongProxyModel
+        :return: The KongProxyModel that has been withdrawn from Kong
+        """
+        with writeback.buffered():
+            await self.before_withdraw(client, obj)
+            await self.on_withdraw(client, obj)
+            self.mark_withdrawn(obj)
+
+            await self.after_withdraw(client, obj)
+            return obj
+
+    async def withdraw_by_id(self, client, kong_id, parent_kong_id=None):
+        """
+        Withdraw an object from Kong by its 'Kong ID'
+
+        :param client:
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param kong_id: The id of the object, as it is known by Kong
+        :type kong_id: uuid.UUID
+        :rtype: kong_admin.models.KongProxyModel
+        :return: The KongProxyModel that has been withdrawn from Kong (or None)
+        """
+        obj = self.get_object_by_kong_id(kong_id)
+        if obj is not None:
+            return await self.withdraw(client, obj)
+
+        # We don't have a reference to that object anymore. Just try to remove it remotely
+        await self.on_withdraw_by_id(client, kong_id, parent_kong_id)
+        return obj
+
+    async def withdraw_orphans(self, client, orphans, concurrency=None, result=None, continue_on_error=False):
+        """
+        See: kong_admin.sync.base.KongProxySyncEngine.withdraw_orphans
+        """
+        result = result if result is not None else SyncResult(keep_outcomes=False)
+
+        async def withdraw(orphan):
+            kong_id, parent_kong_id = orphan
+            logger.debug('withdraw_orphans: delete %s by id: %s' % (self.get_proxy_class(), kong_id))
+
+            # There is no local reference to this object, so there is nothing to update locally
+            with result.track(SyncResult.WITHDRAWN, kong_id=kong_id, continue_on_error=continue_on_error):
+                await self.on_withdraw_by_id(client, kong_id, parent_kong_id)
+
+        await execute(withdraw, orphans, concurrency=concurrency)
+
+    async def retrieve_for_plan(self, client):
+        """
+        Retrieves all objects from Kong (see: on_retrieve_all), and only keeps the fields a plan reads of them: the id,
+        the reference to the parent object and the compared fields (see: kong_admin.sync.plan.build_plan)
+
+        :param client:
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :rtype: list
+        """
+        fields = set(['id', self.get_parent_key()] + list(self.get_compared_fields() or ()))
+        return [dict((field, kong_struct[field]) for field in fields if field in kong_struct)
+                async for kong_struct in self.on_retrieve_all(client)]
+
+    async def plan(self, client, queryset=None, delete=False):
+        """
+        See: kong_admin.sync.base.KongProxySyncEngine.plan
+
+        :rtype: kong_admin.sync.plan.SyncPlan
+        """
+        return self.build_plan(await self.retrieve_for_plan(client), self.get_queryset(queryset), delete=delete)
+
+    async def plan_children(self, client, parent, delete=False):
+        """
+        See: kong_admin.sync.base.KongProxySyncEngine.plan_children
+
+        :rtype: kong_admin.sync.plan.SyncPlan
+        """
+        kong_structs = await self.on_retrieve_children(client, parent.kong_id)
+        return self.build_children_plan(kong_structs, parent, self.get_children(parent), delete=delete)
+
+    async def apply(self, client, plan, concurrency=None, result=None, continue_on_error=False):
+        """
+        Executes a plan that has been computed by the plan method
+
+        :param client: The client to use
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param plan: The plan to execute
+        :type plan: kong_admin.sync.plan.SyncPlan
+        :param concurrency: The number of objects to publish or withdraw concurrently (see: executor.execute)
+        :type concurrency: int
+        :param result: The result to add the outcome of every object to
+        :type result: kong_admin.sync.result.SyncResult
+        :param continue_on_error: Whether or not to record a failed object in the result and continue with the next one
+        :type continue_on_error: bool
+        :rtype: kong_admin.sync.result.SyncResult
+        :return: The result
+        """
+        with writeback.buffered():
+            result = result if result is not None else SyncResult()
+
+            async def publish(obj):
+                with result.track(SyncResult.PUBLISHED, obj=obj, continue_on_error=continue_on_error) as outcome:
+                    outcome['action'] = await self._publish(client, obj, verify=False)
+
+            self.prepare_plan(plan)
+
+            await self.withdraw_orphans(
+                client, plan.delete, concurrency=concurrency, result=result, continue_on_error=continue_on_error)
+            await execute(publish, plan.create + plan.update, concurrency=concurrency)
+
+            for obj in plan.unchanged:
+                result.add(SyncResult.SKIPPED, obj=obj)
+
+            return result
+
+    async def synchronize(
+            self, client, queryset=None, delete=False, reconcile=False, concurrency=None, incremental=False,
+            stream=False, continue_on_error=False):
+        """
+        See: kong_admin.sync.base.KongProxySyncEngine.synchronize
+
+        :param client: The client to use
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param concurrency: The number of objects to publish concurrently (defaults to
+            KONG_ADMIN_ASYNC_SYNC_CONCURRENCY)
+        :type concurrency: int
+        :rtype: kong_admin.sync.result.SyncResult
+        :return: The outcome of every object that has been synchronized (or a summary, see: stream)
+        """
+        if stream and reconcile:
+            raise ValueError('A streaming synchronization can not be reconciled')
+
+        with writeback.buffered():
+            result = SyncResult(keep_outcomes=not stream)
+
+            queryset = self.get_objects_to_synchronize(queryset, incremental=incremental)
+
+            if reconcile:
+                plan = await self.plan(client, queryset=queryset, delete=delete)
+                logger.debug('synchronize: %r for %s' % (plan, self.get_proxy_class()))
+                return await self.apply(
+                    client, plan, concurrency=concurrency, result=result, continue_on_error=continue_on_error)
+
+            # Delete remote objects that do not exist in this database
+            if delete:
+                orphans = self.get_orphans(await self.retrieve_for_plan(client))
+                await self.withdraw_orphans(
+                    client, orphans, concurrency=concurrency, result=result, continue_on_error=continue_on_error)
+
+            # Add remote objects that only exist in this database
+            async def publish(obj):
+                with result.track(SyncResult.PUBLISHED, obj=obj, continue_on_error=continue_on_error) as outcome:
+                    outcome['action'] = await self._publish(client, obj)
+
+            await execute(publish, iterate_chunks(queryset) if stream else queryset, concurrency=concurrency)
+
+            return result
+
+    async def synchronize_children(self, client, parent, delete=False):
+        """
+        Synchronizes the KongProxyModel objects that belong to a single parent object
+
+        :param client: The client to use
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param parent: The parent object, which should already be published
+        :type parent: kong_admin.models.KongProxyModel
+        :param delete: Whether or not to delete the remote objects of the parent, if there is no model.
+        :type delete: bool
+        :rtype: kong_admin.sync.plan.SyncPlan
+        :return: The plan that has been executed
+        """
+        assert parent.kong_id is not None
+
+        plan = await self.plan_children(client, parent, delete=delete)
+        logger.debug('synchronize_children: %r for %s' % (plan, self.get_proxy_class()))
+
+        # The parent object already takes one of the concurrency slots, so the children are synchronized sequentially
+        await self.apply(client, plan, concurrency=1)
+        return plan
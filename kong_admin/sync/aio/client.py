@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+from kong.exceptions import ConflictError, ServerError
+
+from ..pagination import get_default_page_size, get_next_offset
+
+
+class AsyncCollection(object):
+    """
+    A collection of the Kong admin API (e.g. /apis/ or /consumers/<id>/basicauth/). Errors are raised the same way
+    python-kong raises them: ConflictError, ServerError or ValueError.
+    """
+
+    def __init__(self, transport, *path):
+        self.transport = transport
+        self.path = tuple(str(segment) for segment in path)
+
+    def child(self, *path):
+        return AsyncCollection(self.transport, *(self.path + path))
+
+    async def list(self, size=100, offset=None):
+        params = {'size': size}
+        if offset is not None:
+            params['offset'] = offset
+        return await self._request('GET', params=params)
+
+    async def iterate(self, page_size=None):
+        """
+        Follows the pagination cursors of Kong, and yields the objects of every page as soon as it has been retrieved
+        (see: pagination.iterate)
+        """
+        page_size = get_default_page_size() if page_size is None else page_size
+
+        offset = None
+        while True:
+            response = await self.list(size=page_size, offset=offset)
+            data = response.get('data', [])
+            for kong_struct in data:
+                yield kong_struct
+
+            offset = get_next_offset(response)
+            if offset is None or not data:
+                return
+
+    async def list_all(self, page_size=None):
+        """
+        Retrieves all objects (see: iterate)
+        """
+        return [kong_struct async for kong_struct in self.iterate(page_size=page_size)]
+
+    async def retrieve(self, name_or_id):
+        return await self._request('GET', name_or_id)
+
+    async def create_or_update(self, **data):
+        return await self._request('PUT', data=data)
+
+    async def update(self, name_or_id, **data):
+        return await self._request('PATCH', name_or_id, data=data)
+
+    async def delete(self, name_or_id):
+        status, _ = await self.transport.request('DELETE', self._path(name_or_id))
+        if status not in (204, 404):
+            raise ValueError('Could not delete %s (status: %s)' % (self._path(name_or_id), status))
+
+    async def _request(self, method, *path, params=None, data=None):
+        status, body = await self.transport.request(method, self._path(*path), params=params, data=data)
+
+        if status == 409:
+            raise ConflictError(body)
+        elif status >= 500:
+            raise ServerError(body)
+        elif status not in (200, 201):
+            raise ValueError(body)
+
+        return body
+
+    def _path(self, *path):
+        return '/%s/' % '/'.join(self.path + tuple(str(segment) for segment in path))
+
+
+class AsyncKongAdminClient(object):
+    """
+    An asyncio client for the Kong admin API, on top of an AsyncTransport
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.apis = AsyncCollection(transport, 'apis')
+        self.consumers = AsyncCollection(transport, 'consumers')
+
+    def plugins(self, api_kong_id):
+        return self.apis.child(api_kong_id, 'plugins')
+
+    def basic_auth(self, consumer_kong_id):
+        return self.consumers.child(consumer_kong_id, 'basicauth')
+
+    def key_auth(self, consumer_kong_id):
+        return self.consumers.child(consumer_kong_id, 'keyauth')
+
+    def oauth2(self, consumer_kong_id):
+        return self.consumers.child(consumer_kong_id, 'oauth2')
+
+    async def close(self):
+        await self.transport.close()
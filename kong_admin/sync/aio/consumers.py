@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import uuid
+from abc import abstractmethod
+
+from kong.exceptions import ConflictError
+from kong_admin.models import ConsumerReference, BasicAuthReference, KeyAuthReference, OAuth2Reference
+
+from ..consumers import ConsumerSyncEngine, BasicAuthSyncEngine, KeyAuthSyncEngine, OAuth2SyncEngine
+from .base import AsyncKongProxySyncEngine
+from .. import writeback
+
+
+class AsyncConsumerSyncEngine(AsyncKongProxySyncEngine):
+    def basic_auth(self):
+        return AsyncBasicAuthSyncEngine()
+
+    def key_auth(self):
+        return AsyncKeyAuthSyncEngine()
+
+    def oauth2(self):
+        return AsyncOAuth2SyncEngine()
+
+    get_payload = ConsumerSyncEngine.get_payload
+    get_compared_fields = ConsumerSyncEngine.get_compared_fields
+
+    def get_proxy_class(self):
+        return ConsumerReference
+
+    async def on_retrieve_all(self, client):
+        async for consumer_struct in client.consumers.iterate():
+            yield consumer_struct
+
+    async def is_published(self, client, kong_id, parent_kong_id=None):
+        try:
+            result = await client.consumers.retrieve(str(kong_id))
+        except ValueError:
+            return False
+        return result is not None
+
+    async def on_publish(self, client, obj):
+        """
+        :param client: The client to interface with kong with
+        :type client: kong_admin.sync.aio.client.AsyncKongAdminClient
+        :param obj: The KongProxyModel to work with
+        :type obj: kong_admin.models.ConsumerReference
+        :rtype: uuid.UUID
+        :return: The uuid of the entity that has been published
+        """
+        try:
+            consumer_struct = await client.consumers.create_or_update(
+                id=obj.kong_id, username=(obj.username or None), custom_id=(obj.custom_id or None))
+        except ConflictError:
+            consumer_struct = await client.consumers.update(
+                obj.username or obj.kong_id, username=(obj.username or None), custom_id=(obj.custom_id or None))
+        return uuid.UUID(consumer_struct['id'])
+
+    async def on_withdraw_by_id(self, client, kong_id, parent_kong_id=None):
+        await client.consumers.delete(str(kong_id))
+
+    async def after_publish(self, client, obj):
+        await self.basic_auth().synchronize_children(client, obj, delete=True)
+        await self.key_auth().synchronize_children(client, obj, delete=True)
+        await self.oauth2().synchronize_children(client, obj, delete=True)
+        await super(AsyncConsumerSyncEngine, self).after_publish(client, obj)
+
+    async def before_withdraw(self, client, obj):
+        for oauth2 in self.oauth2().get_queryset().filter(consumer=obj):
+            await self.oauth2().withdraw(client, oauth2)
+        for key_auth in self.key_auth().get_queryset().filter(consumer=obj):
+            await self.key_auth().withdraw(client, key_auth)
+        for basic_auth in self.basic_auth().get_queryset().filter(consumer=obj):
+            await self.basic_auth().withdraw(client, basic_auth)
+        return await super(AsyncConsumerSyncEngine, self).before_withdraw(client, obj)
+
+
+class AsyncConsumerAuthSyncEngine(AsyncKongProxySyncEngine):
+    @abstractmethod
+    def get_auth_client(self, client, consumer_kong_id):
+        """
+        Returns the authentication collection to use
+        """
+
+    async def on_retrieve_all(self, client):
+        async for consumer_struct in client.consumers.iterate():
+            consumer_kong_id = consumer_struct.get('id', None)
+            assert consumer_kong_id is not None
+
+            for auth_struct in await self.on_retrieve_children(client, consumer_kong_id):
+                yield auth_struct
+
+    async def on_retrieve_children(self, client, parent_kong_id):
+        return await self.get_auth_client(client, parent_kong_id).list_all()
+
+    async def is_published(self, client, kong_id, parent_kong_id=None):
+        try:
+            result = await self.get_auth_client(client, parent_kong_id).retrieve(str(kong_id))
+        except ValueError:
+            return False
+        return result is not None
+
+    def get_parent_object(self, obj):
+        return obj.consumer
+
+    def get_related_fields(self):
+        return 'consumer',
+
+    def get_parent_key(self):
+        return 'consumer_id'
+
+    def get_parent_field(self):
+        return 'consumer'
+
+    async def on_withdraw_by_id(self, client, kong_id, parent_kong_id=None):
+        assert kong_id is not None
+        assert parent_kong_id is not None
+
+        await self.get_auth_client(client, parent_kong_id).delete(kong_id)
+
+
+class AsyncBasicAuthSyncEngine(AsyncConsumerAuthSyncEngine):
+    get_payload = BasicAuthSyncEngine.get_payload
+    get_compared_fields = BasicAuthSyncEngine.get_compared_fields
+
+    def get_proxy_class(self):
+        return BasicAuthReference
+
+    def get_auth_client(self, client, consumer_kong_id):
+        return client.basic_auth(consumer_kong_id)
+
+    async def on_publish(self, client, obj):
+        auth_struct = await self.get_auth_client(client, obj.consumer.kong_id).create_or_update(
+            id=obj.kong_id, username=obj.username, password=obj.password)
+        return uuid.UUID(auth_struct['id'])
+
+
+class AsyncKeyAuthSyncEngine(AsyncConsumerAuthSyncEngine):
+    get_payload = KeyAuthSyncEngine.get_payload
+    get_compared_fields = KeyAuthSyncEngine.get_compared_fields
+
+    def get_proxy_class(self):
+        return KeyAuthReference
+
+    def get_auth_client(self, client, consumer_kong_id):
+        return client.key_auth(consumer_kong_id)
+
+    async def on_publish(self, client, obj):
+        auth_struct = await self.get_auth_client(client, obj.consumer.kong_id).create_or_update(
+            id=obj.kong_id, key=obj.key)
+        return uuid.UUID(auth_struct['id'])
+
+
+class AsyncOAuth2SyncEngine(AsyncConsumerAuthSyncEngine):
+    get_payload = OAuth2SyncEngine.get_payload
+    get_compared_fields = OAuth2SyncEngine.get_compared_fields
+
+    def get_proxy_class(self):
+        return OAuth2Reference
+
+    def get_auth_client(self, client, consumer_kong_id):
+        return client.oauth2(consumer_kong_id)
+
+    async def on_publish(self, client, obj):
+        auth_struct = await self.get_auth_client(client, obj.consumer.kong_id).create_or_update(
+            id=obj.kong_id, name=obj.name, redirect_uri=obj.redirect_uri, client_id=(obj.client_id or None),
+            client_secret=(obj.client_secret or None))
+
+        client_id = auth_struct['client_id']
+        client_secret = auth_struct['client_secret']
+
+        if obj.client_id != client_id or obj.client_secret != client_secret:
+            obj.client_id = client_id
+            obj.client_secret = client_secret
+            writeback.update(self.get_proxy_class(), obj.id, client_id=obj.client_id, client_secret=obj.client_secret)
+
+        return uuid.UUID(auth_struct['id'])
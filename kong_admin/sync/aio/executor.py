@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import asyncio
+
+from django.conf import settings
+
+from .. import writeback
+
+
+def get_default_concurrency():
+    return getattr(settings, 'KONG_ADMIN_ASYNC_SYNC_CONCURRENCY', 50)
+
+
+async def execute(func, items, concurrency=None):
+    """
+    Awaits func for every item, with at most `concurrency` items in flight at the same time. The items are consumed
+    lazily by a fixed number of worker tasks, so a large queryset is never turned into a task per object up front.
+
+    The workers share the write-back buffer of the calling task (see: writeback.buffered).
+
+    The first exception stops the execution: the other workers are cancelled and the exception is re-raised.
+
+    :param func: The coroutine function to await for every item
+    :param items: The items to process
+    :type items: collections.Iterable
+    :param concurrency: The maximum number of items to process concurrently (defaults to
+        KONG_ADMIN_ASYNC_SYNC_CONCURRENCY)
+    :type concurrency: int
+    """
+    concurrency = get_default_concurrency() if concurrency is None else concurrency
+    items = iter(items)
+
+    if concurrency <= 1:
+        for item in items:
+            await func(item)
+        return
+
+    buffer = writeback.get_buffer()
+
+    async def work():
+        # All workers share the same iterator; next() never yields to the event loop, so no item is taken twice
+        with writeback.activate(buffer):
+            for item in items:
+                await func(item)
+
+    workers = [asyncio.ensure_future(work()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import asyncio
+import time
+from abc import ABCMeta, abstractmethod
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from kong_admin.limiter import AdminLimiter
+from kong_admin.testing.fake import FakeKongAdmin
+
+
+def encode(values):
+    """
+    Form data and query strings only contain strings, and Kong expects lowercase booleans. None values are left out.
+    """
+    if values is None:
+        return None
+
+    return dict((key, str(value).lower() if isinstance(value, bool) else str(value))
+                for key, value in values.items() if value is not None)
+
+
+class AsyncTransport(metaclass=ABCMeta):
+    """
+    Sends requests to the Kong admin API
+    """
+
+    @abstractmethod
+    async def request(self, method, path, params=None, data=None):
+        """
+        :param method: The HTTP method
+        :type method: str
+        :param path: The path of the request, relative to the admin url (e.g. /apis/)
+        :type path: str
+        :param params: The query parameters
+        :type params: dict
+        :param data: The (form) data of the request
+        :type data: dict
+        :rtype: tuple
+        :return: A tuple containing the status code and the decoded response body (or None)
+        """
+
+    async def close(self):
+        pass
+
+
+class AiohttpTransport(AsyncTransport):
+    """
+    Talks to a Kong node over HTTP, using aiohttp. A single connection pool is shared by all requests; its size bounds
+    the number of admin calls that are in flight at the same time.
+    """
+
+    def __init__(self, api_url, limit=100, timeout=30):
+        if aiohttp is None:
+            raise ImportError('AiohttpTransport requires aiohttp (pip install aiohttp)')
+
+        self.api_url = api_url.rstrip('/')
+        self.limit = limit
+        self.timeout = timeout
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def request(self, method, path, params=None, data=None):
+        async with self.session.request(
+                method, self.api_url + path, params=encode(params), data=encode(data)) as response:
+            if response.status == 204:
+                return response.status, None
+            return response.status, await response.json(content_type=None)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+
+
+class FakeTransport(AsyncTransport):
+    """
+    Serves requests from an in-process FakeKongAdmin, optionally after a simulated network latency (in seconds).
+    """
+
+    def __init__(self, fake=None, latency=0):
+        self.fake = fake if fake is not None else FakeKongAdmin()
+        self.latency = latency
+        self.requests = 0
+
+    async def request(self, method, path, params=None, data=None):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.fake.handle(method, path, params=encode(params), data=encode(data))
+
+
+class LimitedTransport(AsyncTransport):
+    """
+    Sends the requests of another transport through an AdminLimiter (defaults to a limiter configured by the settings,
+    see: KONG_ADMIN_RATE_LIMIT and KONG_ADMIN_CONCURRENCY_LIMIT). Requests wait on the event loop, not in a thread.
+    """
+
+    def __init__(self, transport, limiter=None):
+        self.transport = transport
+        self.limiter = limiter if limiter is not None else AdminLimiter()
+        self._condition = None
+
+    @property
+    def condition(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def request(self, method, path, params=None, data=None):
+        self.limiter.enqueue()
+        try:
+            await asyncio.sleep(self.limiter.reserve())
+            async with self.condition:
+                await self.condition.wait_for(self.limiter.try_enter)
+        finally:
+            self.limiter.enqueue(-1)
+
+        started_at, overloaded = time.time(), True
+        try:
+            status, body = await self.transport.request(method, path, params=params, data=data)
+            overloaded = status >= 500
+            return status, body
+        finally:
+            self.limiter.leave(started_at, overloaded=overloaded)
+            async with self.condition:
+                self.condition.notify_all()
+
+    async def close(self):
+        await self.transport.close()
@@ -5,6 +5,8 @@ from kong_admin.models import APIReference, PluginConfigurationReference
 from kong_admin.enums import Plugins
 
 from .base import KongProxySyncEngine
+from .pagination import iterate
+from . import writeback
 
 
 class APISyncEngine(KongProxySyncEngine):
@@ -15,9 +17,7 @@ class APISyncEngine(KongProxySyncEngine):
         return APIReference
 
     def on_retrieve_all(self, client):
-        apis = list(client.apis.iterate())
-        for api_struct in apis:
-            yield api_struct
+        return iterate(client.apis)
 
     def is_published(self, client, kong_id, parent_kong_id=None):
         try:
@@ -26,6 +26,19 @@ class APISyncEngine(KongProxySyncEngine):
             return False
         return result is not None
 
+    def get_payload(self, obj):
+        return {
+            'upstream_url': obj.upstream_url,
+            'name': obj.name or None,
+            'request_host': obj.request_host or None,
+            'request_path': obj.request_path or None,
+            'strip_request_path': obj.strip_request_path,
+            'preserve_host': obj.preserve_host
+        }
+
+    def get_compared_fields(self):
+        return 'upstream_url', 'name', 'request_host', 'request_path', 'strip_request_path', 'preserve_host'
+
     def on_publish(self, client, obj):
         try:
             api_struct = client.apis.create_or_update(
@@ -42,7 +55,7 @@ class APISyncEngine(KongProxySyncEngine):
 
         if obj.name != name:
             obj.name = name
-            self.get_proxy_class().objects.filter(id=obj.id).update(name=obj.name)
+            writeback.update(self.get_proxy_class(), obj.id, name=obj.name)
 
         return api_struct['id']
 
@@ -50,11 +63,11 @@ class APISyncEngine(KongProxySyncEngine):
         client.apis.delete(str(kong_id))
 
     def after_publish(self, client, obj):
-        self.plugins().synchronize(client, PluginConfigurationReference.objects.filter(api=obj), delete=True)
+        self.plugins().synchronize_children(client, obj, delete=True)
         super(APISyncEngine, self).after_publish(client, obj)
 
     def before_withdraw(self, client, obj):
-        for plugin in PluginConfigurationReference.objects.filter(api=obj):
+        for plugin in self.plugins().get_queryset().filter(api=obj):
             self.plugins().withdraw(client, plugin)
         return super(APISyncEngine, self).before_withdraw(client, obj)
 
@@ -64,16 +77,16 @@ class PluginConfigurationSyncEngine(KongProxySyncEngine):
         return PluginConfigurationReference
 
     def on_retrieve_all(self, client):
-        apis = list(client.apis.iterate())
-        for api_struct in apis:
+        for api_struct in iterate(client.apis):
             api_kong_id = api_struct.get('id', None)
             assert api_kong_id is not None
 
-            plugin_configurations = client.apis.plugins(api_kong_id).list(size=100).get('data', None)
-            assert plugin_configurations is not None
-            for plugin_configuration_struct in plugin_configurations:
+            for plugin_configuration_struct in self.on_retrieve_children(client, api_kong_id):
                 yield plugin_configuration_struct
 
+    def on_retrieve_children(self, client, parent_kong_id):
+        return iterate(client.apis.plugins(str(parent_kong_id)))
+
     def is_published(self, client, kong_id, parent_kong_id=None):
         try:
             result = client.apis.plugins(str(parent_kong_id)).retrieve(str(kong_id))
@@ -84,9 +97,28 @@ class PluginConfigurationSyncEngine(KongProxySyncEngine):
     def get_parent_object(self, obj):
         return obj.api
 
+    def get_related_fields(self):
+        return 'api', 'consumer'
+
     def get_parent_key(self):
         return 'api_id'
 
+    def get_parent_field(self):
+        return 'api'
+
+    def get_payload(self, obj):
+        return {
+            'api_id': obj.api.kong_id,
+            'consumer_id': obj.consumer.kong_id if obj.consumer is not None else None,
+            'name': Plugins.label(obj.plugin),
+            'enabled': obj.enabled,
+            'config': obj.config
+        }
+
+    def get_compared_fields(self):
+        # Kong adds the default values to the config, which on_publish writes back to the local object
+        return 'api_id', 'consumer_id', 'name', 'enabled', 'config'
+
     def on_publish(self, client, obj):
         api_kong_id = obj.api.kong_id
         consumer_kong_id = obj.consumer.kong_id if obj.consumer is not None else None
@@ -103,7 +135,7 @@ class PluginConfigurationSyncEngine(KongProxySyncEngine):
 
         if obj.config != config:
             obj.config = config
-            self.get_proxy_class().objects.filter(id=obj.id).update(config=obj.config)
+            writeback.update(self.get_proxy_class(), obj.id, config=obj.config)
 
         return plugin_configuration_struct['id']
 
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, print_function
+import hashlib
+import json
 import logging
 from six import text_type
 
@@ -9,16 +11,274 @@ from django.utils import timezone
 from six import with_metaclass
 from abc import ABCMeta, abstractmethod
 
+from .executor import execute
+from .instrumentation import instrument
+from .plan import build_plan, load_kong_ids, filter_changed, iterate_chunks
+from .result import SyncResult
+from .retry import with_retries
+from .session import get_session
+from . import writeback
+
 logger = logging.getLogger(__name__)
 
 
-class KongProxySyncEngine(with_metaclass(ABCMeta, object)):
+def get_payload_hash(payload):
+    """
+    Returns a canonical fingerprint of a payload: the keys of (nested) dicts are sorted, and values that are not
+    natively supported by json (e.g. uuid.UUID) are converted to text.
+
+    :param payload: The payload, or None
+    :type payload: dict
+    :rtype: six.text_type
+    """
+    if payload is None:
+        return None
+
+    serialized = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=text_type)
+    return text_type(hashlib.sha256(serialized.encode('utf-8')).hexdigest())
+
+
+class BaseKongProxySyncEngine(with_metaclass(ABCMeta, object)):
+    """
+    The part of a sync engine that does not talk to Kong: the payload and the relations of the local objects, the plans
+    and the local updates. It is shared by KongProxySyncEngine and its asyncio counterpart (see: kong_admin.sync.aio),
+    which only differ in how they call Kong.
+    """
+
     @abstractmethod
     def get_proxy_class(self):
         """
         :return: Returns the actual class of the KongProxyModel were working with
         """
 
+    def get_payload(self, obj):
+        """
+        Returns the values that on_publish sends to Kong for an object. When the fingerprint of these values has not
+        changed since the object was last published, and the object is still known by Kong, publishing it again is
+        skipped (see: publish). Returns None if the payload is unknown, in which case the object is always published.
+
+        :param obj:
+        :type obj: kong_admin.models.KongProxyModel
+        :rtype: dict
+        """
+
+    def get_compared_fields(self):
+        """
+        Returns the fields of the payload (see: get_payload) that Kong returns as they were published. A plan compares
+        them with the remote objects, so synchronized objects that have been changed in Kong are published again (see:
+        build_plan). Returns None if the remote objects can not be compared.
+
+        :rtype: tuple
+        """
+        return None
+
+    def get_fingerprint(self, values):
+        """
+        Returns the fingerprint of the compared fields (see: get_compared_fields) of a payload or a remote object
+
+        :param values: A payload or a remote object
+        :type values: dict
+        :rtype: six.text_type
+        """
+        fields = self.get_compared_fields()
+        if fields is None or values is None:
+            return None
+        return get_payload_hash(dict((field, values.get(field)) for field in fields))
+
+    def get_related_fields(self):
+        """
+        Returns the names of the relations that are read while publishing or withdrawing an object (e.g. by
+        get_parent_object, get_payload and on_publish). They are always fetched together with the objects (see:
+        get_queryset), so no query is needed per object.
+
+        :rtype: tuple
+        """
+        return ()
+
+    def get_queryset(self, queryset=None):
+        """
+        Returns a queryset of KongProxyModel objects that fetches the related fields eagerly
+
+        :param queryset: The queryset to start from (defaults to all objects)
+        :type queryset: django.db.models.QuerySet
+        :rtype: django.db.models.QuerySet
+        """
+        if queryset is None:
+            queryset = self.get_proxy_class().objects.all()
+
+        related_fields = self.get_related_fields()
+        return queryset.select_related(*related_fields) if related_fields else queryset
+
+    def get_parent_object(self, obj):
+        """
+        Returns a parent object for a given object
+
+        :param obj:
+        :return:
+        """
+
+    def get_parent_key(self):
+        """
+        Returns the key that references the parent object
+        :return:
+        """
+
+    def get_parent_field(self):
+        """
+        Returns the name of the model field that references the parent object
+        :return:
+        """
+
+    def get_object_by_kong_id(self, kong_id):
+        """
+        :rtype: kong_admin.models.KongProxyModel
+        :return: The local object that is known by Kong as kong_id (or None)
+        """
+        try:
+            return self.get_queryset().get(kong_id=kong_id)
+        except self.get_proxy_class().DoesNotExist:
+            return None
+
+    def get_objects_to_synchronize(self, queryset=None, incremental=False):
+        """
+        :param queryset: A queryset containing KongProxyModel objects (defaults to all objects)
+        :type queryset: django.db.models.QuerySet
+        :param incremental: Whether or not to only return the objects that have changed since they were last
+            synchronized (see: plan.filter_changed)
+        :type incremental: bool
+        :rtype: django.db.models.QuerySet
+        """
+        queryset = self.get_queryset(queryset)
+        return filter_changed(queryset) if incremental else queryset
+
+    def get_children(self, parent):
+        """
+        :param parent: The parent object
+        :type parent: kong_admin.models.KongProxyModel
+        :rtype: list
+        :return: The objects that belong to the parent object
+        """
+        parent_field = self.get_parent_field()
+        objects = list(self.get_queryset().filter(**{parent_field: parent}))
+
+        # Share the (in memory) parent object, it might have changed during this synchronization
+        for obj in objects:
+            setattr(obj, parent_field, parent)
+        return objects
+
+    def build_plan(self, kong_structs, queryset, delete=False):
+        """
+        Compares the remote objects with the local objects (see: plan)
+
+        :param kong_structs: The remote objects
+        :type kong_structs: collections.Iterable
+        :param queryset: A queryset containing KongProxyModel objects
+        :type queryset: django.db.models.QuerySet
+        :param delete: Whether or not to plan the deletion of remote objects that have no local counterpart
+        :type delete: bool
+        :rtype: kong_admin.sync.plan.SyncPlan
+        """
+        local_kong_ids = load_kong_ids(self.get_proxy_class().objects.all()) if delete else None
+        return build_plan(
+            kong_structs, queryset, local_kong_ids, parent_key=self.get_parent_key(), **self._get_fingerprints())
+
+    def build_children_plan(self, kong_structs, parent, objects, delete=False):
+        """
+        Compares the remote objects of a single parent object with its local objects (see: plan_children)
+
+        :param kong_structs: The remote objects of the parent object
+        :type kong_structs: collections.Iterable
+        :param parent: The parent object
+        :type parent: kong_admin.models.KongProxyModel
+        :param objects: The local objects of the parent object (see: get_children)
+        :type objects: list
+        :param delete: Whether or not to plan the deletion of remote objects (of this parent) that have no local
+            counterpart
+        :type delete: bool
+        :rtype: kong_admin.sync.plan.SyncPlan
+        """
+        local_kong_ids = None
+        if delete:
+            local_kong_ids = set(text_type(obj.kong_id) for obj in objects if obj.kong_id is not None)
+
+        return build_plan(
+            kong_structs, objects, local_kong_ids, parent_key=self.get_parent_key(),
+            parent_kong_id=text_type(parent.kong_id), **self._get_fingerprints())
+
+    def _get_fingerprints(self):
+        if self.get_compared_fields() is None:
+            return {}
+        return {
+            'remote_fingerprint': self.get_fingerprint,
+            'local_fingerprint': lambda obj: self.get_fingerprint(self.get_payload(obj)),
+        }
+
+    def get_orphans(self, kong_structs):
+        """
+        :param kong_structs: The remote objects
+        :type kong_structs: collections.Iterable
+        :rtype: list
+        :return: (kong_id, parent_kong_id) tuples of the remote objects that have no local counterpart
+        """
+        # Only the kong_ids are compared, so there is no need for fingerprints
+        local_kong_ids = load_kong_ids(self.get_proxy_class().objects.all())
+        return build_plan(kong_structs, [], local_kong_ids, parent_key=self.get_parent_key()).delete
+
+    def prepare_plan(self, plan):
+        """
+        Called before a plan is applied (see: apply)
+        """
+        # Kong doesn't know these kong_ids (anymore), publishing will create new objects
+        for obj in plan.create:
+            obj.kong_id = None
+
+    def is_unchanged(self, obj):
+        """
+        :rtype: bool
+        :return: Whether the object is known by Kong, and did not change since it was last published (see:
+            get_payload)
+        """
+        return obj.kong_id is not None and obj.payload_hash is not None and \
+            obj.payload_hash == get_payload_hash(self.get_payload(obj))
+
+    def mark_unknown(self, obj):
+        """
+        Records that Kong does not know the kong_id of an object (anymore)
+        """
+        obj.kong_id = None
+        writeback.update(self.get_proxy_class(), obj.id, kong_id=obj.kong_id)
+
+    def mark_published(self, obj, kong_id):
+        """
+        Records the kong_id and the payload of an object that has been published
+        """
+        # Always update the kong_id. on_publish may have updated the object with the values of Kong
+        obj.kong_id = kong_id
+        obj.payload_hash = get_payload_hash(self.get_payload(obj))
+        writeback.update(self.get_proxy_class(), obj.id, kong_id=obj.kong_id, payload_hash=obj.payload_hash)
+
+    def mark_withdrawn(self, obj):
+        """
+        Records that an object has been withdrawn
+        """
+        # Always update the kong_id
+        obj.kong_id = None
+        obj.payload_hash = None
+        writeback.update(self.get_proxy_class(), obj.id, kong_id=obj.kong_id, payload_hash=obj.payload_hash)
+
+    def mark_synchronized(self, obj, synchronized=True):
+        """
+        Records that an object has been published (or withdrawn, when synchronized is False)
+        """
+        obj.synchronized_at = timezone.now() if synchronized else None
+        obj.synchronized = synchronized
+
+        # Doing this instead of saving will prevent the save signal from being send out!!!
+        writeback.update(
+            self.get_proxy_class(), obj.id, synchronized=obj.synchronized, synchronized_at=obj.synchronized_at)
+
+
+class KongProxySyncEngine(BaseKongProxySyncEngine):
     @abstractmethod
     def on_retrieve_all(self, client):
         """
@@ -90,43 +350,47 @@ class KongProxySyncEngine(with_metaclass(ABCMeta, object)):
             return
 
         if not self.is_published(client, obj.kong_id, parent_object.kong_id if parent_object is not None else None):
-            obj.kong_id = None
-            self.get_proxy_class().objects.filter(id=obj.id).update(kong_id=obj.kong_id)
+            self.mark_unknown(obj)
 
     def after_publish(self, client, obj):
-        obj.synchronized_at = timezone.now()
-        obj.synchronized = True
-
-        # Doing this instead of saving will prevent the save signal from being send out!!!
-        self.get_proxy_class().objects.filter(id=obj.id).update(
-            synchronized=obj.synchronized, synchronized_at=obj.synchronized_at)
+        self.mark_synchronized(obj)
 
     def before_withdraw(self, client, obj):
         pass
 
     def after_withdraw(self, client, obj):
-        obj.synchronized_at = None
-        obj.synchronized = False
+        self.mark_synchronized(obj, synchronized=False)
 
-        # Doing this instead of saving will prevent the save signal from being send out!!!
-        self.get_proxy_class().objects.filter(id=obj.id).update(
-            synchronized=obj.synchronized, synchronized_at=obj.synchronized_at)
+    def on_retrieve_children(self, client, parent_kong_id):
+        """
+        Called to retrieve all objects from kong that belong to a single parent object
 
-    def get_parent_object(self, obj):
+        :param client:
+        :type client: kong.contract.KongAdminContract
+        :param parent_kong_id:
+        :type parent_kong_id: six.text_type | uuid.UUID
+        :return: collections.Iterable
         """
-        Returns a parent object for a given object
+        raise NotImplementedError('%s has no parent object' % self.__class__.__name__)
 
-        :param obj:
-        :return:
+    def retrieve_all(self, client):
+        """
+        Iterates over on_retrieve_all, as an instrumented phase (see: instrumentation.instrument). The phase lasts until
+        the listing has been consumed, so the remote objects are still retrieved lazily.
         """
+        with instrument('on_retrieve_all', self):
+            for kong_struct in self.on_retrieve_all(client):
+                yield kong_struct
 
-    def get_parent_key(self):
+    def retrieve_children(self, client, parent):
         """
-        Returns the key that references the parent object
-        :return:
+        Iterates over on_retrieve_children, as an instrumented phase of the parent object (see: retrieve_all)
         """
+        with instrument('on_retrieve_children', self, parent):
+            for kong_struct in self.on_retrieve_children(client, parent.kong_id):
+                yield kong_struct
 
-    def publish(self, client, obj):
+    def publish(self, client, obj, verify=True):
         """
         Publish a KongProxyModel to Kong
 
@@ -134,22 +398,43 @@ class KongProxySyncEngine(with_metaclass(ABCMeta, object)):
         :type client: kong.contract.KongAdminContract
         :param obj:
         :type obj: kong_admin.models.KongProxyModel
+        :param verify: Whether or not to check if the kong_id of the object is still known by Kong. This can be skipped
+            when the caller already knows the remote state (see: plan)
+        :type verify: bool
         :rtype: kong_admin.models.KongProxyModel
         :return: The KongProxyModel that has been published to Kong
         """
-        with transaction.atomic():
-            self.before_publish(client, obj)
-
-        kong_id = self.on_publish(client, obj)
-
-        # Always update the kong_id
-        obj.kong_id = kong_id
-        self.get_proxy_class().objects.filter(id=obj.id).update(kong_id=obj.kong_id)
+        self._publish(client, obj, verify=verify)
+        return obj
 
-        with transaction.atomic():
-            self.after_publish(client, obj)
+    def _publish(self, client, obj, verify=True):
+        """
+        Publishes a KongProxyModel to Kong (see: publish)
 
-        return obj
+        :rtype: six.text_type
+        :return: SyncResult.SKIPPED when the object is unchanged and was not written to Kong, SyncResult.PUBLISHED
+            otherwise
+        """
+        with writeback.buffered(), instrument('publish', self, obj) as details:
+            if verify:
+                with instrument('before_publish', self, obj), transaction.atomic():
+                    self.before_publish(client, obj)
+
+            if self.is_unchanged(obj):
+                # The object is known by Kong (either verified, or established by the caller) and did not change
+                logger.debug('publish: %s %s is unchanged' % (self.get_proxy_class(), obj.kong_id))
+                details['outcome'] = 'skipped'
+                action = SyncResult.SKIPPED
+            else:
+                with instrument('on_publish', self, obj):
+                    kong_id = self.on_publish(client, obj)
+                self.mark_published(obj, kong_id)
+                action = SyncResult.PUBLISHED
+
+            with instrument('after_publish', self, obj), transaction.atomic():
+                self.after_publish(client, obj)
+
+            return action
 
     def withdraw(self, client, obj):
         """
@@ -162,19 +447,18 @@ class KongProxySyncEngine(with_metaclass(ABCMeta, object)):
         :rtype: kong_admin.models.KongProxyModel
         :return: The KongProxyModel that has been withdrawn from Kong
         """
-        with transaction.atomic():
-            self.before_withdraw(client, obj)
+        with writeback.buffered(), instrument('withdraw', self, obj):
+            with instrument('before_withdraw', self, obj), transaction.atomic():
+                self.before_withdraw(client, obj)
 
-        self.on_withdraw(client, obj)
+            with instrument('on_withdraw', self, obj):
+                self.on_withdraw(client, obj)
+            self.mark_withdrawn(obj)
 
-        # Always update the kong_id
-        obj.kong_id = None
-        self.get_proxy_class().objects.filter(id=obj.id).update(kong_id=obj.kong_id)
-
-        with transaction.atomic():
-            self.after_withdraw(client, obj)
+            with instrument('after_withdraw', self, obj), transaction.atomic():
+                self.after_withdraw(client, obj)
 
-        return obj
+            return obj
 
     def withdraw_by_id(self, client, kong_id, parent_kong_id=None):
         """
@@ -187,45 +471,194 @@ class KongProxySyncEngine(with_metaclass(ABCMeta, object)):
         :rtype: kong_admin.models.KongProxyModel
         :return: The kong_id of the object that has been withdrawn from Kong
         """
-        try:
-            obj = self.get_proxy_class().objects.get(kong_id=kong_id)
-        except self.get_proxy_class().DoesNotExist:
-            obj = None
-
+        obj = self.get_object_by_kong_id(kong_id)
         if obj is not None:
             return self.withdraw(client, obj)
 
         # We don't have a reference to that API anymore. Just try to remove it remotely
-        self.on_withdraw_by_id(client, kong_id, parent_kong_id)
+        with instrument('on_withdraw_by_id', self):
+            self.on_withdraw_by_id(client, kong_id, parent_kong_id)
         return obj
 
-    def synchronize(self, client, queryset=None, delete=False):
+    def withdraw_orphans(self, client, orphans, workers=None, result=None, continue_on_error=False):
         """
+        Withdraws remote objects that are known to have no local counterpart, as a single batch
+
         :param client: The client to use
         :type client: kong.contract.KongAdminContract
+        :param orphans: (kong_id, parent_kong_id) tuples of the remote objects (see: SyncPlan.delete)
+        :type orphans: collections.Iterable
+        :param workers: The number of objects to withdraw concurrently (see: executor.execute)
+        :type workers: int
+        :param result: The result to add the outcome of every object to
+        :type result: kong_admin.sync.result.SyncResult
+        :param continue_on_error: Whether or not to record a failed object in the result and continue with the next one
+        :type continue_on_error: bool
+        """
+        result = result if result is not None else SyncResult(keep_outcomes=False)
+
+        def withdraw(orphan):
+            kong_id, parent_kong_id = orphan
+            logger.debug('withdraw_orphans: delete %s by id: %s' % (self.get_proxy_class(), kong_id))
+
+            # There is no local reference to this object, so there is nothing to update locally
+            with result.track(SyncResult.WITHDRAWN, kong_id=kong_id, continue_on_error=continue_on_error), \
+                    instrument('on_withdraw_by_id', self):
+                self.on_withdraw_by_id(client, kong_id, parent_kong_id)
+
+        execute(withdraw, orphans, workers=workers)
+
+    def plan(self, client, queryset=None, delete=False):
+        """
+        Compares the remote state of Kong with the local KongProxyModel objects, without writing anything. The remote
+        objects are retrieved once and the local objects are loaded once.
+
+        :param client: The client to use
+        :type client: kong.contract.KongAdminContract
+        :param queryset: A queryset containing KongProxyModel objects
+        :type queryset: django.db.models.QuerySet.
+        :param delete: Whether or not to plan the deletion of remote objects that have no local counterpart
+        :type delete: bool
+        :rtype: kong_admin.sync.plan.SyncPlan
+        :return: The plan
+        """
+        return self.build_plan(self.retrieve_all(client), self.get_queryset(queryset), delete=delete)
+
+    def plan_children(self, client, parent, delete=False):
+        """
+        Compares the remote state of Kong with the local KongProxyModel objects that belong to a single parent object.
+        Only the remote objects of that parent are retrieved.
+
+        :param client: The client to use
+        :type client: kong.contract.KongAdminContract
+        :param parent: The parent object
+        :type parent: kong_admin.models.KongProxyModel
+        :param delete: Whether or not to plan the deletion of remote objects (of this parent) that have no local
+            counterpart
+        :type delete: bool
+        :rtype: kong_admin.sync.plan.SyncPlan
+        :return: The plan
+        """
+        objects = self.get_children(parent)
+        return self.build_children_plan(self.retrieve_children(client, parent), parent, objects, delete=delete)
+
+    def apply(self, client, plan, workers=None, result=None, continue_on_error=False):
+        """
+        Executes a plan that has been computed by the plan method
+
+        :param client: The client to use
+        :type client: kong.contract.KongAdminContract
+        :param plan: The plan to execute
+        :type plan: kong_admin.sync.plan.SyncPlan
+        :param workers: The number of objects to publish or withdraw concurrently (see: executor.execute)
+        :type workers: int
+        :param result: The result to add the outcome of every object to
+        :type result: kong_admin.sync.result.SyncResult
+        :param continue_on_error: Whether or not to record a failed object in the result and continue with the next one
+        :type continue_on_error: bool
+        :rtype: kong_admin.sync.result.SyncResult
+        :return: The result
+        """
+        with writeback.buffered():
+            result = result if result is not None else SyncResult()
+
+            def publish(obj):
+                with result.track(SyncResult.PUBLISHED, obj=obj, continue_on_error=continue_on_error) as outcome:
+                    outcome['action'] = self._publish(client, obj, verify=False)
+
+            self.prepare_plan(plan)
+
+            self.withdraw_orphans(
+                client, plan.delete, workers=workers, result=result, continue_on_error=continue_on_error)
+            execute(publish, plan.create + plan.update, workers=workers)
+
+            for obj in plan.unchanged:
+                result.add(SyncResult.SKIPPED, obj=obj)
+
+            return result
+
+    def synchronize(
+            self, client, queryset=None, delete=False, reconcile=False, workers=None, incremental=False, stream=False,
+            continue_on_error=False):
+        """
+        :param client: The client to use. Unless it already is a session (or stream is set), it is wrapped in a new
+            SyncSession for the duration of this synchronization (see: session.SyncSession). Transient errors of
+            idempotent calls are retried (see: retry.ResilientClient).
+        :type client: kong.contract.KongAdminContract
         :param queryset: A queryset containing KongProxyModel objects
         :type queryset: django.db.models.QuerySet.
         :param delete: Whether or not to delete the object in the Kong service, if there is no model.
         :type delete: bool
-        :return:
+        :param reconcile: Whether or not to plan all changes up front (see: plan), so only the objects that actually
+            changed are written to Kong
+        :type reconcile: bool
+        :param incremental: Whether or not to only publish the objects that have changed since they were last
+            synchronized (see: plan.filter_changed). Remote objects that have no local counterpart are still deleted.
+        :type incremental: bool
+        :param stream: Whether or not to load the objects in chunks of KONG_ADMIN_SYNC_CHUNK_SIZE (see:
+            plan.iterate_chunks), and to only return a summary, so memory use does not grow with the number of objects.
+            Can not be combined with reconcile.
+        :type stream: bool
+        :param workers: The number of objects to publish concurrently (defaults to KONG_ADMIN_SYNC_WORKERS)
+        :type workers: int
+        :param continue_on_error: Whether or not to continue with the other objects when an object fails. The failed
+            objects and their errors are recorded in the result (see: SyncResult.errors). By default, the first error
+            stops the synchronization and is raised.
+        :type continue_on_error: bool
+        :rtype: kong_admin.sync.result.SyncResult
+        :return: The outcome of every object that has been synchronized (or a summary, see: stream)
         """
-        # Delete remote api's that do not exist in this database
-        if delete:
-            for kong_struct in self.on_retrieve_all(client):
-                kong_id = kong_struct.get('id', None)
-                assert kong_id is not None
+        if stream and reconcile:
+            raise ValueError('A streaming synchronization can not be reconciled')
+
+        # The remote listings of a streaming synchronization are not memoized, they grow with the number of objects
+        client = with_retries(client) if stream else get_session(client)
 
-                parent_kong_id = kong_struct.get(self.get_parent_key(), None)
+        with writeback.buffered():
+            result = SyncResult(keep_outcomes=not stream)
 
-                if not self.get_proxy_class().objects.all().filter(kong_id=kong_id).exists():
-                    logger.debug('synchronize: delete %s by id: %s' % (self.get_proxy_class(), kong_id))
-                    self.withdraw_by_id(client, kong_id, parent_kong_id=parent_kong_id)
+            queryset = self.get_objects_to_synchronize(queryset, incremental=incremental)
 
-        # Make sure we have a queryset
-        queryset = queryset or self.get_proxy_class().objects.all()
+            if reconcile:
+                plan = self.plan(client, queryset=queryset, delete=delete)
+                logger.debug('synchronize: %r for %s' % (plan, self.get_proxy_class()))
+                return self.apply(client, plan, workers=workers, result=result, continue_on_error=continue_on_error)
+
+            # Delete remote api's that do not exist in this database
+            if delete:
+                orphans = self.get_orphans(self.retrieve_all(client))
+                self.withdraw_orphans(
+                    client, orphans, workers=workers, result=result, continue_on_error=continue_on_error)
+
+            # Add remote apis that only exist in this database
+            def publish(obj):
+                with result.track(SyncResult.PUBLISHED, obj=obj, continue_on_error=continue_on_error) as outcome:
+                    outcome['action'] = self._publish(client, obj)
+
+            execute(publish, iterate_chunks(queryset) if stream else queryset, workers=workers)
+
+            return result
+
+    def synchronize_children(self, client, parent, delete=False):
+        """
+        Synchronizes the KongProxyModel objects that belong to a single parent object. Unlike synchronize, this only
+        retrieves the remote objects of that parent.
+
+        :param client: The client to use
+        :type client: kong.contract.KongAdminContract
+        :param parent: The parent object, which should already be published
+        :type parent: kong_admin.models.KongProxyModel
+        :param delete: Whether or not to delete the remote objects of the parent, if there is no model.
+        :type delete: bool
+        :rtype: kong_admin.sync.plan.SyncPlan
+        :return: The plan that has been executed
+        """
+        assert parent.kong_id is not None
 
-        # Add remote apis that only exist in this database
-        for obj in queryset:
-            self.publish(client, obj)
+        plan = self.plan_children(client, parent, delete=delete)
+        logger.debug('synchronize_children: %r for %s' % (plan, self.get_proxy_class()))
 
-        return queryset
+        # The parent object is already handled by one of the workers (if any), so the children are synchronized
+        # sequentially within that worker
+        self.apply(client, plan, workers=1)
+        return plan
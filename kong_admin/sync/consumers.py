@@ -7,6 +7,8 @@ from kong.exceptions import ConflictError
 from kong_admin.models import ConsumerReference, BasicAuthReference, KeyAuthReference, OAuth2Reference
 
 from .base import KongProxySyncEngine
+from .pagination import iterate
+from . import writeback
 
 
 class ConsumerSyncEngine(KongProxySyncEngine):
@@ -23,9 +25,7 @@ class ConsumerSyncEngine(KongProxySyncEngine):
         return ConsumerReference
 
     def on_retrieve_all(self, client):
-        consumers = list(client.consumers.iterate())
-        for consumer_struct in consumers:
-            yield consumer_struct
+        return iterate(client.consumers)
 
     def is_published(self, client, kong_id, parent_kong_id=None):
         try:
@@ -34,6 +34,15 @@ class ConsumerSyncEngine(KongProxySyncEngine):
             return False
         return result is not None
 
+    def get_payload(self, obj):
+        return {
+            'username': obj.username or None,
+            'custom_id': obj.custom_id or None
+        }
+
+    def get_compared_fields(self):
+        return 'username', 'custom_id'
+
     def on_publish(self, client, obj):
         """
         :param client: The client to interface with kong with
@@ -56,17 +65,17 @@ class ConsumerSyncEngine(KongProxySyncEngine):
         client.consumers.delete(str(kong_id))
 
     def after_publish(self, client, obj):
-        self.basic_auth().synchronize(client, BasicAuthReference.objects.filter(consumer=obj), delete=True)
-        self.key_auth().synchronize(client, KeyAuthReference.objects.filter(consumer=obj), delete=True)
-        self.oauth2().synchronize(client, OAuth2Reference.objects.filter(consumer=obj), delete=True)
+        self.basic_auth().synchronize_children(client, obj, delete=True)
+        self.key_auth().synchronize_children(client, obj, delete=True)
+        self.oauth2().synchronize_children(client, obj, delete=True)
         super(ConsumerSyncEngine, self).after_publish(client, obj)
 
     def before_withdraw(self, client, obj):
-        for oauth2 in OAuth2Reference.objects.filter(consumer=obj):
+        for oauth2 in self.oauth2().get_queryset().filter(consumer=obj):
             self.oauth2().withdraw(client, oauth2)
-        for key_auth in KeyAuthReference.objects.filter(consumer=obj):
+        for key_auth in self.key_auth().get_queryset().filter(consumer=obj):
             self.key_auth().withdraw(client, key_auth)
-        for basic_auth in BasicAuthReference.objects.filter(consumer=obj):
+        for basic_auth in self.basic_auth().get_queryset().filter(consumer=obj):
             self.basic_auth().withdraw(client, basic_auth)
         return super(ConsumerSyncEngine, self).before_withdraw(client, obj)
 
@@ -81,16 +90,16 @@ class ConsumerAuthSyncEngine(KongProxySyncEngine):
         """
 
     def on_retrieve_all(self, client):
-        consumers = list(client.consumers.iterate())
-        for consumer_struct in consumers:
+        for consumer_struct in iterate(client.consumers):
             consumer_kong_id = consumer_struct.get('id', None)
             assert consumer_kong_id is not None
 
-            auth_list = self.get_auth_client(client, consumer_kong_id).list(size=100).get('data', None)
-            assert auth_list is not None
-            for auth_struct in auth_list:
+            for auth_struct in self.on_retrieve_children(client, consumer_kong_id):
                 yield auth_struct
 
+    def on_retrieve_children(self, client, parent_kong_id):
+        return iterate(self.get_auth_client(client, parent_kong_id))
+
     def is_published(self, client, kong_id, parent_kong_id=None):
         try:
             result = self.get_auth_client(client, parent_kong_id).retrieve(str(kong_id))
@@ -101,9 +110,15 @@ class ConsumerAuthSyncEngine(KongProxySyncEngine):
     def get_parent_object(self, obj):
         return obj.consumer
 
+    def get_related_fields(self):
+        return 'consumer',
+
     def get_parent_key(self):
         return 'consumer_id'
 
+    def get_parent_field(self):
+        return 'consumer'
+
     def on_withdraw_by_id(self, client, kong_id, parent_kong_id=None):
         assert kong_id is not None
         assert parent_kong_id is not None
@@ -118,6 +133,17 @@ class BasicAuthSyncEngine(ConsumerAuthSyncEngine):
     def get_auth_client(self, client, consumer_kong_id):
         return client.consumers.basic_auth(str(consumer_kong_id))
 
+    def get_payload(self, obj):
+        return {
+            'consumer_id': obj.consumer.kong_id,
+            'username': obj.username,
+            'password': obj.password
+        }
+
+    def get_compared_fields(self):
+        # Kong only returns the hash of the password
+        return 'username',
+
     def on_publish(self, client, obj):
         """
         :param client: The client to interface with kong with
@@ -139,6 +165,15 @@ class KeyAuthSyncEngine(ConsumerAuthSyncEngine):
     def get_auth_client(self, client, consumer_kong_id):
         return client.consumers.key_auth(str(consumer_kong_id))
 
+    def get_payload(self, obj):
+        return {
+            'consumer_id': obj.consumer.kong_id,
+            'key': obj.key
+        }
+
+    def get_compared_fields(self):
+        return 'key',
+
     def on_publish(self, client, obj):
         """
         :param client: The client to interface with kong with
@@ -160,6 +195,19 @@ class OAuth2SyncEngine(ConsumerAuthSyncEngine):
     def get_auth_client(self, client, consumer_kong_id):
         return client.consumers.oauth2(str(consumer_kong_id))
 
+    def get_payload(self, obj):
+        return {
+            'consumer_id': obj.consumer.kong_id,
+            'name': obj.name,
+            'redirect_uri': obj.redirect_uri,
+            'client_id': obj.client_id or None,
+            'client_secret': obj.client_secret or None
+        }
+
+    def get_compared_fields(self):
+        # The client_id and client_secret are generated by Kong when they are not set
+        return 'name', 'redirect_uri'
+
     def on_publish(self, client, obj):
         """
         :param client: The client to interface with kong with
@@ -179,7 +227,6 @@ class OAuth2SyncEngine(ConsumerAuthSyncEngine):
         if obj.client_id != client_id or obj.client_secret != client_secret:
             obj.client_id = client_id
             obj.client_secret = client_secret
-            self.get_proxy_class().objects.filter(id=obj.id).update(
-                client_id=obj.client_id, client_secret=obj.client_secret)
+            writeback.update(self.get_proxy_class(), obj.id, client_id=obj.client_id, client_secret=obj.client_secret)
 
         return uuid.UUID(auth_struct['id'])
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import sys
+import threading
+
+import six
+from six.moves import queue
+from django.conf import settings
+from django.db import connections
+
+from . import writeback
+
+# Marks the end of the work queue
+_STOP = object()
+
+
+def get_default_workers():
+    return getattr(settings, 'KONG_ADMIN_SYNC_WORKERS', 1)
+
+
+def execute(func, items, workers=None):
+    """
+    Calls func for every item. When more than one worker is requested, the items are processed on a bounded pool of
+    threads. Every thread uses its own database connections, which are closed when the thread finishes, and shares the
+    write-back buffer of the calling thread (see: writeback.buffered).
+
+    The first exception stops the execution: no new items are started, and the exception is re-raised as soon as the
+    items that are already running have finished.
+
+    :param func: The callable to call for every item
+    :param items: The items to process
+    :type items: collections.Iterable
+    :param workers: The maximum number of items to process concurrently (defaults to KONG_ADMIN_SYNC_WORKERS)
+    :type workers: int
+    """
+    workers = get_default_workers() if workers is None else workers
+
+    if workers <= 1:
+        for item in items:
+            func(item)
+        return
+
+    # The queue is bounded, so items are only loaded as fast as they can be processed
+    tasks = queue.Queue(maxsize=workers * 2)
+    errors = []
+    buffer = writeback.get_buffer()
+
+    def work():
+        try:
+            with writeback.activate(buffer):
+                while True:
+                    item = tasks.get()
+                    if item is _STOP:
+                        return
+                    if errors:
+                        continue
+                    try:
+                        func(item)
+                    except Exception:
+                        errors.append(sys.exc_info())
+        finally:
+            for connection in connections.all():
+                connection.close()
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    try:
+        for item in items:
+            if errors:
+                break
+            tasks.put(item)
+    finally:
+        for _ in threads:
+            tasks.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        six.reraise(*errors[0])
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import logging
+import threading
+import time
+from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, connections, DEFAULT_DB_ALIAS
+from django.db.backends.utils import CursorWrapper
+from django.utils.module_loading import import_string
+
+from kong_admin.signals import sync_phase_finished
+
+logger = logging.getLogger(__name__)
+
+# The timing of a single phase of a sync engine (e.g. on_publish, or publish for all phases of publishing an object) for
+# a single object. object_id is None for phases that do not handle a local object (e.g. on_retrieve_all). http_calls
+# is the number of admin calls to Kong (made through the retry.ResilientClient of a synchronization) and db_queries
+# the number of database queries that have been made during the phase, including the phases nested in it. error is
+# the exception the phase raised (if any), and outcome is set by phases that did not do their work, e.g. 'skipped' for
+# the publish phase of an object that was unchanged (see: instrument).
+SyncEvent = namedtuple(
+    'SyncEvent', ['phase', 'entity', 'object_id', 'http_calls', 'db_queries', 'duration', 'error', 'outcome'])
+SyncEvent.__new__.__defaults__ = (None,)
+
+_local = threading.local()
+_collectors = []
+_configured = {}
+
+
+def get_default_collectors():
+    return getattr(settings, 'KONG_ADMIN_SYNC_COLLECTORS', ())
+
+
+class SyncCollector(object):
+    """
+    Receives the events of the sync engines. Collectors are configured by KONG_ADMIN_SYNC_COLLECTORS (dotted paths of
+    collector classes), or registered at runtime (see: collecting). They are called from the worker threads of a
+    synchronization, so they have to be thread-safe.
+    """
+
+    def collect(self, event):
+        """
+        :param event: The event
+        :type event: SyncEvent
+        """
+        raise NotImplementedError()
+
+
+class LoggingCollector(SyncCollector):
+    """
+    Logs every event (at debug level)
+    """
+
+    def collect(self, event):
+        logger.debug('%s %s %s: %.2fms, %d http calls, %d db queries%s' % (
+            event.entity, event.object_id or '-', event.phase, event.duration * 1000, event.http_calls,
+            event.db_queries, ' (failed: %s)' % event.error if event.error is not None else ''))
+
+
+class TimingCollector(SyncCollector):
+    """
+    Sums up the events per entity type and phase
+    """
+
+    def __init__(self):
+        self.totals = OrderedDict()
+        self._lock = threading.Lock()
+
+    def collect(self, event):
+        with self._lock:
+            totals = self.totals.setdefault((event.entity, event.phase), {
+                'count': 0, 'duration': 0, 'http_calls': 0, 'db_queries': 0, 'errors': 0})
+            totals['count'] += 1
+            totals['duration'] += event.duration
+            totals['http_calls'] += event.http_calls
+            totals['db_queries'] += event.db_queries
+            totals['errors'] += 1 if event.error is not None else 0
+
+    def report(self):
+        """
+        :rtype: list
+        :return: A line per entity type and phase, the slowest first
+        """
+        with self._lock:
+            items = sorted(self.totals.items(), key=lambda item: -item[1]['duration'])
+            return ['%s %s: %d x, %.2fs, %d http calls, %d db queries, %d errors' % (
+                entity, phase, totals['count'], totals['duration'], totals['http_calls'], totals['db_queries'],
+                totals['errors']) for (entity, phase), totals in items]
+
+
+def get_collectors():
+    """
+    :rtype: list
+    :return: The configured (see: KONG_ADMIN_SYNC_COLLECTORS) and registered collectors
+    """
+    paths = tuple(get_default_collectors())
+    if paths not in _configured:
+        _configured.clear()
+        _configured[paths] = [import_string(path)() for path in paths]
+    return _configured[paths] + _collectors
+
+
+@contextmanager
+def collecting(collector):
+    """
+    Registers a collector for the duration of the with block
+    """
+    _collectors.append(collector)
+    try:
+        yield collector
+    finally:
+        _collectors.remove(collector)
+
+
+def is_enabled():
+    return bool(get_default_collectors() or _collectors or sync_phase_finished.has_listeners())
+
+
+def count_http_call():
+    """
+    Records an admin call to Kong, made by the current thread (see: retry.ResilientClient)
+    """
+    _local.http_calls = getattr(_local, 'http_calls', 0) + 1
+
+
+class _CountingCursorWrapper(CursorWrapper):
+    """
+    Counts the queries that are executed through a cursor (see: count_queries)
+    """
+
+    def __init__(self, cursor, db, counter):
+        super(_CountingCursorWrapper, self).__init__(cursor, db)
+        self.counter = counter
+
+    def execute(self, sql, params=None):
+        self.counter[0] += 1
+        return super(_CountingCursorWrapper, self).execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self.counter[0] += 1
+        return super(_CountingCursorWrapper, self).executemany(sql, param_list)
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts the database queries of the current thread during the with block
+
+    :return: A callable that returns the number of queries
+    """
+    counter = [0]
+    execute_wrapper = getattr(connection, 'execute_wrapper', None)
+
+    if execute_wrapper is not None:
+        def count(execute, sql, params, many, context):
+            counter[0] += 1
+            return execute(sql, params, many, context)
+
+        with execute_wrapper(count):
+            yield lambda: counter[0]
+        return
+
+    # Django < 2.0 has no execute wrappers, so the cursors of the connection (of the current thread) are wrapped.
+    # Nested blocks wrap the cursors of the enclosing block, every query is counted by all of them.
+    db = connections[DEFAULT_DB_ALIAS]
+    overridden = dict((name, db.__dict__[name]) for name in ('make_cursor', 'make_debug_cursor') if name in db.__dict__)
+
+    def wrap(make_cursor):
+        return lambda cursor: _CountingCursorWrapper(make_cursor(cursor), db, counter)
+
+    db.make_cursor = wrap(db.make_cursor)
+    db.make_debug_cursor = wrap(db.make_debug_cursor)
+    try:
+        yield lambda: counter[0]
+    finally:
+        for name in ('make_cursor', 'make_debug_cursor'):
+            if name in overridden:
+                setattr(db, name, overridden[name])
+            else:
+                delattr(db, name)
+
+
+@contextmanager
+def instrument(phase, engine, obj=None):
+    """
+    Times the code in the with block as a phase of a sync engine, and sends the event to the sync_phase_finished signal
+    and the collectors. Does nothing when there are no collectors or receivers.
+
+    :param phase: The name of the phase (e.g. on_publish)
+    :type phase: six.text_type
+    :param engine: The sync engine
+    :type engine: kong_admin.sync.base.KongProxySyncEngine
+    :param obj: The object that is handled in the phase (if any)
+    :type obj: kong_admin.models.KongProxyModel
+    :return: A dict, in which the with block can set the 'outcome' of the event (see: SyncEvent)
+    """
+    details = {}
+    if not is_enabled():
+        yield details
+        return
+
+    http_calls = getattr(_local, 'http_calls', 0)
+    error = None
+
+    with count_queries() as db_queries:
+        started_at = time.time()
+        try:
+            yield details
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            event = SyncEvent(
+                phase, engine.get_proxy_class()._meta.model_name, obj.pk if obj is not None else None,
+                getattr(_local, 'http_calls', 0) - http_calls, db_queries(), time.time() - started_at, error,
+                details.get('outcome'))
+            emit(engine, event)
+
+
+def emit(engine, event):
+    sync_phase_finished.send(sender=engine.__class__, event=event)
+
+    for collector in get_collectors():
+        try:
+            collector.collect(event)
+        except Exception as e:
+            # Instrumentation never breaks a synchronization
+            logger.exception('emit: %r failed: %s' % (collector, e))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+from six.moves.urllib.parse import urlparse, parse_qs
+from django.conf import settings
+
+
+def get_default_page_size():
+    return getattr(settings, 'KONG_ADMIN_SYNC_PAGE_SIZE', 100)
+
+
+def get_next_offset(response):
+    """
+    :param response: A page, as it is returned by Kong
+    :type response: dict
+    :return: The offset of the next page, or None if this is the last page
+    """
+    offset = response.get('offset', None)
+    if offset is None and response.get('next', None):
+        offset = parse_qs(urlparse(response['next']).query).get('offset', [None])[0]
+    return offset
+
+
+def iterate(collection, page_size=None):
+    """
+    Yields all objects of a Kong collection, one page at a time. Only a single page is kept in memory.
+
+    :param collection: Any python-kong client that has a list(size, offset) method, e.g. client.apis or
+        client.apis.plugins(api_kong_id)
+    :param page_size: The number of objects to retrieve per request (defaults to KONG_ADMIN_SYNC_PAGE_SIZE)
+    :type page_size: int
+    :rtype: collections.Iterator
+    """
+    page_size = get_default_page_size() if page_size is None else page_size
+
+    offset = None
+    while True:
+        response = collection.list(size=page_size, offset=offset)
+
+        data = response.get('data', None)
+        assert data is not None
+
+        for kong_struct in data:
+            yield kong_struct
+
+        offset = get_next_offset(response)
+        if offset is None or not data:
+            return
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+from six import text_type
+from django.conf import settings
+from django.db.models import Q, F
+
+
+def get_default_chunk_size():
+    return getattr(settings, 'KONG_ADMIN_SYNC_CHUNK_SIZE', 10000)
+
+
+class SyncPlan(object):
+    """
+    The outcome of comparing the remote state of Kong with the local KongProxyModel objects. A plan is computed in
+    memory, before any remote or local write takes place.
+    """
+
+    def __init__(self):
+        # KongProxyModel objects that are unknown to Kong
+        self.create = []
+
+        # KongProxyModel objects that are known to Kong, but have changed locally (or have been changed in Kong)
+        self.update = []
+
+        # KongProxyModel objects that are known to Kong and have not changed locally
+        self.unchanged = []
+
+        # (kong_id, parent_kong_id) tuples of remote objects that have no local counterpart
+        self.delete = []
+
+    def __len__(self):
+        return len(self.create) + len(self.update) + len(self.delete)
+
+    def __repr__(self):
+        return 'SyncPlan(create: %d, update: %d, delete: %d, unchanged: %d)' % (
+            len(self.create), len(self.update), len(self.delete), len(self.unchanged))
+
+
+def build_plan(kong_structs, objects, local_kong_ids=None, parent_key=None, parent_kong_id=None,
+               remote_fingerprint=None, local_fingerprint=None):
+    """
+    :param kong_structs: The remote objects, as they are known by Kong
+    :type kong_structs: collections.Iterable
+    :param objects: The local KongProxyModel objects to synchronize
+    :type objects: collections.Iterable
+    :param local_kong_ids: The kong_ids of all local objects. Remote objects that are not in this set will be deleted,
+        unless it is None.
+    :type local_kong_ids: set
+    :param parent_key: The key in the remote objects that references the parent object
+    :type parent_key: six.text_type
+    :param parent_kong_id: The kong_id of the parent object, if all remote objects have the same parent
+    :type parent_kong_id: six.text_type
+    :param remote_fingerprint: Returns the fingerprint of a remote object, or None if it can not be compared
+    :type remote_fingerprint: callable
+    :param local_fingerprint: Returns the fingerprint of a local object. Synchronized objects of which the fingerprint
+        differs from the remote one have been changed in Kong, and are updated.
+    :type local_fingerprint: callable
+    :rtype: SyncPlan
+    """
+    # Only the reference to the parent object and a fingerprint are kept, the remote objects themselves can be streamed
+    remote_index = {}
+    for kong_struct in kong_structs:
+        kong_id = kong_struct.get('id', None)
+        assert kong_id is not None
+        remote_index[text_type(kong_id)] = (
+            kong_struct.get(parent_key, parent_kong_id),
+            remote_fingerprint(kong_struct) if remote_fingerprint is not None else None)
+
+    plan = SyncPlan()
+
+    for obj in objects:
+        if obj.kong_id is None or text_type(obj.kong_id) not in remote_index:
+            plan.create.append(obj)
+        elif not obj.synchronized:
+            plan.update.append(obj)
+        elif _is_drifted(obj, remote_index[text_type(obj.kong_id)][1], local_fingerprint):
+            # Publishing it again must not be skipped because its payload did not change locally (see:
+            # KongProxySyncEngine.is_unchanged)
+            obj.payload_hash = None
+            plan.update.append(obj)
+        else:
+            plan.unchanged.append(obj)
+
+    if local_kong_ids is not None:
+        for kong_id, (remote_parent_kong_id, _) in remote_index.items():
+            if kong_id not in local_kong_ids:
+                plan.delete.append((kong_id, remote_parent_kong_id))
+
+    return plan
+
+
+def _is_drifted(obj, remote_fingerprint, local_fingerprint):
+    if remote_fingerprint is None or local_fingerprint is None:
+        return False
+    fingerprint = local_fingerprint(obj)
+    return fingerprint is not None and fingerprint != remote_fingerprint
+
+
+def load_kong_ids(queryset, chunk_size=None):
+    """
+    Loads the kong_ids of the objects in a queryset. Only the kong_ids are loaded, in chunks of chunk_size rows (ordered
+    by primary key), so large tables are never fetched in a single query.
+
+    :param queryset: A queryset containing KongProxyModel objects
+    :type queryset: django.db.models.QuerySet
+    :param chunk_size: The number of rows to fetch per query (defaults to KONG_ADMIN_SYNC_CHUNK_SIZE)
+    :type chunk_size: int
+    :rtype: set
+    :return: The kong_ids, as text
+    """
+    chunk_size = get_default_chunk_size() if chunk_size is None else chunk_size
+    queryset = queryset.exclude(kong_id=None).order_by('pk')
+
+    kong_ids, last_pk = set(), None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list('pk', 'kong_id')[:chunk_size])
+        kong_ids.update(text_type(kong_id) for _, kong_id in rows)
+
+        if len(rows) < chunk_size:
+            return kong_ids
+        last_pk = rows[-1][0]
+
+
+def iterate_chunks(queryset, chunk_size=None):
+    """
+    Iterates over the objects of a queryset in chunks of chunk_size rows (ordered by primary key). Every chunk is a
+    separate query, and only a single chunk is kept in memory. Unlike iterating the queryset itself, the objects are
+    not cached by the queryset.
+
+    :param queryset: A queryset containing KongProxyModel objects
+    :type queryset: django.db.models.QuerySet
+    :param chunk_size: The number of objects to fetch per query (defaults to KONG_ADMIN_SYNC_CHUNK_SIZE)
+    :type chunk_size: int
+    :rtype: collections.Iterator
+    """
+    chunk_size = get_default_chunk_size() if chunk_size is None else chunk_size
+    queryset = queryset.order_by('pk')
+
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        objects = list(chunk[:chunk_size])
+
+        for obj in objects:
+            yield obj
+
+        if len(objects) < chunk_size:
+            return
+        last_pk = objects[-1].pk
+
+
+def filter_changed(queryset):
+    """
+    Narrows a queryset down to the objects that have not been synchronized, or that have been saved after they were
+    last synchronized
+
+    :param queryset: A queryset containing KongProxyModel objects
+    :type queryset: django.db.models.QuerySet
+    :rtype: django.db.models.QuerySet
+    """
+    return queryset.filter(Q(synchronized=False) | Q(updated_at__gt=F('synchronized_at')))
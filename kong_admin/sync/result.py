@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import threading
+import time
+from collections import namedtuple, Counter
+from contextlib import contextmanager
+
+# The outcome of synchronizing a single object. Either obj (a KongProxyModel) or kong_id is set, depending on whether
+# there is a local reference to the object. error is the exception of a failed object, duration the time (in s) it took.
+SyncOutcome = namedtuple('SyncOutcome', ['action', 'obj', 'kong_id', 'error', 'duration'])
+SyncOutcome.__new__.__defaults__ = (None, None)
+
+
+class SyncResult(object):
+    """
+    Collects the outcome of every object that has been handled during a synchronization. It is safe to add outcomes
+    from multiple threads.
+
+    When keep_outcomes is False, only the number of objects per action is kept (a summary), so the result does not
+    hold on to the objects of a large synchronization. The outcomes of failed objects are always kept (see: errors).
+    """
+    PUBLISHED = 'published'
+    WITHDRAWN = 'withdrawn'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+
+    def __init__(self, keep_outcomes=True):
+        self.outcomes = [] if keep_outcomes else None
+        self.errors = []
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, action, obj=None, kong_id=None, error=None, duration=None):
+        outcome = SyncOutcome(action, obj, kong_id, error, duration)
+
+        with self._lock:
+            self._counts[action] += 1
+            if self.outcomes is not None:
+                self.outcomes.append(outcome)
+            if action == self.FAILED:
+                self.errors.append(outcome)
+
+    @contextmanager
+    def track(self, action, obj=None, kong_id=None, continue_on_error=False):
+        """
+        Adds the outcome of the code in the with block, and the time it took. When the block raises an exception, the
+        object is added as FAILED and the exception is swallowed (if continue_on_error is set) or re-raised. The block
+        receives a dict, in which it can replace the action of the object (e.g. with SyncResult.SKIPPED).
+
+        :param action: The action of the object when the block succeeds (e.g. SyncResult.PUBLISHED)
+        :type action: six.text_type
+        :param continue_on_error: Whether or not to swallow the exception of a failed object
+        :type continue_on_error: bool
+        """
+        details = {'action': action}
+        started_at = time.time()
+        try:
+            yield details
+        except Exception as e:
+            self.add(self.FAILED, obj=obj, kong_id=kong_id, error=e, duration=time.time() - started_at)
+            if not continue_on_error:
+                raise
+        else:
+            self.add(details['action'], obj=obj, kong_id=kong_id, duration=time.time() - started_at)
+
+    def count(self, action=None):
+        return sum(self._counts.values()) if action is None else self._counts[action]
+
+    @property
+    def published(self):
+        return self.count(self.PUBLISHED)
+
+    @property
+    def withdrawn(self):
+        return self.count(self.WITHDRAWN)
+
+    @property
+    def skipped(self):
+        return self.count(self.SKIPPED)
+
+    @property
+    def failed(self):
+        return self.count(self.FAILED)
+
+    def __len__(self):
+        return self.count()
+
+    def __repr__(self):
+        return 'SyncResult(published: %d, withdrawn: %d, skipped: %d, failed: %d)' % (
+            self.published, self.withdrawn, self.skipped, self.failed)
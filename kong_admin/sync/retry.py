@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import logging
+import random
+import threading
+import time
+import types
+
+from django.conf import settings
+from kong.contract import KongAdminContract
+from kong.exceptions import ServerError
+from requests.exceptions import ConnectionError, Timeout
+
+from kong_admin.signals import admin_call_finished
+from .instrumentation import count_http_call
+
+logger = logging.getLogger(__name__)
+
+# The operations that can safely be repeated (GET and DELETE requests)
+IDEMPOTENT_OPERATIONS = frozenset(['list', 'retrieve', 'count', 'retrieve_schema', 'delete'])
+
+# The operations that return a nested collection
+CHILD_COLLECTIONS = frozenset(['plugins', 'basic_auth', 'key_auth', 'oauth2'])
+
+# The argument of create_or_update that holds the id of the object, per collection. A PUT with an id can safely be
+# repeated, without one it creates a new object every time (just like create).
+ID_ARGUMENTS = {
+    'apis': 'api_id',
+    'plugins': 'plugin_configuration_id',
+    'consumers': 'consumer_id',
+    'basic_auth': 'basic_auth_id',
+    'key_auth': 'key_auth_id',
+    'oauth2': 'oauth2_id',
+}
+
+# The errors that indicate that Kong is unhealthy. Other errors (e.g. ConflictError or ValueError) are not retried.
+TRANSIENT_ERRORS = (ServerError, ConnectionError, Timeout)
+
+
+def get_default_max_attempts():
+    return getattr(settings, 'KONG_ADMIN_RETRY_ATTEMPTS', 4)
+
+
+def get_default_backoff():
+    return getattr(settings, 'KONG_ADMIN_RETRY_BACKOFF', 0.1)
+
+
+def get_default_max_backoff():
+    return getattr(settings, 'KONG_ADMIN_RETRY_MAX_BACKOFF', 5)
+
+
+def get_default_budget():
+    return getattr(settings, 'KONG_ADMIN_RETRY_BUDGET', 100)
+
+
+def get_default_failure_threshold():
+    return getattr(settings, 'KONG_ADMIN_CIRCUIT_BREAKER_THRESHOLD', 5)
+
+
+def get_default_reset_timeout():
+    return getattr(settings, 'KONG_ADMIN_CIRCUIT_BREAKER_TIMEOUT', 30)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a Kong admin endpoint that is considered to be unhealthy
+    """
+
+
+class RetryPolicy(object):
+    """
+    Retries idempotent calls that failed with a transient error, after an exponential backoff with full jitter
+    """
+
+    def __init__(self, max_attempts=None, backoff=None, max_backoff=None):
+        self.max_attempts = get_default_max_attempts() if max_attempts is None else max_attempts
+        self.backoff = get_default_backoff() if backoff is None else backoff
+        self.max_backoff = get_default_max_backoff() if max_backoff is None else max_backoff
+
+    def get_delay(self, attempt):
+        """
+        :param attempt: The number of attempts that failed so far
+        :type attempt: int
+        :rtype: float
+        :return: The time (in s) to wait before the next attempt
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+
+class RetryBudget(object):
+    """
+    The number of retries that are left for a single run. Once the budget has been spent, calls fail on their first
+    error, so a run against a struggling node does not multiply its load.
+    """
+
+    def __init__(self, retries=None):
+        self.retries = get_default_budget() if retries is None else retries
+        self._lock = threading.Lock()
+
+    def spend(self):
+        """
+        :rtype: bool
+        :return: Whether a retry was left
+        """
+        with self._lock:
+            if self.retries <= 0:
+                return False
+            self.retries -= 1
+            return True
+
+
+class CircuitBreaker(object):
+    """
+    Fails fast once failure_threshold calls in a row have failed with a transient error. After reset_timeout seconds,
+    a single call is let through: when it succeeds the circuit is closed again, otherwise it stays open.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, endpoint=None, failure_threshold=None, reset_timeout=None):
+        self.endpoint = endpoint
+        self.failure_threshold = get_default_failure_threshold() if failure_threshold is None else failure_threshold
+        self.reset_timeout = get_default_reset_timeout() if reset_timeout is None else reset_timeout
+
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpenError('Kong admin endpoint %s is unhealthy, not calling it for %ds' % (
+                self.endpoint, self.reset_timeout))
+
+    def on_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def on_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning('Opening the circuit of Kong admin endpoint %s after %d failures' % (
+                        self.endpoint, self._failures))
+                self.state = self.OPEN
+                self._opened_at = time.time()
+
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(endpoint):
+    """
+    :param endpoint: The url of a Kong admin endpoint
+    :type endpoint: six.text_type
+    :rtype: CircuitBreaker
+    :return: The circuit breaker of the endpoint, which is shared by all runs in this process
+    """
+    with _circuit_breakers_lock:
+        if endpoint not in _circuit_breakers:
+            _circuit_breakers[endpoint] = CircuitBreaker(endpoint)
+        return _circuit_breakers[endpoint]
+
+
+def reset_circuit_breakers():
+    """
+    Forgets the state of all circuit breakers of this process (e.g. between tests)
+    """
+    with _circuit_breakers_lock:
+        _circuit_breakers.clear()
+
+
+class ResilientClient(KongAdminContract):
+    """
+    Wraps a client, so its idempotent calls are retried (see: RetryPolicy and RetryBudget), and its calls fail fast
+    while the circuit of the Kong admin endpoint is open (see: CircuitBreaker).
+    """
+
+    def __init__(self, client, policy=None, budget=None, circuit_breaker=None):
+        self.client = client
+        self.policy = policy if policy is not None else RetryPolicy()
+        self.budget = budget if budget is not None else RetryBudget()
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else get_circuit_breaker(
+            getattr(client.apis, 'api_url', None))
+
+        super(ResilientClient, self).__init__(
+            apis=ResilientCollection(self, client.apis, 'apis'),
+            consumers=ResilientCollection(self, client.consumers, 'consumers'),
+            plugins=ResilientCollection(self, client.plugins, 'plugins'))
+
+    def __getattr__(self, item):
+        if item == 'client':
+            raise AttributeError(item)
+        return getattr(self.client, item)
+
+    def close(self):
+        self.client.close()
+
+    def call(self, operation, func, args, kwargs, idempotent=None):
+        """
+        Calls an operation of a collection. Every attempt is a single request.
+
+        :param operation: The name of the operation (e.g. retrieve)
+        :type operation: six.text_type
+        :param func: The operation
+        :type func: callable
+        :param args: The positional arguments of the call
+        :type args: tuple
+        :param kwargs: The keyword arguments of the call
+        :type kwargs: dict
+        :param idempotent: Whether the call can be retried (defaults to whether the operation is in
+            IDEMPOTENT_OPERATIONS, see: is_idempotent)
+        :type idempotent: bool
+        """
+        idempotent = operation in IDEMPOTENT_OPERATIONS if idempotent is None else idempotent
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self.circuit_breaker.before_call()
+            count_http_call()
+
+            started_at = time.time()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                admin_call_finished.send(
+                    sender=self.__class__, operation=operation, duration=time.time() - started_at, error=e)
+                if not isinstance(e, TRANSIENT_ERRORS):
+                    # Kong did answer (e.g. with a 4xx), so the endpoint is healthy. This also closes a half-open
+                    # circuit, which would otherwise reject every later call.
+                    self.circuit_breaker.on_success()
+                    raise
+
+                self.circuit_breaker.on_failure()
+                if not idempotent or attempt >= self.policy.max_attempts or not self.budget.spend():
+                    raise
+
+                delay = self.policy.get_delay(attempt)
+                logger.info('%s failed (%s), retrying in %.2fs' % (operation, e, delay))
+                time.sleep(delay)
+            else:
+                admin_call_finished.send(
+                    sender=self.__class__, operation=operation, duration=time.time() - started_at, error=None)
+                self.circuit_breaker.on_success()
+                return result
+
+
+class ResilientCollection(object):
+    def __init__(self, client, collection, name=None):
+        self.client = client
+        self.collection = collection
+        self.name = name
+
+    def __getattr__(self, item):
+        attr = getattr(self.collection, item)
+
+        if item in CHILD_COLLECTIONS:
+            return lambda *args, **kwargs: ResilientCollection(self.client, attr(*args, **kwargs), item)
+
+        if not callable(attr) or item.startswith('_'):
+            return attr
+
+        func = _undecorated(attr)
+
+        def call(*args, **kwargs):
+            return self.client.call(item, func, args, kwargs, idempotent=is_idempotent(self.name, item, kwargs))
+        return call
+
+
+def is_idempotent(collection, operation, kwargs):
+    """
+    :param collection: The name of the collection (e.g. apis, or basic_auth)
+    :type collection: six.text_type
+    :param operation: The name of the operation (e.g. retrieve)
+    :type operation: six.text_type
+    :param kwargs: The keyword arguments of the call
+    :type kwargs: dict
+    :rtype: bool
+    :return: Whether the call can safely be repeated
+    """
+    if operation == 'create_or_update':
+        id_argument = ID_ARGUMENTS.get(collection)
+        return id_argument is not None and kwargs.get(id_argument) is not None
+    return operation in IDEMPOTENT_OPERATIONS
+
+
+def _undecorated(method):
+    """
+    python-kong retries some calls itself (e.g. retrieve, on a ServerError), which would multiply every attempt of
+    ResilientClient.call, and hide all but the last failure from the circuit breaker. Returns the method without those
+    retries.
+    """
+    func = getattr(method, '__func__', None)
+    if not isinstance(func, types.FunctionType):
+        return method
+
+    wrapped = getattr(func, '__wrapped__', None)
+    if wrapped is None:
+        # functools.wraps only records the wrapped function on Python 3, backoff keeps it in the closure of its wrapper
+        for cell in func.__closure__ or ():
+            value = cell.cell_contents
+            if isinstance(value, types.FunctionType) and value is not func and value.__name__ == func.__name__:
+                wrapped = value
+                break
+
+    if wrapped is None:
+        return method
+    return types.MethodType(wrapped, method.__self__)
+
+
+def with_retries(client):
+    """
+    :param client: A client
+    :type client: kong.contract.KongAdminContract
+    :rtype: ResilientClient
+    :return: The client itself, when it already is resilient, or a resilient client with a retry budget of its own
+    """
+    return client if isinstance(client, ResilientClient) else ResilientClient(client)
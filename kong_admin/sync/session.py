@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import threading
+from collections import Counter, OrderedDict
+
+from six import text_type
+from kong.contract import KongAdminContract
+
+from .pagination import get_next_offset
+from .retry import with_retries
+
+# Offsets of pages that are served from the cache are prefixed, so they are never confused with the offsets of Kong
+_CACHE_OFFSET_PREFIX = 'cache:'
+
+
+class SyncSession(KongAdminContract):
+    """
+    The state of a single synchronization run. A session owns the client, and can be used wherever a client is
+    expected (engines and kong_admin.logic), so every engine in the run shares it.
+
+    Complete remote listings are memoized per entity type and parent (e.g. ('plugins', api_kong_id)), so a listing
+    that has been fetched by one engine is reused by all others, and retrieve calls are answered from it. Writes that go
+    through the session are applied to the memoized listings as well. The number of remote calls and cache hits is
+    kept in counters.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.counters = Counter()
+
+        # (entity, parent kong_id): OrderedDict(kong_id: kong_struct) of complete listings
+        self._cache = {}
+        # (entity, parent kong_id): (offset of the next page, kong_structs) of listings that are being fetched
+        self._partial = {}
+        self._lock = threading.RLock()
+
+        super(SyncSession, self).__init__(
+            apis=CachedCollection(self, 'apis', None, client.apis, lookup_field='name'),
+            consumers=CachedCollection(self, 'consumers', None, client.consumers, lookup_field='username'),
+            plugins=client.plugins)
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get_listing(self, key):
+        """
+        :return: The memoized listing for a key (or None)
+        :rtype: collections.OrderedDict
+        """
+        with self._lock:
+            return self._cache.get(key, None)
+
+    def add_page(self, key, offset, response):
+        """
+        Records a page of a listing. The listing is memoized when all its pages have been fetched, in order.
+        """
+        with self._lock:
+            if offset is None:
+                self._partial[key] = (None, [])
+            elif key not in self._partial or self._partial[key][0] != offset:
+                self._partial.pop(key, None)
+                return
+
+            kong_structs = self._partial[key][1]
+            kong_structs.extend(response.get('data', []))
+
+            next_offset = get_next_offset(response)
+            if next_offset is None:
+                del self._partial[key]
+                self._cache[key] = OrderedDict((text_type(kong_struct['id']), kong_struct)
+                                               for kong_struct in kong_structs)
+            else:
+                self._partial[key] = (next_offset, kong_structs)
+
+    def store(self, key, kong_struct):
+        with self._lock:
+            listing = self._cache.get(key, None)
+            if listing is not None and kong_struct is not None:
+                listing[text_type(kong_struct['id'])] = kong_struct
+            self._partial.pop(key, None)
+
+    def evict(self, key, kong_id):
+        with self._lock:
+            listing = self._cache.get(key, None)
+            if listing is not None:
+                listing.pop(text_type(kong_id), None)
+            self._partial.pop(key, None)
+
+            # Kong removes the children of a removed object
+            for other_key in list(self._cache.keys()):
+                if other_key[1] == text_type(kong_id):
+                    del self._cache[other_key]
+
+    def __repr__(self):
+        return 'SyncSession(%s)' % ', '.join('%s: %d' % item for item in sorted(self.counters.items()))
+
+
+class CachedCollection(object):
+    """
+    Wraps a collection of the python-kong client (e.g. client.apis or client.apis.plugins(api_kong_id)). Listings and
+    retrieve calls are served from the session cache where possible, writes are passed through and applied to it. All
+    other methods are passed on to the wrapped collection.
+    """
+
+    def __init__(self, session, entity, parent_kong_id, collection, lookup_field=None):
+        self.session = session
+        self.entity = entity
+        self.key = (entity, text_type(parent_kong_id) if parent_kong_id is not None else None)
+        self.collection = collection
+        self.lookup_field = lookup_field
+
+    def __getattr__(self, item):
+        return getattr(self.collection, item)
+
+    def list(self, size=100, offset=None, **filter_fields):
+        listing = self.session.get_listing(self.key)
+
+        if listing is not None and not filter_fields and (offset is None or offset.startswith(_CACHE_OFFSET_PREFIX)):
+            self.session.count('%s.cache_hit' % self.entity)
+
+            start = int(offset[len(_CACHE_OFFSET_PREFIX):]) if offset is not None else 0
+            kong_structs = list(listing.values())
+
+            response = {'data': kong_structs[start:start + size]}
+            if start + size < len(kong_structs):
+                response['offset'] = '%s%d' % (_CACHE_OFFSET_PREFIX, start + size)
+            return response
+
+        self.session.count('%s.list' % self.entity)
+        response = self.collection.list(size=size, offset=offset, **filter_fields)
+
+        if not filter_fields:
+            self.session.add_page(self.key, offset, response)
+        return response
+
+    def retrieve(self, name_or_id):
+        listing = self.session.get_listing(self.key)
+
+        if listing is not None:
+            self.session.count('%s.cache_hit' % self.entity)
+
+            kong_struct = listing.get(text_type(name_or_id), None)
+            if kong_struct is None and self.lookup_field is not None:
+                kong_struct = next((s for s in listing.values() if s.get(self.lookup_field) == name_or_id), None)
+            if kong_struct is None:
+                # Just like the client does for unknown objects
+                raise ValueError('Not found: %s' % name_or_id)
+            return kong_struct
+
+        self.session.count('%s.retrieve' % self.entity)
+        return self.collection.retrieve(name_or_id)
+
+    def create(self, *args, **kwargs):
+        return self._write('create', *args, **kwargs)
+
+    def create_or_update(self, *args, **kwargs):
+        return self._write('create_or_update', *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._write('update', *args, **kwargs)
+
+    def delete(self, name_or_id):
+        self.session.count('%s.delete' % self.entity)
+
+        # Deleting by name is allowed, but the cache is indexed by id
+        listing = self.session.get_listing(self.key)
+        if listing is not None and text_type(name_or_id) not in listing and self.lookup_field is not None:
+            name_or_id = next((s['id'] for s in listing.values()
+                               if s.get(self.lookup_field) == name_or_id), name_or_id)
+
+        self.collection.delete(name_or_id)
+        self.session.evict(self.key, name_or_id)
+
+    def plugins(self, name_or_id):
+        return CachedCollection(self.session, 'plugins', name_or_id, self.collection.plugins(name_or_id))
+
+    def basic_auth(self, username_or_id):
+        return CachedCollection(self.session, 'basicauth', username_or_id, self.collection.basic_auth(username_or_id))
+
+    def key_auth(self, username_or_id):
+        return CachedCollection(self.session, 'keyauth', username_or_id, self.collection.key_auth(username_or_id))
+
+    def oauth2(self, username_or_id):
+        return CachedCollection(self.session, 'oauth2', username_or_id, self.collection.oauth2(username_or_id))
+
+    def _write(self, method, *args, **kwargs):
+        self.session.count('%s.%s' % (self.entity, method))
+
+        kong_struct = getattr(self.collection, method)(*args, **kwargs)
+        self.session.store(self.key, kong_struct)
+        return kong_struct
+
+
+def get_session(client):
+    """
+    :param client: A client or a session
+    :type client: kong.contract.KongAdminContract
+    :rtype: SyncSession
+    :return: The session itself, or a new session that wraps the client (see: retry.with_retries)
+    """
+    return client if isinstance(client, SyncSession) else SyncSession(with_retries(client))
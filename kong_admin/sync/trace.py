@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Records the admin calls of a synchronization (see: kong_sync --record-trace), so they can be replayed later (see:
+kong_admin.testing.trace.ReplayAdapter).
+"""
+from __future__ import unicode_literals, print_function
+import gzip
+import io
+import json
+import re
+import threading
+import time
+from collections import namedtuple, Counter
+
+import six
+from six.moves.urllib.parse import urlparse, parse_qs
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+TRACE_VERSION = 1
+
+UUID_PATTERN = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+# The fields of the credentials that are never written to a trace, in requests nor in responses
+SECRET_FIELDS = frozenset(['password', 'key', 'client_secret'])
+SECRET_PATTERN = re.compile(r'(^|[?&])(%s)=[^&]*' % '|'.join(sorted(SECRET_FIELDS)))
+REDACTED = '[redacted]'
+
+# A single admin call. started_at is relative to the first call of the trace, started_at and duration are in s. path
+# includes the query string, data is the decoded form data of the request and body the raw body of the response. The
+# values of SECRET_FIELDS are redacted in all three.
+TraceEntry = namedtuple('TraceEntry', ['started_at', 'duration', 'method', 'path', 'data', 'status', 'body'])
+
+
+def get_template(method, path):
+    """
+    :return: The method and path of a call, without its query string and with all ids replaced by {id}, e.g.
+        GET /apis/{id}/plugins/. Calls are counted per template (see: Trace.counts).
+    :rtype: six.text_type
+    """
+    return '%s %s' % (method, UUID_PATTERN.sub('{id}', path.partition('?')[0]))
+
+
+class Trace(object):
+    """
+    The admin calls of a run, in the order they were sent. Traces are stored as (optionally gzipped) JSON lines: a
+    header, followed by a compact list per call.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = list(entries or [])
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, entry):
+        with self._lock:
+            self.entries.append(entry)
+
+    def counts(self):
+        """
+        :rtype: collections.Counter
+        :return: The number of calls per template (see: get_template)
+        """
+        return Counter(get_template(entry.method, entry.path) for entry in self.entries)
+
+    def save(self, path):
+        lines = [json.dumps({'version': TRACE_VERSION})]
+        for entry in self.entries:
+            lines.append(json.dumps([
+                round(entry.started_at, 4), round(entry.duration, 4), entry.method, entry.path, entry.data,
+                entry.status, entry.body], separators=(',', ':'), sort_keys=True))
+
+        content = ('\n'.join(lines) + '\n').encode('utf-8')
+        with (gzip.open(path, 'wb') if path.endswith('.gz') else io.open(path, 'wb')) as f:
+            f.write(content)
+
+    @classmethod
+    def load(cls, path):
+        with (gzip.open(path, 'rb') if path.endswith('.gz') else io.open(path, 'rb')) as f:
+            lines = f.read().decode('utf-8').splitlines()
+
+        header = json.loads(lines[0])
+        if header.get('version') != TRACE_VERSION:
+            raise ValueError('Unsupported trace version: %s' % header.get('version'))
+        return cls(TraceEntry(*json.loads(line)) for line in lines[1:] if line.strip())
+
+
+def _decode(request):
+    url = urlparse(request.url)
+    path = url.path + ('?%s' % SECRET_PATTERN.sub(r'\1\2=' + REDACTED, url.query) if url.query else '')
+
+    body = request.body or ''
+    if isinstance(body, six.binary_type):
+        body = body.decode('utf-8')
+    data = dict((key, values[0] if len(values) == 1 else values)
+                for key, values in parse_qs(body, keep_blank_values=True).items())
+    return path, _redact(data)
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return dict((key, REDACTED if key in SECRET_FIELDS else _redact(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+
+def _redact_body(body):
+    """
+    :return: The (JSON) body of a response, with the values of SECRET_FIELDS redacted
+    :rtype: six.text_type
+    """
+    if not any(field in body for field in SECRET_FIELDS):
+        return body
+    try:
+        return json.dumps(_redact(json.loads(body)))
+    except ValueError:
+        return body
+
+
+class RecordingAdapter(BaseAdapter):
+    """
+    Records every admin call that is sent through another adapter (see: trace), e.g. during a synchronization against
+    a real Kong node. Mount it with kong_admin.client.KongClientProvider(api_url, adapter=RecordingAdapter(...)).
+    """
+
+    def __init__(self, adapter=None):
+        """
+        :param adapter: The adapter that sends the requests (defaults to a requests HTTPAdapter)
+        :type adapter: requests.adapters.BaseAdapter
+        """
+        super(RecordingAdapter, self).__init__()
+        self.adapter = adapter if adapter is not None else HTTPAdapter()
+        self.trace = Trace()
+        self._started_at = None
+
+    def send(self, request, *args, **kwargs):
+        started_at = time.time()
+        if self._started_at is None:
+            self._started_at = started_at
+
+        response = self.adapter.send(request, *args, **kwargs)
+
+        path, data = _decode(request)
+        self.trace.append(TraceEntry(
+            started_at - self._started_at, time.time() - started_at, request.method, path, data,
+            response.status_code, _redact_body(response.text)))
+        return response
+
+    def close(self):
+        self.adapter.close()
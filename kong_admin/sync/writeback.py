@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import asyncio
+except ImportError:  # Python 2
+    asyncio = None
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, When, Value, F
+
+_local = threading.local()
+
+# The active buffers of asyncio tasks: the tasks of an event loop share a thread, but not their buffer
+_task_buffers = weakref.WeakKeyDictionary()
+
+
+def get_default_batch_size():
+    return getattr(settings, 'KONG_ADMIN_SYNC_WRITE_BATCH_SIZE', 100)
+
+
+def get_default_interval():
+    return getattr(settings, 'KONG_ADMIN_SYNC_WRITE_INTERVAL', 1000)
+
+
+class WriteBackBuffer(object):
+    """
+    Buffers the field updates of KongProxyModel objects during a synchronization, and writes them as a single UPDATE
+    statement per model. The buffer is flushed when it holds batch_size objects, or when the previous flush happened
+    more than interval milliseconds ago. It is safe to add updates from multiple threads.
+
+    Once the buffer has been closed, updates are written immediately.
+    """
+
+    def __init__(self, batch_size=None, interval=None):
+        self.batch_size = get_default_batch_size() if batch_size is None else batch_size
+        self.interval = get_default_interval() if interval is None else interval
+
+        # model: {pk: {field: value}}
+        self._pending = OrderedDict()
+        self._size = 0
+        self._flushed_at = time.time()
+        self._closed = False
+        self._lock = threading.RLock()
+
+    def add(self, model, pk, **fields):
+        with self._lock:
+            if self._closed:
+                model.objects.filter(pk=pk).update(**fields)
+                return
+
+            objects = self._pending.setdefault(model, OrderedDict())
+            if pk not in objects:
+                objects[pk] = {}
+                self._size += 1
+            objects[pk].update(fields)
+
+            if self._size >= self.batch_size or (time.time() - self._flushed_at) * 1000 >= self.interval:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending, self._size = self._pending, OrderedDict(), 0
+            self._flushed_at = time.time()
+
+            if not pending:
+                return
+
+            with transaction.atomic():
+                for model, objects in pending.items():
+                    self._write(model, objects)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._closed = True
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _write(model, objects):
+        values = OrderedDict()
+        for pk, fields in objects.items():
+            for name, value in fields.items():
+                values.setdefault(name, []).append((pk, value))
+
+        updates = {}
+        for name, pk_values in values.items():
+            field = model._meta.get_field(name)
+
+            # Objects that share the same value are matched by a single condition
+            groups = OrderedDict()
+            for pk, value in pk_values:
+                key = _hashable(value)
+                groups.setdefault(key, (value, []))[1].append(pk)
+
+            if len(groups) == 1 and len(pk_values) == len(objects):
+                value, _ = next(iter(groups.values()))
+                updates[name] = Value(value, output_field=field)
+                continue
+
+            updates[name] = Case(
+                *[When(pk__in=pks, then=Value(value, output_field=field)) for value, pks in groups.values()],
+                default=F(name), output_field=field)
+
+        model.objects.filter(pk__in=list(objects.keys())).update(**updates)
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _get_current_task():
+    """
+    :rtype: asyncio.Task
+    :return: The asyncio task that is running in the current thread (or None)
+    """
+    if asyncio is None:
+        return None
+
+    current_task = getattr(asyncio, 'current_task', None) or asyncio.Task.current_task
+    try:
+        return current_task()
+    except RuntimeError:
+        # There is no event loop in this thread
+        return None
+
+
+def get_buffer():
+    """
+    :rtype: WriteBackBuffer
+    :return: The buffer that is active in the current asyncio task, or else in the current thread (or None)
+    """
+    task = _get_current_task()
+    if task is not None:
+        return _task_buffers.get(task)
+    return getattr(_local, 'buffer', None)
+
+
+@contextmanager
+def activate(buffer):
+    """
+    Makes an existing buffer the active buffer of the current thread (or asyncio task), e.g. in a worker thread of the
+    executor
+    """
+    task = _get_current_task()
+    previous = get_buffer()
+
+    if task is not None:
+        _task_buffers[task] = buffer
+    else:
+        _local.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        if task is None:
+            _local.buffer = previous
+        elif previous is not None:
+            _task_buffers[task] = previous
+        else:
+            _task_buffers.pop(task, None)
+
+
+@contextmanager
+def buffered(batch_size=None, interval=None):
+    """
+    Buffers all updates (see: update) within the block, and flushes them when the block is left. When a buffer is
+    already active, it is reused and flushed by the outermost block.
+    """
+    buffer = get_buffer()
+    if buffer is not None:
+        yield buffer
+        return
+
+    buffer = WriteBackBuffer(batch_size=batch_size, interval=interval)
+    with activate(buffer):
+        try:
+            yield buffer
+        finally:
+            # The remote changes have been made, so they are also recorded when the synchronization fails halfway
+            buffer.close()
+
+
+def update(model, pk, **fields):
+    """
+    Updates the fields of a single object, without triggering the save signal. The update is buffered when a buffer is
+    active in the current thread (or asyncio task), otherwise it is written immediately.
+    """
+    buffer = get_buffer()
+    if buffer is not None:
+        buffer.add(model, pk, **fields)
+    else:
+        model.objects.filter(pk=pk).update(**fields)
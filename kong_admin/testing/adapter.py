@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import json
+import threading
+import time
+
+import six
+from six.moves.urllib.parse import urlparse, parse_qs
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .fake import FakeKongAdmin
+
+
+def build_response(request, status, content):
+    """
+    :param request: The request to answer
+    :type request: requests.PreparedRequest
+    :param status: The status code
+    :type status: int
+    :param content: The (JSON) body of the response
+    :type content: six.text_type
+    :rtype: requests.Response
+    """
+    response = Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict({'Content-Type': 'application/json; charset=utf-8'})
+    response._content = content.encode('utf-8')
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class FakeKongAdapter(BaseAdapter):
+    """
+    A requests transport adapter that answers every request with a FakeKongAdmin, after an (optional) latency. Mounted
+    on a requests session (e.g. by kong_admin.client.KongClientProvider), the regular python-kong clients can be used
+    against the fake, without a network or a Kong node.
+
+    It counts the requests it has handled (in total and per method), so callers can measure how many admin calls an
+    operation takes.
+    """
+
+    def __init__(self, fake=None, latency=0):
+        """
+        :param fake: The fake to answer the requests with (defaults to a new, empty fake)
+        :type fake: FakeKongAdmin
+        :param latency: The time (in s) every request takes, or a callable that returns it
+        :type latency: float
+        """
+        super(FakeKongAdapter, self).__init__()
+        self.fake = fake if fake is not None else FakeKongAdmin()
+        self.latency = latency
+
+        self.requests = 0
+        self.requests_per_method = {}
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        url = urlparse(request.url)
+        path = url.path
+        prefix = urlparse(self.fake.base_url).path.rstrip('/')
+        if prefix and path.startswith(prefix):
+            path = path[len(prefix):]
+
+        body = request.body or ''
+        if isinstance(body, six.binary_type):
+            body = body.decode('utf-8')
+
+        with self._lock:
+            self.requests += 1
+            self.requests_per_method[request.method] = self.requests_per_method.get(request.method, 0) + 1
+
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency > 0:
+            time.sleep(latency)
+
+        status, content = self.fake.handle(
+            request.method, path, params=parse_qs(url.query), data=parse_qs(body, keep_blank_values=True))
+
+        return build_response(request, status, json.dumps(content) if content is not None else '')
+
+    def close(self):
+        pass
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.requests_per_method = {}
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import six
+
+OK = 200
+CREATED = 201
+NO_CONTENT = 204
+BAD_REQUEST = 400
+NOT_FOUND = 404
+METHOD_NOT_ALLOWED = 405
+CONFLICT = 409
+
+BOOLEAN_FIELDS = ('strip_request_path', 'preserve_host', 'enabled')
+
+
+class FakeKongAdmin(object):
+    """
+    An in-memory implementation of the (0.5.x) Kong admin API, for APIs, plugin configurations, consumers and their
+    basic-auth, key-auth and oauth2 credentials.
+
+    It works on the level of HTTP requests: handle() takes a method, a path, query parameters and (form) data and
+    returns a status code together with the decoded response body. This makes it usable behind any transport, both in
+    process and behind a (local) HTTP server. It is safe to use from multiple threads.
+    """
+
+    # entity: (parent entity, parent key, fields that should be unique, field that can be used instead of the id)
+    ENTITIES = {
+        'apis': (None, None, ('name', 'request_host'), 'name'),
+        'consumers': (None, None, ('username', 'custom_id'), 'username'),
+        'plugins': ('apis', 'api_id', (), None),
+        'basicauth': ('consumers', 'consumer_id', ('username',), None),
+        'keyauth': ('consumers', 'consumer_id', ('key',), None),
+        'oauth2': ('consumers', 'consumer_id', ('client_id',), None),
+    }
+
+    def __init__(self, base_url='http://localhost:8001'):
+        self.base_url = base_url.rstrip('/')
+        self._data = dict((entity, OrderedDict()) for entity in self.ENTITIES)
+        self._lock = threading.RLock()
+
+    def handle(self, method, path, params=None, data=None):
+        """
+        :param method: The HTTP method
+        :type method: six.text_type
+        :param path: The path of the request, e.g. /apis/<name_or_id>/plugins/
+        :type path: six.text_type
+        :param params: The query parameters
+        :type params: dict
+        :param data: The (form) data of the request
+        :type data: dict
+        :rtype: tuple
+        :return: A tuple containing the status code and the response body (or None)
+        """
+        method = method.upper()
+        params = self._flatten(params or {})
+        data = self._flatten(data or {})
+        segments = [segment for segment in path.split('/') if segment]
+
+        with self._lock:
+            if not segments:
+                return OK, {'tagline': 'Welcome to Kong (fake)', 'version': '0.5.4'}
+
+            if segments[0] not in ('apis', 'consumers') or len(segments) > 4:
+                return NOT_FOUND, {'message': 'Not found'}
+
+            entity, parent_id = segments[0], None
+            if len(segments) >= 3:
+                parent = self._get(segments[0], segments[1])
+                if parent is None or self.ENTITIES.get(segments[2], (None,))[0] != segments[0]:
+                    return NOT_FOUND, {'message': 'Not found'}
+                entity, parent_id = segments[2], parent['id']
+
+            if len(segments) in (1, 3):
+                if method == 'GET':
+                    return self._list(entity, parent_id, params)
+                if method == 'POST':
+                    return self._create(entity, parent_id, data)
+                if method == 'PUT':
+                    if data.get('id'):
+                        return self._update(entity, parent_id, data['id'], data, replace=True)
+                    return self._create(entity, parent_id, data)
+                return METHOD_NOT_ALLOWED, {'message': 'Method not allowed'}
+
+            name_or_id = segments[-1]
+            if method == 'GET':
+                obj = self._get(entity, name_or_id, parent_id)
+                return (OK, dict(obj)) if obj is not None else (NOT_FOUND, {'message': 'Not found'})
+            if method == 'PATCH':
+                return self._update(entity, parent_id, name_or_id, data)
+            if method == 'DELETE':
+                return self._delete(entity, parent_id, name_or_id)
+            return METHOD_NOT_ALLOWED, {'message': 'Method not allowed'}
+
+    def count(self, entity):
+        with self._lock:
+            return len(self._data[entity])
+
+    def _list(self, entity, parent_id, params):
+        parent_key = self.ENTITIES[entity][1]
+        objects = [obj for obj in self._data[entity].values() if parent_key is None or obj[parent_key] == parent_id]
+
+        size = int(params.get('size', 100))
+        start = 0
+        if params.get('offset'):
+            ids = [obj['id'] for obj in objects]
+            if params['offset'] not in ids:
+                return BAD_REQUEST, {'message': 'Invalid offset'}
+            start = ids.index(params['offset'])
+
+        result = {
+            'data': [dict(obj) for obj in objects[start:start + size]],
+            'total': len(objects)
+        }
+
+        if start + size < len(objects):
+            next_offset = objects[start + size]['id']
+            result['offset'] = next_offset
+            result['next'] = '%s/%s?size=%d&offset=%s' % (
+                self.base_url, self._collection_path(entity, parent_id), size, next_offset)
+
+        return OK, result
+
+    def _create(self, entity, parent_id, data):
+        obj, errors = self._prepare(entity, parent_id, data, {})
+        if errors:
+            return BAD_REQUEST, errors
+
+        conflicts = self._conflicts(entity, parent_id, obj)
+        if conflicts:
+            return CONFLICT, conflicts
+
+        obj['id'] = six.text_type(uuid.uuid4())
+        obj['created_at'] = int(time.time() * 1000)
+        self._data[entity][obj['id']] = obj
+        return CREATED, dict(obj)
+
+    def _update(self, entity, parent_id, name_or_id, data, replace=False):
+        current = self._get(entity, name_or_id, parent_id)
+        if current is None:
+            return NOT_FOUND, {'message': 'Not found'}
+
+        obj, errors = self._prepare(entity, parent_id, data, {} if replace else current)
+        if errors:
+            return BAD_REQUEST, errors
+
+        obj['id'] = current['id']
+        obj['created_at'] = current['created_at']
+
+        conflicts = self._conflicts(entity, parent_id, obj)
+        if conflicts:
+            return CONFLICT, conflicts
+
+        self._data[entity][obj['id']] = obj
+        return OK, dict(obj)
+
+    def _delete(self, entity, parent_id, name_or_id):
+        obj = self._get(entity, name_or_id, parent_id)
+        if obj is None:
+            return NOT_FOUND, {'message': 'Not found'}
+
+        del self._data[entity][obj['id']]
+
+        # Cascade
+        for child_entity, (parent_entity, parent_key, _, _) in self.ENTITIES.items():
+            if parent_entity == entity:
+                for child in list(self._data[child_entity].values()):
+                    if child[parent_key] == obj['id']:
+                        del self._data[child_entity][child['id']]
+
+        return NO_CONTENT, None
+
+    def _get(self, entity, name_or_id, parent_id=None):
+        parent_key, lookup = self.ENTITIES[entity][1], self.ENTITIES[entity][3]
+
+        obj = self._data[entity].get(name_or_id)
+        if obj is None and lookup is not None:
+            obj = next((o for o in self._data[entity].values() if o.get(lookup) == name_or_id), None)
+
+        if obj is not None and parent_key is not None and obj[parent_key] != parent_id:
+            return None
+        return obj
+
+    def _conflicts(self, entity, parent_id, obj):
+        errors = {}
+        unique = self.ENTITIES[entity][2]
+
+        for other in self._data[entity].values():
+            if other['id'] == obj.get('id'):
+                continue
+            for key in unique:
+                if obj.get(key) is not None and other.get(key) == obj[key]:
+                    errors[key] = 'already exists with value \'%s\'' % obj[key]
+            if entity == 'plugins' and other['api_id'] == parent_id and other['name'] == obj['name'] and \
+                    other.get('consumer_id') == obj.get('consumer_id'):
+                errors['name'] = 'Plugin configuration already exists'
+
+        return errors
+
+    def _prepare(self, entity, parent_id, data, current):
+        obj = dict(current)
+        for key, value in data.items():
+            if key in ('id', 'config') or key.startswith('config.') or value is None:
+                continue
+            obj[key] = self._bool(value) if key in BOOLEAN_FIELDS else value
+
+        errors = {}
+        parent_key = self.ENTITIES[entity][1]
+        if parent_key is not None:
+            obj[parent_key] = parent_id
+
+        if entity == 'apis':
+            obj.setdefault('strip_request_path', False)
+            obj.setdefault('preserve_host', False)
+            if not obj.get('upstream_url'):
+                errors['upstream_url'] = 'upstream_url is required'
+            if not obj.get('request_host') and not obj.get('request_path'):
+                errors['request_host'] = 'At least a \'request_host\' or a \'request_path\' must be specified'
+            if not obj.get('name'):
+                obj['name'] = obj.get('request_host') or (obj.get('request_path') or '').strip('/')
+        elif entity == 'consumers':
+            if not obj.get('username') and not obj.get('custom_id'):
+                errors['username'] = 'At least a \'custom_id\' or a \'username\' must be specified'
+        elif entity == 'plugins':
+            if not obj.get('name'):
+                errors['name'] = 'name is required'
+            config = dict(current.get('config', {}))
+            if isinstance(data.get('config'), dict):
+                config.update(data['config'])
+            for key, value in data.items():
+                if key.startswith('config.'):
+                    config[key[len('config.'):]] = self._value(value)
+            obj['config'] = config
+            obj.setdefault('enabled', True)
+        elif entity == 'basicauth':
+            for key in ('username', 'password'):
+                if not obj.get(key):
+                    errors[key] = '%s is required' % key
+        elif entity == 'keyauth':
+            obj['key'] = obj.get('key') or uuid.uuid4().hex
+        elif entity == 'oauth2':
+            for key in ('name', 'redirect_uri'):
+                if not obj.get(key):
+                    errors[key] = '%s is required' % key
+            obj['client_id'] = obj.get('client_id') or uuid.uuid4().hex
+            obj['client_secret'] = obj.get('client_secret') or uuid.uuid4().hex
+
+        return obj, errors
+
+    def _collection_path(self, entity, parent_id):
+        parent_entity = self.ENTITIES[entity][0]
+        if parent_entity is None:
+            return entity
+        return '%s/%s/%s' % (parent_entity, parent_id, entity)
+
+    @staticmethod
+    def _flatten(values):
+        # Query strings and form data can contain lists of values
+        return dict((key, value[0] if isinstance(value, (list, tuple)) and len(value) == 1 else value)
+                    for key, value in values.items())
+
+    @staticmethod
+    def _bool(value):
+        if isinstance(value, six.string_types):
+            return value.lower() == 'true'
+        return bool(value)
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, six.string_types):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+        return value
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import math
+import random
+
+# Latency distributions: callables that return the time (in s) a request takes. All of them accept a random.Random, so
+# a run can be repeated with the same latencies.
+
+
+def constant(seconds):
+    return lambda: seconds
+
+
+def uniform(low, high, rng=None):
+    rng = rng or random
+    return lambda: rng.uniform(low, high)
+
+
+def normal(mean, stddev, rng=None):
+    rng = rng or random
+    return lambda: max(0, rng.gauss(mean, stddev))
+
+
+def exponential(mean, rng=None):
+    rng = rng or random
+    return lambda: rng.expovariate(1.0 / mean) if mean > 0 else 0
+
+
+def lognormal(median, sigma, rng=None):
+    """
+    Mostly close to the median, with a long tail of slow requests, which is what the latency of a real Kong node under
+    load looks like
+    """
+    rng = rng or random
+    return lambda: median * math.exp(rng.gauss(0, sigma))
+
+
+DISTRIBUTIONS = {
+    'constant': constant,
+    'uniform': uniform,
+    'normal': normal,
+    'exponential': exponential,
+    'lognormal': lognormal,
+}
+
+
+def parse(spec, rng=None):
+    """
+    :param spec: A latency (in s), e.g. 0.01, or a distribution and its parameters, e.g. uniform:0.005,0.05 or
+        lognormal:0.02,0.5
+    :type spec: six.text_type
+    :rtype: callable
+    """
+    name, _, parameters = spec.partition(':')
+    if not parameters:
+        return constant(float(name))
+
+    if name not in DISTRIBUTIONS:
+        raise ValueError('Unknown latency distribution: %s (choose from: %s)' % (
+            name, ', '.join(sorted(DISTRIBUTIONS.keys()))))
+
+    parameters = [float(value) for value in parameters.split(',')]
+    if name == 'constant':
+        return constant(*parameters)
+    return DISTRIBUTIONS[name](*parameters, rng=rng)
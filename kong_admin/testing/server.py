@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+A stand-alone HTTP server that serves a FakeKongAdmin, so the Kong clients can be load tested on a laptop, with
+realistic network costs: every request goes through a socket and a (keep-alive) connection pool.
+
+    python -m kong_admin.testing.server --port 8001 --latency lognormal:0.02,0.5 --max-connections 10 --error-rate 0.01
+
+Point KONG_ADMIN_URL to it (e.g. http://localhost:8001), and kong_admin.factory.get_kong_client returns a client for
+it. The counters of the server are served at /_fake/stats (and reset by a DELETE request to that url).
+"""
+from __future__ import unicode_literals, print_function
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import urlparse, parse_qs
+
+from . import latency as latency_distributions
+from .fake import FakeKongAdmin
+
+logger = logging.getLogger(__name__)
+
+STATS_PATH = '/_fake/stats'
+
+INTERNAL_SERVER_ERROR = 500
+
+
+class FakeKongServer(object):
+    """
+    Serves a FakeKongAdmin over HTTP, on a background thread. Every request is handled on a thread of its own.
+
+    Requests can be slowed down (see: kong_admin.testing.latency), limited to max_connections at a time (others wait for
+    a free slot, as they would in the listen backlog of a saturated node), answered with a 500 error (error_rate) or
+    dropped without a response (drop_rate). Failures are injected before a request is handled, so they never change
+    the state of the fake.
+    """
+
+    def __init__(self, fake=None, host='127.0.0.1', port=0, latency=0, max_connections=None, error_rate=0,
+                 drop_rate=0, seed=None):
+        """
+        :param fake: The fake to serve (defaults to a new, empty fake)
+        :type fake: FakeKongAdmin
+        :param port: The port to listen on (0: any free port, see: url)
+        :type port: int
+        :param latency: The time (in s) every request takes, or a callable that returns it
+        :type latency: float
+        :param max_connections: The maximum number of requests that are handled at the same time (None: unlimited)
+        :type max_connections: int
+        :param error_rate: The fraction of the requests that fail with a 500 error
+        :type error_rate: float
+        :param drop_rate: The fraction of the requests whose connection is closed without a response
+        :type drop_rate: float
+        :param seed: The seed of the random failures
+        :type seed: int
+        """
+        self.latency = latency
+        self.max_connections = max_connections
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+
+        self._random = random.Random(seed)
+        self._slots = threading.Semaphore(max_connections) if max_connections else None
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.httpd = _HTTPServer((host, port), _RequestHandler)
+        self.httpd.fake_server = self
+        self.fake = fake if fake is not None else FakeKongAdmin()
+        # The fake builds the urls of the next pages of its listings
+        self.fake.base_url = self.url
+
+        self.reset_stats()
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'requests_per_method': dict(self._requests_per_method),
+                'errors': self._errors,
+                'dropped': self._dropped,
+                'in_flight': self._in_flight,
+                'max_in_flight': self._max_in_flight,
+                'queued': self._queued,
+                'max_queued': self._max_queued,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._requests = 0
+            self._requests_per_method = {}
+            self._errors = 0
+            self._dropped = 0
+            self._in_flight = 0
+            self._max_in_flight = 0
+            self._queued = 0
+            self._max_queued = 0
+
+    def handle(self, method, path, params, data):
+        """
+        :rtype: tuple
+        :return: The status code and response body (see: FakeKongAdmin.handle), or None to drop the request
+        """
+        with self._lock:
+            self._requests += 1
+            self._requests_per_method[method] = self._requests_per_method.get(method, 0) + 1
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+        if self._slots is not None:
+            self._slots.acquire()
+
+        with self._lock:
+            self._queued -= 1
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+            failure = self._random.random()
+
+        try:
+            latency = self.latency() if callable(self.latency) else self.latency
+            if latency > 0:
+                time.sleep(latency)
+
+            if failure < self.drop_rate:
+                with self._lock:
+                    self._dropped += 1
+                return None
+
+            if failure < self.drop_rate + self.error_rate:
+                with self._lock:
+                    self._errors += 1
+                return INTERNAL_SERVER_ERROR, {'message': 'An unexpected error occurred (injected)'}
+
+            return self.fake.handle(method, path, params=params, data=data)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+
+class _HTTPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    # Load tests open many connections at once
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients close their keep-alive connections whenever they like
+        logger.debug('Error while handling a request of %s:%d' % client_address[:2], exc_info=True)
+
+
+class _RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # Keeps the connections alive, like Kong does
+    protocol_version = 'HTTP/1.1'
+
+    def do_request(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+
+        if url.path.rstrip('/') == STATS_PATH:
+            if self.command == 'DELETE':
+                self.server.fake_server.reset_stats()
+            return self.respond(200, self.server.fake_server.stats())
+
+        if 'json' in (self.headers.get('Content-Type') or ''):
+            data = json.loads(body) if body else {}
+        else:
+            data = parse_qs(body, keep_blank_values=True)
+
+        response = self.server.fake_server.handle(self.command, url.path, parse_qs(url.query), data)
+        if response is None:
+            self.close_connection = True
+            return
+        self.respond(*response)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_request
+
+    def respond(self, status, body):
+        content = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        logger.debug('%s - %s' % (self.address_string(), format % args))
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m kong_admin.testing.server', description='Serves a fake Kong admin API over HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='The address to listen on')
+    parser.add_argument('--port', type=int, default=8001, help='The port to listen on')
+    parser.add_argument('--latency', default='0',
+                        help='The latency (in s) of every request, or a distribution, e.g. uniform:0.005,0.05, '
+                             'normal:0.02,0.005 or lognormal:0.02,0.5')
+    parser.add_argument('--max-connections', type=int, default=None,
+                        help='The maximum number of requests that are handled at the same time')
+    parser.add_argument('--error-rate', type=float, default=0, help='The fraction of requests that fail with a 500')
+    parser.add_argument('--drop-rate', type=float, default=0,
+                        help='The fraction of requests that are dropped without a response')
+    parser.add_argument('--seed', type=int, default=None, help='The seed of the latencies and failures')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False, help='Log every request')
+    return parser
+
+
+def main(argv=None):
+    options = get_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if options.verbose else logging.INFO)
+
+    server = FakeKongServer(
+        host=options.host, port=options.port,
+        latency=latency_distributions.parse(options.latency, rng=random.Random(options.seed)),
+        max_connections=options.max_connections, error_rate=options.error_rate, drop_rate=options.drop_rate,
+        seed=options.seed)
+
+    print('Serving a fake Kong admin API at %s (stats: %s%s)' % (server.url, server.url, STATS_PATH))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import json
+import threading
+import time
+from collections import deque
+
+from requests.adapters import BaseAdapter
+
+# Traces are recorded at runtime (see: kong_sync --record-trace), they are only replayed by tests and benchmarks
+from ..sync.trace import TRACE_VERSION, UUID_PATTERN, TraceEntry, Trace, RecordingAdapter, get_template, _decode
+from .adapter import build_response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Answers the admin calls from a recorded trace, after the recorded latency (times latency_scale), so the sync
+    engines can run against the responses of a real Kong node without one.
+
+    A call is answered by the first unused entry with the same method and path (including the query string). When
+    there is none, e.g. because the ids of the local objects differ, it is answered by the first unused entry with the
+    same template (see: get_template), or else with a 404. The calls that have been replayed are recorded in a trace
+    of their own, so they can be compared to the original (see: diff).
+    """
+
+    def __init__(self, trace, latency_scale=1.0):
+        """
+        :param trace: The trace to replay
+        :type trace: Trace
+        :param latency_scale: The factor by which the recorded latencies are multiplied (0: no latency)
+        :type latency_scale: float
+        """
+        super(ReplayAdapter, self).__init__()
+        self.recorded = trace
+        self.latency_scale = latency_scale
+        self.trace = Trace()
+
+        self._used = set()
+        self._by_path = {}
+        self._by_template = {}
+        for i, entry in enumerate(trace.entries):
+            self._by_path.setdefault((entry.method, entry.path), deque()).append(i)
+            self._by_template.setdefault(get_template(entry.method, entry.path), deque()).append(i)
+
+        self._started_at = None
+        self._lock = threading.Lock()
+
+    def send(self, request, *args, **kwargs):
+        started_at = time.time()
+        path, data = _decode(request)
+
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = started_at
+            entry = self._next(self._by_path.get((request.method, path))) or \
+                self._next(self._by_template.get(get_template(request.method, path)))
+
+        if entry is None:
+            status, body = 404, json.dumps({'message': 'Not recorded: %s %s' % (request.method, path)})
+        else:
+            status, body = entry.status, entry.body
+            if self.latency_scale > 0:
+                time.sleep(entry.duration * self.latency_scale)
+
+        self.trace.append(TraceEntry(
+            started_at - self._started_at, time.time() - started_at, request.method, path, data, status, body))
+        return build_response(request, status, body)
+
+    def _next(self, queue):
+        while queue:
+            i = queue.popleft()
+            if i not in self._used:
+                self._used.add(i)
+                return self.recorded.entries[i]
+        return None
+
+    def close(self):
+        pass
+
+    def diff(self):
+        """
+        :rtype: list
+        :return: The templates that have been called more or less often than in the recorded trace (see: diff)
+        """
+        return diff(self.recorded, self.trace)
+
+
+def diff(expected, actual):
+    """
+    :param expected: The recorded trace
+    :type expected: Trace
+    :param actual: The trace of a later run
+    :type actual: Trace
+    :rtype: list
+    :return: (template, expected count, actual count) tuples, for every template of which the counts differ
+    """
+    expected, actual = expected.counts(), actual.counts()
+    return [(template, expected[template], actual[template])
+            for template in sorted(set(expected) | set(actual)) if expected[template] != actual[template]]
+
+
+def format_diff(differences):
+    """
+    :rtype: six.text_type
+    """
+    return '\n'.join('%s: %d calls, %d recorded (%+d)' % (template, actual, expected, actual - expected)
+                     for template, expected, actual in differences)
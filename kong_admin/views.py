@@ -2,6 +2,7 @@
 from __future__ import unicode_literals, print_function
 from contextlib import closing
 import json
+import time
 
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
@@ -9,9 +10,12 @@ from django.http.response import HttpResponseRedirect
 from django.shortcuts import render
 from django.http.response import HttpResponse
 
-from . import logic, factory
+from . import logic, factory, metrics
 from .models import APIReference, ConsumerReference
 
+# The maximum number of failed objects that is reported after synchronizing multiple references
+MAX_ERROR_MESSAGES = 10
+
 
 @staff_member_required
 def synchronize_api_references(request, queryset=None):
@@ -63,17 +67,46 @@ def show_config(request):
     return render(request, 'kong_admin/show_config.html', {'config': config})
 
 
+@staff_member_required
+def show_metrics(request):
+    """
+    This view shows the metrics of the synchronizations, in the Prometheus text exposition format (see:
+    kong_admin.metrics.metrics_view, which does not require a login)
+    """
+    return metrics.metrics_view(request)
+
+
 def _synchronize_multiple_references(request, sync_func, entity_name, queryset=None):
+    started_at = time.time()
     try:
         with closing(factory.get_kong_client()) as client:
-            queryset = sync_func(client, queryset=queryset)
+            # A single bad reference should not keep all others from being synchronized. All objects are published, so
+            # changes that have been made in Kong itself are repaired.
+            result = sync_func(client, queryset=queryset, incremental=False, continue_on_error=True)
     except Exception as e:
         messages.add_message(
             request, messages.ERROR, 'Could not synchronize %s References: %s' % (entity_name, str(e)))
+        return HttpResponseRedirect(request.META["HTTP_REFERER"])
+
+    elapsed = time.time() - started_at
+    summary = 'published: %d, withdrawn: %d, skipped: %d, failed: %d' % (
+        result.published, result.withdrawn, result.skipped, result.failed)
+
+    if result.failed:
+        messages.add_message(
+            request, messages.WARNING, 'Synchronized %s References with errors in %.2fs (%s)' % (
+                entity_name, elapsed, summary))
+        for outcome in result.errors[:MAX_ERROR_MESSAGES]:
+            messages.add_message(request, messages.ERROR, 'Could not synchronize %s Reference %s: %s (after %.2fs)' % (
+                entity_name, outcome.obj if outcome.obj is not None else outcome.kong_id, outcome.error,
+                outcome.duration))
+        if result.failed > MAX_ERROR_MESSAGES:
+            messages.add_message(request, messages.ERROR, '... and %d other %s References' % (
+                result.failed - MAX_ERROR_MESSAGES, entity_name))
     else:
         messages.add_message(
-            request, messages.SUCCESS, 'Successfully synchronized %d %s References (it can take a while before the '
-                                       'changes are visible!)' % (queryset.count(), entity_name))
+            request, messages.SUCCESS, 'Successfully synchronized %s References in %.2fs (%s). It can take a while '
+                                       'before the changes are visible!' % (entity_name, elapsed, summary))
     return HttpResponseRedirect(request.META["HTTP_REFERER"])
 
 
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import sys
+import unittest
+
+import mock
+from django.test import TestCase, SimpleTestCase
+
+from kong_admin import models
+from kong_admin.enums import Plugins
+from kong_admin.testing.fake import FakeKongAdmin
+
+from .factories import APIReferenceFactory, PluginConfigurationReferenceFactory, ConsumerReferenceFactory, \
+    BasicAuthReferenceFactory, KeyAuthReferenceFactory
+from .fake import fake
+
+# The asyncio engines use async def, which is a syntax error before Python 3.5
+ASYNCIO = sys.version_info >= (3, 5)
+
+if ASYNCIO:
+    import asyncio
+
+    from kong_admin.sync.aio.apis import AsyncAPISyncEngine
+    from kong_admin.sync.aio.client import AsyncKongAdminClient
+    from kong_admin.sync.aio.consumers import AsyncConsumerSyncEngine
+    from kong_admin.sync.aio.executor import execute
+    from kong_admin.sync.aio.transport import FakeTransport, LimitedTransport
+
+from kong_admin.limiter import AdminLimiter
+from kong_admin.sync import writeback
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+@unittest.skipUnless(ASYNCIO, 'asyncio engines require Python 3.5+')
+class AsyncSyncEngineTestCase(TestCase):
+    def setUp(self):
+        self.fake_kong = FakeKongAdmin()
+        self.transport = FakeTransport(self.fake_kong)
+        self.client = AsyncKongAdminClient(self.transport)
+
+    def _create_api_ref(self):
+        return APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+
+    def test_synchronize_apis(self):
+        api_refs = [self._create_api_ref() for _ in range(5)]
+        PluginConfigurationReferenceFactory(api=api_refs[0], plugin=Plugins.RATE_LIMITING, config={'second': 5})
+
+        # A remote API without a local counterpart
+        self.fake_kong.handle('POST', '/apis/', data={'upstream_url': fake.url(), 'request_host': fake.domain_name()})
+
+        result = run(AsyncAPISyncEngine().synchronize(self.client, delete=True, concurrency=3))
+
+        self.assertEqual(result.published, 5)
+        self.assertEqual(result.withdrawn, 1)
+        self.assertEqual(self.fake_kong.count('apis'), 5)
+        self.assertEqual(self.fake_kong.count('plugins'), 1)
+
+        for api_ref in models.APIReference.objects.all():
+            self.assertTrue(api_ref.synchronized)
+            self.assertIsNotNone(api_ref.kong_id)
+
+        plugin_ref = models.PluginConfigurationReference.objects.get()
+        self.assertEqual(
+            run(self.client.plugins(plugin_ref.api.kong_id).retrieve(plugin_ref.kong_id))['config'], {'second': 5})
+
+    def test_reconcile_only_writes_changes(self):
+        for _ in range(3):
+            self._create_api_ref()
+        run(AsyncAPISyncEngine().synchronize(self.client, delete=True))
+
+        requests = self.transport.requests
+        result = run(AsyncAPISyncEngine().synchronize(self.client, delete=True, reconcile=True))
+
+        self.assertEqual(result.skipped, 3)
+        self.assertEqual(result.published, 0)
+
+        # A single (paginated) listing of the remote APIs
+        self.assertEqual(self.transport.requests, requests + 1)
+
+    def test_retrieve_all_per_page(self):
+        for _ in range(5):
+            self.fake_kong.handle(
+                'POST', '/apis/', data={'upstream_url': fake.url(), 'request_host': fake.domain_name()})
+
+        engine = AsyncAPISyncEngine()
+        with self.settings(KONG_ADMIN_SYNC_PAGE_SIZE=2):
+            run(engine.on_retrieve_all(self.client).__anext__())
+            # The next pages are only retrieved when the objects of the first page have been consumed
+            self.assertEqual(self.transport.requests, 1)
+
+            kong_structs = run(engine.retrieve_for_plan(self.client))
+
+        self.assertEqual(self.transport.requests, 4)
+        self.assertEqual(len(kong_structs), 5)
+        # Only the fields that a plan reads are kept
+        self.assertTrue(set(kong_structs[0]) <= set(('id',) + engine.get_compared_fields()))
+        self.assertNotIn('created_at', kong_structs[0])
+
+    def test_withdraw_api(self):
+        api_ref = self._create_api_ref()
+        PluginConfigurationReferenceFactory(api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': 5})
+        run(AsyncAPISyncEngine().publish(self.client, api_ref))
+
+        run(AsyncAPISyncEngine().withdraw(self.client, api_ref))
+
+        self.assertEqual(self.fake_kong.count('apis'), 0)
+        self.assertEqual(self.fake_kong.count('plugins'), 0)
+        self.assertIsNone(models.APIReference.objects.get(id=api_ref.id).kong_id)
+
+    def test_write_back_buffer_per_task(self):
+        api_refs = [self._create_api_ref() for _ in range(4)]
+        self.transport.latency = 0.001
+        buffers = {}
+        after_publish = AsyncAPISyncEngine.after_publish
+
+        def record_buffer(engine, client, obj):
+            buffers[obj.id] = writeback.get_buffer()
+            return after_publish(engine, client, obj)
+
+        engine = AsyncAPISyncEngine()
+        with mock.patch.object(AsyncAPISyncEngine, 'after_publish', record_buffer):
+            # Two synchronizations on the same event loop, whose calls to Kong interleave
+            run(asyncio.gather(
+                engine.synchronize(self.client, queryset=models.APIReference.objects.filter(
+                    id__in=[api_ref.id for api_ref in api_refs[:2]]), concurrency=2),
+                engine.synchronize(self.client, queryset=models.APIReference.objects.filter(
+                    id__in=[api_ref.id for api_ref in api_refs[2:]]), concurrency=2)))
+
+        self.assertIs(buffers[api_refs[0].id], buffers[api_refs[1].id])
+        self.assertIs(buffers[api_refs[2].id], buffers[api_refs[3].id])
+        self.assertIsNot(buffers[api_refs[0].id], buffers[api_refs[2].id])
+
+        # Both buffers have been flushed, and no buffer is left active
+        self.assertEqual(models.APIReference.objects.filter(synchronized=True).count(), 4)
+        self.assertIsNone(writeback.get_buffer())
+
+    def test_synchronize_consumers(self):
+        consumer_ref = ConsumerReferenceFactory(username=fake.user_name(), custom_id=fake.uuid4())
+        BasicAuthReferenceFactory(consumer=consumer_ref, username=fake.user_name(), password=fake.password())
+        KeyAuthReferenceFactory(consumer=consumer_ref, key=fake.uuid4())
+
+        result = run(AsyncConsumerSyncEngine().synchronize(self.client, delete=True))
+
+        self.assertEqual(result.published, 1)
+        self.assertEqual(self.fake_kong.count('consumers'), 1)
+        self.assertEqual(self.fake_kong.count('basicauth'), 1)
+        self.assertEqual(self.fake_kong.count('keyauth'), 1)
+
+        # Remote credentials without a local counterpart are removed when the consumer is published again
+        consumer_ref = models.ConsumerReference.objects.get(id=consumer_ref.id)  # reloads!!
+        run(self.client.key_auth(consumer_ref.kong_id).create_or_update(key=fake.uuid4()))
+        run(AsyncConsumerSyncEngine().publish(self.client, consumer_ref))
+
+        self.assertEqual(self.fake_kong.count('keyauth'), 1)
+
+
+@unittest.skipUnless(ASYNCIO, 'asyncio engines require Python 3.5+')
+class AsyncExecutorTestCase(SimpleTestCase):
+    def test_bounded_concurrency(self):
+        state = {'running': 0, 'max_running': 0}
+        processed = []
+
+        def done(item):
+            processed.append(item)
+            state['running'] -= 1
+
+        def func(item):
+            state['running'] += 1
+            state['max_running'] = max(state['max_running'], state['running'])
+
+            future = asyncio.ensure_future(asyncio.sleep(0.001))
+            future.add_done_callback(lambda _: done(item))
+            return future
+
+        run(execute(func, range(50), concurrency=8))
+
+        self.assertEqual(sorted(processed), list(range(50)))
+        self.assertEqual(state['max_running'], 8)
+
+    def test_first_error_is_raised(self):
+        def func(item):
+            if item == 3:
+                raise ValueError(item)
+            return asyncio.sleep(0)
+
+        with self.assertRaises(ValueError):
+            run(execute(func, range(20), concurrency=4))
+
+
+@unittest.skipUnless(ASYNCIO, 'asyncio engines require Python 3.5+')
+class LimitedTransportTestCase(SimpleTestCase):
+    def test_window_bounds_concurrency(self):
+        limiter = AdminLimiter(rate=0, max_concurrency=2, latency_threshold=0)
+        transport = LimitedTransport(FakeTransport(latency=0.01), limiter)
+        in_flight = []
+
+        def handle(*args, **kwargs):
+            in_flight.append(limiter.in_flight)
+            return 200, {}
+
+        with mock.patch.object(transport.transport.fake, 'handle', side_effect=handle):
+            run(asyncio.gather(*[transport.request('GET', '/apis/') for _ in range(6)]))
+
+        self.assertEqual(len(in_flight), 6)
+        self.assertEqual(max(in_flight), 2)
+        self.assertEqual(limiter.queue_depth, 0)
+
+    def test_server_errors_shrink_the_window(self):
+        limiter = AdminLimiter(rate=0, max_concurrency=8, latency_threshold=0)
+        transport = LimitedTransport(FakeTransport(), limiter)
+
+        with mock.patch.object(transport.transport.fake, 'handle', return_value=(503, None)):
+            self.assertEqual(run(transport.request('GET', '/apis/')), (503, None))
+
+        self.assertEqual(limiter.window, 4)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+from django.test import TestCase
+
+from benchmarks import baselines
+from benchmarks.runner import Benchmark, Measurement
+from kong_admin.sync.retry import reset_circuit_breakers
+
+
+class BenchmarkTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+
+    def test_run(self):
+        benchmark = Benchmark(apis=2, plugins=2, consumers=2, credentials=3, latency=0)
+
+        measurements = benchmark.run()
+
+        self.assertEqual([m.scenario for m in measurements], list(benchmark.get_scenarios().keys()))
+        measurements = dict((m.scenario, m) for m in measurements)
+        # A list of the APIs, and per API: a create, a list of its plugins and a create per plugin
+        self.assertEqual(measurements['synchronize_apis'].requests, 1 + 2 * (1 + 1 + 2))
+        self.assertEqual(measurements['resynchronize_apis'].requests, 1)
+
+        # The first API and consumer have been withdrawn again
+        self.assertEqual(benchmark.adapter.fake.count('plugins'), 2)
+        self.assertEqual(benchmark.adapter.fake.count('keyauth'), 1)
+
+    def test_compare(self):
+        baseline = {'synchronize_apis': {'duration': 1.0, 'requests': 10, 'queries': 20, 'memory': None}}
+
+        self.assertEqual(baselines.compare([Measurement('synchronize_apis', 1.4, 10, 19, 1024)], baseline), [])
+        self.assertEqual(baselines.compare([Measurement('other', 10, 100, 100, None)], baseline), [])
+
+        regressions = baselines.compare([Measurement('synchronize_apis', 1.6, 11, 20, None)], baseline)
+        self.assertEqual(regressions, [
+            'synchronize_apis: requests is 11, the baseline is 10',
+            'synchronize_apis: duration is 1.600s, the baseline is 1.000s',
+        ])
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import threading
+
+import mock
+from django.test import TestCase, override_settings
+from kong.simulator import KongAdminSimulator
+
+from kong_admin import client as kong_client
+from kong_admin.client import KongClientProvider, PooledKongAdminClient
+from kong_admin.factory import get_kong_client
+from kong_admin.testing.adapter import FakeKongAdapter
+
+API_URL = 'http://localhost:8001'
+
+
+class KongClientProviderTestCase(TestCase):
+    def setUp(self):
+        self.provider = KongClientProvider(API_URL, pool_size=4, idle_timeout=30)
+
+    def test_session_per_thread(self):
+        sessions = []
+
+        def get_session():
+            sessions.append(self.provider.get_session())
+
+        threads = [threading.Thread(target=get_session) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIs(self.provider.get_session(), self.provider.get_session())
+        self.assertEqual(len(set(id(session) for session in sessions)), 2)
+
+        # All sessions share a single connection pool
+        for session in sessions + [self.provider.get_session()]:
+            self.assertIs(session.get_adapter(API_URL), self.provider._adapter)
+        self.assertEqual(self.provider._adapter._pool_maxsize, 4)
+
+    def test_clients_share_the_pool(self):
+        client = self.provider.get_client()
+        session = self.provider.get_session()
+
+        self.assertIs(client.apis.session, session)
+        self.assertIs(client.apis.plugins('api').session, session)
+        self.assertIs(client.consumers.session, session)
+        self.assertIs(client.consumers.basic_auth('consumer').session, session)
+        self.assertIs(client.consumers.key_auth('consumer').session, session)
+        self.assertIs(client.consumers.oauth2('consumer').session, session)
+        self.assertIs(client.plugins.session, session)
+
+    def test_close_client_keeps_the_pool(self):
+        adapter = self.provider._adapter
+
+        with mock.patch.object(adapter, 'close') as close:
+            self.provider.get_client().close()
+
+        self.assertFalse(close.called)
+        self.assertIs(self.provider.get_client().apis.session.get_adapter(API_URL), adapter)
+
+    def test_fork(self):
+        session = self.provider.get_session()
+        adapter = self.provider._adapter
+
+        with mock.patch('kong_admin.client.os.getpid', return_value=-1):
+            forked_session = self.provider.get_session()
+
+        self.assertIsNot(forked_session, session)
+        self.assertIsNot(self.provider._adapter, adapter)
+
+    def test_idle_timeout(self):
+        session = self.provider.get_session()
+
+        with mock.patch.object(self.provider._adapter, 'close') as close:
+            self.provider.get_session()
+            self.assertFalse(close.called)
+
+            self.provider._used_at -= 31
+            self.assertIs(self.provider.get_session(), session)
+            self.assertTrue(close.called)
+
+
+class FakeKongAdapterTestCase(TestCase):
+    def setUp(self):
+        self.adapter = FakeKongAdapter()
+        self.client = KongClientProvider(API_URL, adapter=self.adapter).get_client()
+
+    def test_requests(self):
+        api = self.client.apis.create('http://mockbin.com', name='mockbin', request_host='mockbin.com')
+        self.client.apis.plugins(api['id']).create('rate-limiting', second=10)
+
+        self.assertEqual(self.client.apis.retrieve('mockbin')['upstream_url'], 'http://mockbin.com')
+        self.assertEqual(self.client.apis.plugins(api['id']).list()['data'][0]['config'], {'second': 10})
+        self.assertRaises(ValueError, self.client.apis.retrieve, 'unknown')
+
+        self.assertEqual(self.adapter.requests, 5)
+        self.assertEqual(self.adapter.requests_per_method, {'POST': 2, 'GET': 3})
+
+    def test_latency(self):
+        self.adapter.latency = mock.Mock(return_value=0)
+
+        self.client.consumers.create(username='john')
+
+        self.assertEqual(self.adapter.fake.count('consumers'), 1)
+        self.assertEqual(self.adapter.latency.call_count, 1)
+
+
+class GetKongClientTestCase(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(kong_client, '_provider', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(KONG_ADMIN_SIMULATOR=False, KONG_ADMIN_URL=API_URL)
+    def test_pooled_client(self):
+        client = get_kong_client()
+
+        self.assertIsInstance(client, PooledKongAdminClient)
+        self.assertIs(client.provider, get_kong_client().provider)
+        self.assertEqual(client.provider.api_url, API_URL)
+
+    @override_settings(KONG_ADMIN_SIMULATOR=True)
+    def test_simulator(self):
+        self.assertIsInstance(get_kong_client(), KongAdminSimulator)
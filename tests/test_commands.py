@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import os
+import shutil
+import tempfile
+
+import mock
+from six import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from kong.simulator import KongAdminSimulator
+
+from kong_admin import models
+from kong_admin.enums import Plugins
+from kong_admin.sync.result import SyncResult
+from kong_admin.sync.retry import reset_circuit_breakers
+from kong_admin.testing.server import FakeKongServer
+from kong_admin.testing.trace import Trace
+
+from .factories import APIReferenceFactory, PluginConfigurationReferenceFactory, ConsumerReferenceFactory, \
+    BasicAuthReferenceFactory
+from .fake import fake
+
+
+class KongSyncCommandTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+        patcher = mock.patch('kong_admin.management.commands.kong_sync.get_kong_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(self.client, 'close')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _call_command(self, *args, **options):
+        stdout = StringIO()
+        call_command('kong_sync', *args, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def _create_refs(self):
+        for _ in range(3):
+            api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+            PluginConfigurationReferenceFactory(api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': 5})
+
+        consumer_ref = ConsumerReferenceFactory(username=fake.consumer_name(), custom_id=fake.uuid4())
+        BasicAuthReferenceFactory(consumer=consumer_ref)
+
+    def test_synchronize_all(self):
+        self._create_refs()
+
+        output = self._call_command(workers=1, batch_size=2, delete_orphans=True)
+
+        self.assertIn('Synchronized', output)
+        self.assertIn('objects/s', output)
+        for model in (models.APIReference, models.PluginConfigurationReference, models.ConsumerReference,
+                      models.BasicAuthReference):
+            self.assertFalse(model.objects.filter(synchronized=False).exists(), model)
+        self.assertEqual(len(self.client.apis.list()['data']), 3)
+
+    def test_default_entities(self):
+        self._create_refs()
+
+        # The plugins and credentials are synchronized with their API or consumer
+        with mock.patch('kong_admin.sync.base.KongProxySyncEngine.synchronize', autospec=True,
+                        return_value=SyncResult()) as synchronize:
+            self._call_command()
+        self.assertEqual(
+            [call[0][0].get_proxy_class() for call in synchronize.call_args_list],
+            [models.APIReference, models.ConsumerReference])
+
+        with mock.patch('kong_admin.sync.base.KongProxySyncEngine.synchronize', autospec=True,
+                        return_value=SyncResult()) as synchronize:
+            self._call_command('plugins', 'credentials')
+        self.assertEqual(
+            [call[0][0].get_proxy_class() for call in synchronize.call_args_list],
+            [models.PluginConfigurationReference, models.BasicAuthReference, models.KeyAuthReference,
+             models.OAuth2Reference])
+
+    def test_incremental(self):
+        self._create_refs()
+        self._call_command('apis')
+
+        api_ref = models.APIReference.objects.first()
+        api_ref.upstream_url = fake.url()
+        api_ref.save()
+
+        output = self._call_command('apis', incremental=True)
+
+        self.assertIn('published: 1,', output)
+        self.assertEqual(self.client.apis.retrieve(str(api_ref.kong_id))['upstream_url'], api_ref.upstream_url)
+
+    def test_dry_run(self):
+        self._create_refs()
+
+        output = self._call_command('apis', 'consumers', dry_run=True)
+
+        self.assertIn('APIReference: SyncPlan(create: 3', output)
+        self.assertIn('ConsumerReference: SyncPlan(create: 1', output)
+        self.assertEqual(len(self.client.apis.list()['data']), 0)
+        self.assertFalse(models.APIReference.objects.filter(synchronized=True).exists())
+
+    def test_continue_on_error(self):
+        self._create_refs()
+        stderr = StringIO()
+
+        with mock.patch('kong_admin.sync.apis.APISyncEngine.on_publish', side_effect=ValueError('Kong says no')):
+            output = self._call_command('apis', continue_on_error=True, stderr=stderr)
+
+        self.assertIn('failed: 3)', output)
+        self.assertEqual(stderr.getvalue().count('Kong says no'), 3)
+
+    def test_unknown_entity(self):
+        with self.assertRaises(CommandError):
+            self._call_command('routes')
+
+    def test_record_trace(self):
+        self._create_refs()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'trace.jsonl.gz')
+
+        with FakeKongServer() as server, self.settings(KONG_ADMIN_URL=server.url):
+            output = self._call_command('apis', record_trace=path)
+
+        trace = Trace.load(path)
+        self.assertIn('Recorded %d admin calls' % len(trace), output)
+        self.assertEqual(len(trace), server.stats()['requests'])
+        self.assertEqual(trace.counts()['PUT /apis/'], 3)
+        # The simulator is not used while recording
+        self.assertEqual(len(self.client.apis.list()['data']), 0)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+from collections import deque
+
+import mock
+from django.db import connection
+from django.test import TestCase, override_settings
+from kong.simulator import KongAdminSimulator
+
+from kong_admin import logic
+from kong_admin import models
+from kong_admin.enums import Plugins
+from kong_admin.signals import sync_phase_finished
+from kong_admin.sync import instrumentation
+from kong_admin.sync.instrumentation import TimingCollector, SyncCollector, collecting
+from kong_admin.sync.retry import reset_circuit_breakers
+
+from .factories import APIReferenceFactory, PluginConfigurationReferenceFactory
+from .fake import fake
+
+
+class ListCollector(SyncCollector):
+    events = []
+
+    def collect(self, event):
+        self.events.append(event)
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def _create_api_ref(self):
+        api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+        PluginConfigurationReferenceFactory(api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': 5})
+        return api_ref
+
+    def test_events(self):
+        api_ref = self._create_api_ref()
+
+        with collecting(ListCollector()) as collector:
+            del collector.events[:]
+            logic.synchronize_apis(self.client, incremental=False)
+
+        phases = [(event.entity, event.phase) for event in collector.events]
+        for phase in ('on_retrieve_all', 'before_publish', 'on_publish', 'after_publish'):
+            self.assertIn(('apireference', phase), phases)
+        self.assertIn(('pluginconfigurationreference', 'on_publish'), phases)
+        self.assertIn(('pluginconfigurationreference', 'on_retrieve_children'), phases)
+
+        on_publish = [event for event in collector.events if event.phase == 'on_publish' and
+                      event.entity == 'apireference'][0]
+        self.assertEqual(on_publish.object_id, api_ref.id)
+        self.assertGreaterEqual(on_publish.http_calls, 1)
+        self.assertGreaterEqual(on_publish.duration, 0)
+        self.assertIsNone(on_publish.error)
+
+        # The plugin configurations are published (and written back) after the api has been published
+        after_publish = [event for event in collector.events if event.phase == 'after_publish' and
+                         event.entity == 'apireference'][0]
+        self.assertGreater(after_publish.db_queries, 0)
+
+    def test_withdraw_events(self):
+        api_ref = self._create_api_ref()
+        logic.publish_api(self.client, api_ref)
+
+        collector = TimingCollector()
+        with collecting(collector):
+            logic.withdraw_api(self.client, api_ref)
+
+        self.assertEqual(
+            [phase for entity, phase in collector.totals.keys() if entity == 'apireference'],
+            ['before_withdraw', 'on_withdraw', 'after_withdraw', 'withdraw'])
+        self.assertEqual(len(collector.report()), len(collector.totals))
+
+    def test_signal(self):
+        self._create_api_ref()
+        receiver = mock.Mock()
+
+        sync_phase_finished.connect(receiver)
+        try:
+            logic.synchronize_apis(self.client, incremental=False)
+        finally:
+            sync_phase_finished.disconnect(receiver)
+
+        phases = set(call[1]['event'].phase for call in receiver.call_args_list)
+        self.assertIn('on_publish', phases)
+
+    def test_error(self):
+        api_ref = self._create_api_ref()
+        collector = TimingCollector()
+
+        with collecting(collector), mock.patch('kong_admin.sync.apis.APISyncEngine.on_publish',
+                                               side_effect=ValueError('Bad request')):
+            self.assertRaises(ValueError, logic.publish_api, self.client, api_ref)
+
+        self.assertEqual(collector.totals[('apireference', 'on_publish')]['errors'], 1)
+
+    @override_settings(KONG_ADMIN_SYNC_COLLECTORS=['tests.test_instrumentation.ListCollector'])
+    def test_configured_collectors(self):
+        del ListCollector.events[:]
+        logic.publish_api(self.client, self._create_api_ref())
+
+        self.assertIn('on_publish', [event.phase for event in ListCollector.events])
+
+    def test_disabled(self):
+        with mock.patch.object(instrumentation, 'emit') as emit:
+            logic.publish_api(self.client, self._create_api_ref())
+
+        self.assertFalse(emit.called)
+
+    def test_count_queries(self):
+        with instrumentation.count_queries() as outer:
+            models.APIReference.objects.count()
+            with instrumentation.count_queries() as inner:
+                models.APIReference.objects.exists()
+                with connection.cursor() as cursor:
+                    cursor.executemany('UPDATE %s SET synchronized = %%s' % models.APIReference._meta.db_table,
+                                       [(True,), (False,)])
+
+        self.assertEqual(inner(), 2)
+        self.assertEqual(outer(), 3)
+
+        # The queries after the with block are not counted
+        models.APIReference.objects.count()
+        self.assertEqual(outer(), 3)
+
+    @override_settings(DEBUG=True)
+    def test_count_queries_beyond_queries_log(self):
+        # The debug cursor only keeps the last queries (9000 before Django 2.0)
+        with mock.patch.object(connection, 'queries_log', deque(maxlen=10)), instrumentation.count_queries() as queries:
+            for _ in range(25):
+                models.APIReference.objects.exists()
+
+        self.assertEqual(queries(), 25)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import threading
+import time
+
+import mock
+from django.test import SimpleTestCase
+from requests import Response
+from requests.exceptions import Timeout
+
+from kong_admin.client import LimitedHTTPAdapter
+from kong_admin.limiter import AdminLimiter, TokenBucket
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    def test_burst(self):
+        bucket = TokenBucket(rate=10, burst=2)
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+
+        # The next tokens are reserved in order
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+
+class AdminLimiterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.limiter = AdminLimiter(rate=0, max_concurrency=8, latency_threshold=1)
+
+    def test_additive_increase(self):
+        self.limiter._window = 4
+
+        # About one per window of healthy calls
+        for _ in range(6):
+            self.limiter.release(self.limiter.acquire())
+
+        self.assertEqual(self.limiter.window, 5)
+        self.assertEqual(self.limiter.in_flight, 0)
+
+    def test_multiplicative_decrease(self):
+        started_at = [self.limiter.acquire() for _ in range(3)]
+
+        for value in started_at:
+            self.limiter.release(value, overloaded=True)
+
+        # The calls that were in flight together only halve the window once
+        self.assertEqual(self.limiter.window, 4)
+
+        self.limiter.release(self.limiter.acquire(), overloaded=True)
+        self.assertEqual(self.limiter.window, 2)
+
+        for _ in range(5):
+            self.limiter.release(self.limiter.acquire(), overloaded=True)
+        self.assertEqual(self.limiter.window, 1)
+
+    def test_latency_spike(self):
+        self.limiter.release(self.limiter.acquire() - 2)
+        self.assertEqual(self.limiter.window, 4)
+
+    def test_window_blocks(self):
+        self.limiter._window = 1
+        started_at = self.limiter.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            self.limiter.release(self.limiter.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+
+        for _ in range(100):
+            if self.limiter.queue_depth:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.limiter.stats()['queue_depth'], 1)
+        self.assertFalse(acquired.is_set())
+
+        self.limiter.release(started_at)
+        thread.join()
+
+        self.assertTrue(acquired.is_set())
+        self.assertEqual(self.limiter.queue_depth, 0)
+
+    def test_adapter(self):
+        adapter = LimitedHTTPAdapter(self.limiter)
+        response = Response()
+        response.status_code = 503
+
+        with mock.patch('requests.adapters.HTTPAdapter.send', return_value=response):
+            self.assertIs(adapter.send(mock.Mock()), response)
+        self.assertEqual(self.limiter.window, 4)
+
+        with mock.patch('requests.adapters.HTTPAdapter.send', side_effect=Timeout()):
+            self.assertRaises(Timeout, adapter.send, mock.Mock())
+        self.assertEqual(self.limiter.window, 2)
+        self.assertEqual(self.limiter.in_flight, 0)
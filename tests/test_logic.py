@@ -1,10 +1,12 @@
 from __future__ import unicode_literals, print_function
 import uuid
 
+import mock
 from django.test import TestCase
 
 from kong_admin import models
 from kong_admin import logic
+from kong_admin import outbox
 from kong_admin.factory import get_kong_client
 from kong_admin.enums import Plugins
 
@@ -13,10 +15,12 @@ from .factories import APIReferenceFactory, PluginConfigurationReferenceFactory,
     BasicAuthReferenceFactory, KeyAuthReferenceFactory, OAuth2ReferenceFactory
 from .fake import fake
 from kong_admin.models import PluginConfigurationReference
+from kong_admin.sync.retry import reset_circuit_breakers
 
 
 class APIReferenceLogicTestCase(TestCase):
     def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
         self.client = get_kong_client()
         self._cleanup_api = []
 
@@ -149,11 +153,36 @@ class APIReferenceLogicTestCase(TestCase):
         # You can delete afterwards
         api_kong_id = api_ref.kong_id
         api_ref.delete()
+        # Withdrawn once the delete has been committed, which never happens in a TestCase
+        outbox.withdraw_pending(self.client)
 
         # Check kong
         with self.assertRaises(ValueError):
             _ = self.client.apis.retrieve(api_kong_id)
 
+    def test_delete_api_failed_withdrawal(self):
+        # Create api_ref
+        api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+
+        # Publish
+        logic.synchronize_api(self.client, api_ref)
+        api_kong_id = api_ref.kong_id
+
+        # Kong fails to delete the api
+        with mock.patch('kong_admin.sync.apis.APISyncEngine.on_withdraw_by_id', side_effect=ValueError('Kong is down')):
+            api_ref.delete()
+            outbox.withdraw_pending(self.client)
+
+        # The withdrawal is kept in the outbox, for the next attempt
+        event = models.OutboxEvent.objects.get(kong_id=api_kong_id)
+        self.assertGreaterEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, 'Kong is down')
+        self.assertIsNotNone(self.client.apis.retrieve(api_kong_id))
+
+        # Withdrawn by the next attempt
+        outbox.withdraw_pending(self.client)
+        self.assertFalse(models.OutboxEvent.objects.exists())
+
     def test_sync_plugin_configuration_before_api(self):
         # Create api_ref
         api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
@@ -271,6 +300,8 @@ class APIReferenceLogicTestCase(TestCase):
         # Delete plugin_configuration
         plugin_configuration_kong_id = plugin_configuration_ref.kong_id
         plugin_configuration_ref.delete()
+        # Withdrawn once the delete has been committed, which never happens in a TestCase
+        outbox.withdraw_pending(self.client)
 
         # Check
         with self.assertRaises(ValueError):
@@ -350,6 +381,7 @@ class APIReferenceLogicTestCase(TestCase):
 
 class ConsumerReferenceLogicTestCase(TestCase):
     def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
         self.client = get_kong_client()
         self._cleanup_consumers = []
 
@@ -474,6 +506,8 @@ class ConsumerReferenceLogicTestCase(TestCase):
         # You can delete afterwards
         consumer_kong_id = consumer_ref.kong_id
         consumer_ref.delete()
+        # Withdrawn once the delete has been committed, which never happens in a TestCase
+        outbox.withdraw_pending(self.client)
 
         # Check kong
         with self.assertRaises(ValueError):
@@ -597,6 +631,8 @@ class ConsumerReferenceLogicTestCase(TestCase):
         # Delete consumer
         consumer_kong_id = consumer_ref.kong_id
         consumer_ref.delete()
+        # Withdrawn once the delete has been committed, which never happens in a TestCase
+        outbox.withdraw_pending(self.client)
 
         # Check
         with self.assertRaises(ValueError):
@@ -719,6 +755,8 @@ class ConsumerReferenceLogicTestCase(TestCase):
         # Delete consumer
         consumer_kong_id = consumer_ref.kong_id
         consumer_ref.delete()
+        # Withdrawn once the delete has been committed, which never happens in a TestCase
+        outbox.withdraw_pending(self.client)
 
         # Check
         with self.assertRaises(ValueError):
@@ -841,6 +879,8 @@ class ConsumerReferenceLogicTestCase(TestCase):
         # Delete consumer
         consumer_kong_id = consumer_ref.kong_id
         consumer_ref.delete()
+        # Withdrawn once the delete has been committed, which never happens in a TestCase
+        outbox.withdraw_pending(self.client)
 
         # Check
         with self.assertRaises(ValueError):
@@ -853,6 +893,7 @@ class ConsumerReferenceLogicTestCase(TestCase):
 
 class AuthenticationPluginTestCase(TestCase):
     def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
         self.client = get_kong_client()
         self._cleanup_api = []
 
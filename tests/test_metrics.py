@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import mock
+from django.test import TestCase, RequestFactory, override_settings
+from kong.simulator import KongAdminSimulator
+
+from kong_admin import logic
+from kong_admin import metrics
+from kong_admin.signals import sync_phase_finished, admin_call_finished
+from kong_admin.sync.retry import reset_circuit_breakers
+from kong_admin.views import show_metrics
+
+from .factories import APIReferenceFactory
+from .fake import fake
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+        metrics.registry.clear()
+        metrics.connect()
+        self.addCleanup(sync_phase_finished.disconnect, dispatch_uid='kong_admin.metrics')
+        self.addCleanup(admin_call_finished.disconnect, dispatch_uid='kong_admin.metrics')
+
+    def _create_api_ref(self):
+        return APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+
+    def _get_metrics(self):
+        request = RequestFactory().get('/metrics/')
+        response = metrics.metrics_view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode('utf-8')
+
+    def test_sync_metrics(self):
+        api_refs = [self._create_api_ref() for _ in range(3)]
+        on_publish = logic.get_api_sync_engine().on_publish
+
+        def failing_on_publish(client, obj):
+            if obj.id == api_refs[0].id:
+                raise ValueError('Invalid upstream url')
+            return on_publish(client, obj)
+
+        with mock.patch('kong_admin.sync.apis.APISyncEngine.on_publish', side_effect=failing_on_publish):
+            logic.synchronize_apis(self.client, incremental=False, continue_on_error=True)
+
+        output = self._get_metrics()
+
+        self.assertIn('# TYPE kong_admin_sync_objects_total counter', output)
+        self.assertIn('kong_admin_sync_objects_total{entity="apireference",outcome="published"} 2\n', output)
+        self.assertIn('kong_admin_sync_objects_total{entity="apireference",outcome="failed"} 1\n', output)
+        self.assertIn('kong_admin_publish_duration_seconds_bucket{entity="apireference",le="+Inf"} 2\n', output)
+        self.assertIn('kong_admin_publish_duration_seconds_count{entity="apireference"} 2\n', output)
+        self.assertIn('kong_admin_admin_call_duration_seconds_count{operation="create_or_update"} 2\n', output)
+
+        # The failed api is still waiting to be synchronized
+        self.assertIn('kong_admin_unsynchronized_objects{entity="apireference"} 1\n', output)
+        self.assertIn('kong_admin_outbox_events 0\n', output)
+
+    def test_histogram_buckets(self):
+        metrics.registry.observe('kong_admin_publish_duration_seconds', {'entity': 'apireference'}, 0.3)
+        metrics.registry.observe('kong_admin_publish_duration_seconds', {'entity': 'apireference'}, 1)
+
+        lines = [line for line in self._get_metrics().splitlines()
+                 if line.startswith('kong_admin_publish_duration_seconds_bucket')]
+
+        self.assertEqual(len(lines), len(metrics.BUCKETS) + 1)
+        self.assertEqual(lines[5], 'kong_admin_publish_duration_seconds_bucket{entity="apireference",le="0.25"} 0')
+        self.assertEqual(lines[6], 'kong_admin_publish_duration_seconds_bucket{entity="apireference",le="0.5"} 1')
+        self.assertEqual(lines[7], 'kong_admin_publish_duration_seconds_bucket{entity="apireference",le="1.0"} 2')
+        self.assertEqual(lines[-1], 'kong_admin_publish_duration_seconds_bucket{entity="apireference",le="+Inf"} 2')
+
+    def test_skipped_publish(self):
+        api_ref = self._create_api_ref()
+        logic.publish_api(self.client, api_ref)
+        # Did not change since it was published
+        logic.publish_api(self.client, api_ref)
+
+        output = self._get_metrics()
+
+        self.assertIn('kong_admin_sync_objects_total{entity="apireference",outcome="published"} 1\n', output)
+        self.assertIn('kong_admin_sync_objects_total{entity="apireference",outcome="skipped"} 1\n', output)
+        self.assertIn('kong_admin_publish_duration_seconds_count{entity="apireference"} 1\n', output)
+
+    def _get_multiprocess_dir(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.addCleanup(metrics._process.update, exited=False)
+        return directory
+
+    def _write_samples(self, path, published):
+        other = metrics.Registry()
+        other.inc('kong_admin_sync_objects_total', {'entity': 'apireference', 'outcome': 'published'}, published)
+        with open(path, 'w') as f:
+            json.dump(other.dump(), f)
+
+    def test_multiprocess(self):
+        directory = self._get_multiprocess_dir()
+        # The samples of another process
+        self._write_samples(os.path.join(directory, 'kong_admin_1_%s.json' % ('0' * 32)), 5)
+
+        with override_settings(KONG_ADMIN_METRICS_MULTIPROCESS_DIR=directory):
+            logic.publish_api(self.client, self._create_api_ref())
+            output = self._get_metrics()
+
+            self.assertIn('kong_admin_sync_objects_total{entity="apireference",outcome="published"} 6\n', output)
+            self.assertTrue(os.path.exists(metrics.get_process_file(directory)))
+
+    def test_exited_process(self):
+        directory = self._get_multiprocess_dir()
+        # The samples of a process that exited earlier
+        self._write_samples(os.path.join(directory, metrics.DEAD_PROCESSES_FILE), 5)
+
+        with override_settings(KONG_ADMIN_METRICS_MULTIPROCESS_DIR=directory):
+            logic.publish_api(self.client, self._create_api_ref())
+            path = metrics.get_process_file(directory)
+
+            metrics.merge_process()
+            self.assertFalse(os.path.exists(path))
+
+            # This process is done, later samples are not written anymore
+            metrics.registry.clear()
+            output = self._get_metrics()
+
+            self.assertFalse(os.path.exists(path))
+            self.assertIn('kong_admin_sync_objects_total{entity="apireference",outcome="published"} 6\n', output)
+
+    def test_killed_process(self):
+        directory = self._get_multiprocess_dir()
+
+        # A process that exited without merging its file
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        path = os.path.join(directory, 'kong_admin_%d_%s.json' % (process.pid, 'a' * 32))
+        self._write_samples(path, 5)
+
+        with override_settings(KONG_ADMIN_METRICS_MULTIPROCESS_DIR=directory):
+            output = self._get_metrics()
+            self.assertIn('kong_admin_sync_objects_total{entity="apireference",outcome="published"} 5\n', output)
+
+            # Merged into the file of the dead processes
+            self.assertFalse(os.path.exists(path))
+            self.assertTrue(os.path.exists(os.path.join(directory, metrics.DEAD_PROCESSES_FILE)))
+
+            # Counters never go back
+            self.assertIn('kong_admin_sync_objects_total{entity="apireference",outcome="published"} 5\n',
+                          self._get_metrics())
+
+    def test_staff_only(self):
+        request = RequestFactory().get('/kong/metrics/')
+        request.user = mock.Mock(is_active=True, is_staff=False)
+        self.assertEqual(show_metrics(request).status_code, 302)
+
+        request.user = mock.Mock(is_active=True, is_staff=True)
+        self.assertEqual(show_metrics(request).status_code, 200)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import mock
+from django.db import transaction
+from django.test import TestCase, override_settings
+from kong.simulator import KongAdminSimulator
+
+from kong_admin import models
+from kong_admin import logic
+from kong_admin import outbox
+from kong_admin.enums import Plugins, OutboxActions
+from kong_admin.sync.apis import APISyncEngine
+from kong_admin.sync.retry import reset_circuit_breakers
+
+from .factories import APIReferenceFactory, PluginConfigurationReferenceFactory
+from .fake import fake
+
+
+@override_settings(KONG_ADMIN_OUTBOX=True)
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def _create_api_ref(self):
+        return APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+
+    def test_publish_events_are_coalesced(self):
+        api_ref = self._create_api_ref()
+        PluginConfigurationReferenceFactory(api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': 5})
+        api_ref.upstream_url = fake.url()
+        api_ref.save()
+
+        # Creating the api, adding a plugin configuration and updating the api
+        events = models.OutboxEvent.objects.filter(action=OutboxActions.PUBLISH, object_id=api_ref.id)
+        self.assertEqual(events.count(), 3)
+
+        result = outbox.drain(self.client)
+
+        self.assertEqual(result.published, 1)
+        self.assertFalse(models.OutboxEvent.objects.exists())
+
+        api_ref = models.APIReference.objects.get(id=api_ref.id)
+        plugin_configuration_ref = models.PluginConfigurationReference.objects.get()
+        self.assertTrue(api_ref.synchronized)
+        self.assertEqual(self.client.apis.retrieve(str(api_ref.kong_id))['upstream_url'], api_ref.upstream_url)
+        self.assertIsNotNone(
+            self.client.apis.plugins(str(api_ref.kong_id)).retrieve(str(plugin_configuration_ref.kong_id)))
+
+    def test_withdraw_on_delete(self):
+        api_ref = self._create_api_ref()
+        PluginConfigurationReferenceFactory(api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': 5})
+        outbox.drain(self.client)
+
+        api_ref = models.APIReference.objects.get(id=api_ref.id)
+        kong_id = api_ref.kong_id
+        api_ref.delete()
+
+        # Nothing has been withdrawn yet
+        self.assertIsNotNone(self.client.apis.retrieve(str(kong_id)))
+        self.assertEqual(models.OutboxEvent.objects.filter(action=OutboxActions.WITHDRAW).count(), 2)
+
+        result = outbox.drain(self.client)
+
+        # The plugin configuration is removed together with the api
+        self.assertEqual(result.withdrawn, 1)
+        self.assertIsNone(self.client.apis.retrieve(str(kong_id)))
+        self.assertFalse(models.OutboxEvent.objects.exists())
+
+    def test_failed_events_remain_pending(self):
+        api_ref = self._create_api_ref()
+        logic.publish_api(self.client, api_ref)
+        models.OutboxEvent.objects.all().delete()
+
+        models.APIReference.objects.get(id=api_ref.id).delete()
+
+        with mock.patch.object(APISyncEngine, 'on_withdraw_by_id', side_effect=ValueError('Kong is down')):
+            result = outbox.drain(self.client)
+
+        self.assertEqual(len(result), 0)
+
+        event = models.OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, 'Kong is down')
+
+        result = outbox.drain(self.client)
+
+        self.assertEqual(result.withdrawn, 1)
+        self.assertFalse(models.OutboxEvent.objects.exists())
+
+    @override_settings(KONG_ADMIN_OUTBOX=False)
+    def test_disabled(self):
+        self._create_api_ref()
+        self.assertFalse(models.OutboxEvent.objects.exists())
+
+
+class DeferredWithdrawTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+        # Withdrawals that are applied after the commit use a client of their own
+        patcher = mock.patch('kong_admin.outbox.get_kong_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(self.client, 'close')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_api_ref(self, publish=True):
+        api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+        PluginConfigurationReferenceFactory(api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': 5})
+        if publish:
+            logic.publish_api(self.client, api_ref)
+        return models.APIReference.objects.get(id=api_ref.id)  # reloads!!
+
+    def _commit(self):
+        hooks, self.hooks[:] = list(self.hooks), []
+        for hook in hooks:
+            hook()
+
+    def _patch_on_commit(self):
+        # The test case runs in a transaction that is never committed, so the commit hooks of Django 1.9+ are emulated
+        self.hooks = []
+        patcher = mock.patch.object(transaction, 'on_commit', side_effect=self.hooks.append, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_queryset_delete(self):
+        self._patch_on_commit()
+        kong_ids = [self._create_api_ref().kong_id for _ in range(3)]
+        self._create_api_ref(publish=False)
+
+        with mock.patch.object(APISyncEngine, 'on_withdraw_by_id', wraps=APISyncEngine().on_withdraw_by_id) as withdraw:
+            models.APIReference.objects.all().delete()
+            self._commit()
+
+        self.assertEqual(withdraw.call_count, 3)
+        for kong_id in kong_ids:
+            self.assertIsNone(self.client.apis.retrieve(str(kong_id)))
+        self.assertFalse(models.OutboxEvent.objects.exists())
+
+    def test_failed_withdrawal_is_kept(self):
+        self._patch_on_commit()
+        kong_id = self._create_api_ref().kong_id
+
+        with mock.patch.object(APISyncEngine, 'on_withdraw_by_id', side_effect=ValueError('Kong is down')):
+            models.APIReference.objects.all().delete()
+            self._commit()
+
+        self.assertFalse(models.APIReference.objects.exists())
+        self.assertEqual(models.OutboxEvent.objects.get(kong_id=kong_id).attempts, 1)
+
+        outbox.withdraw_pending()
+
+        self.assertIsNone(self.client.apis.retrieve(str(kong_id)))
+        self.assertFalse(models.OutboxEvent.objects.exists())
+
+    def test_withdrawn_after_commit(self):
+        self._patch_on_commit()
+        kong_ids = [self._create_api_ref().kong_id for _ in range(3)]
+
+        with mock.patch('kong_admin.outbox.drain', wraps=outbox.drain) as drain:
+            models.APIReference.objects.filter(kong_id__in=kong_ids[:2]).delete()
+            models.APIReference.objects.get(kong_id=kong_ids[2]).delete()
+
+            # Nothing is withdrawn before the commit, and all deletes of the transaction share a single hook
+            for kong_id in kong_ids:
+                self.assertIsNotNone(self.client.apis.retrieve(str(kong_id)))
+            self.assertEqual(len(self.hooks), 1)
+
+            self._commit()
+
+        # The withdrawals are applied as a single batch
+        self.assertEqual(drain.call_count, 1)
+        for kong_id in kong_ids:
+            self.assertIsNone(self.client.apis.retrieve(str(kong_id)))
+        self.assertFalse(models.OutboxEvent.objects.exists())
+
+        # The next transaction gets a hook of its own
+        kong_id = self._create_api_ref().kong_id
+        models.APIReference.objects.all().delete()
+        self.assertEqual(len(self.hooks), 1)
+        self._commit()
+        self.assertIsNone(self.client.apis.retrieve(str(kong_id)))
+
+    def test_rolled_back_delete(self):
+        self._patch_on_commit()
+        kong_id = self._create_api_ref().kong_id
+
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                models.APIReference.objects.all().delete()
+                raise ValueError('Rolled back')
+
+        # Django drops the hooks of a transaction (or savepoint) that has been rolled back
+        del self.hooks[:]
+        self.assertIsNotNone(self.client.apis.retrieve(str(kong_id)))
+        self.assertFalse(models.OutboxEvent.objects.exists())
+
+        # The next delete gets a hook of its own
+        other_kong_id = self._create_api_ref().kong_id
+        models.APIReference.objects.filter(kong_id=other_kong_id).delete()
+        self.assertEqual(len(self.hooks), 1)
+        self._commit()
+
+        self.assertIsNone(self.client.apis.retrieve(str(other_kong_id)))
+        self.assertIsNotNone(self.client.apis.retrieve(str(kong_id)))
+
+    def test_failed_withdrawal_after_commit_is_logged(self):
+        self._patch_on_commit()
+        kong_id = self._create_api_ref().kong_id
+        models.APIReference.objects.all().delete()
+
+        with mock.patch('kong_admin.outbox.get_kong_client', side_effect=ValueError('Kong is down')), \
+                mock.patch('kong_admin.outbox.logger') as logger:
+            self._commit()
+
+        self.assertEqual(logger.exception.call_count, 1)
+        self.assertEqual(logger.error.call_count, 1)
+        self.assertTrue(models.OutboxEvent.objects.filter(kong_id=kong_id).exists())
+        self.assertIsNotNone(self.client.apis.retrieve(str(kong_id)))
+
+    def test_no_commit_hooks(self):
+        kong_ids = [self._create_api_ref().kong_id for _ in range(3)]
+
+        # Django < 1.9: withdrawn right after the delete, as a single batch
+        with mock.patch('kong_admin.outbox.transaction', mock.Mock(spec=[])), \
+                mock.patch('kong_admin.outbox.drain', wraps=outbox.drain) as drain:
+            models.APIReference.objects.all().delete()
+
+        self.assertEqual(drain.call_count, 1)
+        for kong_id in kong_ids:
+            self.assertIsNone(self.client.apis.retrieve(str(kong_id)))
+        self.assertFalse(models.OutboxEvent.objects.exists())
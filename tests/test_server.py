@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import threading
+
+import requests
+from django.test import SimpleTestCase
+
+from kong_admin import client as kong_client
+from kong_admin.client import KongClientProvider
+from kong_admin.factory import get_kong_client
+from kong_admin.testing import latency
+from kong_admin.testing.server import FakeKongServer, STATS_PATH
+
+
+class FakeKongServerTestCase(SimpleTestCase):
+    def start(self, **kwargs):
+        server = FakeKongServer(**kwargs).start()
+        self.addCleanup(server.stop)
+        provider = KongClientProvider(server.url)
+        self.addCleanup(provider.close)
+        return server, provider.get_client()
+
+    def test_requests(self):
+        server, client = self.start()
+
+        for i in range(3):
+            client.consumers.create(username='consumer-%d' % i)
+
+        # The next page is found by the url the server returns
+        self.assertEqual(len(list(client.consumers.iterate(window_size=2))), 3)
+        self.assertEqual(client.consumers.retrieve('consumer-1')['username'], 'consumer-1')
+
+        stats = server.stats()
+        self.assertEqual(stats['requests'], 6)
+        self.assertEqual(stats['requests_per_method'], {'POST': 3, 'GET': 3})
+        self.assertEqual(requests.get(server.url + STATS_PATH).json()['requests'], 6)
+
+        requests.delete(server.url + STATS_PATH)
+        self.assertEqual(server.stats()['requests'], 0)
+
+    def test_error_rate(self):
+        server, _ = self.start(error_rate=1)
+
+        self.assertEqual(requests.get(server.url + '/apis/').status_code, 500)
+        self.assertEqual(server.stats()['errors'], 1)
+
+    def test_drop_rate(self):
+        server, client = self.start(drop_rate=1)
+
+        self.assertRaises(requests.ConnectionError, client.apis.list)
+        self.assertEqual(server.stats()['dropped'], 1)
+
+    def test_max_connections(self):
+        server, _ = self.start(latency=0.05, max_connections=2)
+
+        threads = [threading.Thread(target=requests.get, args=(server.url + '/apis/',)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = server.stats()
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['max_in_flight'], 2)
+        self.assertGreaterEqual(stats['max_queued'], 1)
+
+    def test_get_kong_client(self):
+        server, _ = self.start()
+
+        with self.settings(KONG_ADMIN_SIMULATOR=False, KONG_ADMIN_URL=server.url):
+            self.addCleanup(setattr, kong_client, '_provider', None)
+            get_kong_client().apis.create('http://mockbin.com', request_host='mockbin.com')
+
+        self.assertEqual(server.fake.count('apis'), 1)
+
+
+class LatencyTestCase(SimpleTestCase):
+    def test_parse(self):
+        self.assertEqual(latency.parse('0.5')(), 0.5)
+        self.assertEqual(latency.parse('constant:0.1')(), 0.1)
+        self.assertTrue(0.1 <= latency.parse('uniform:0.1,0.2')() <= 0.2)
+        self.assertGreaterEqual(latency.parse('normal:0,1')(), 0)
+        self.assertGreater(latency.parse('lognormal:0.02,0.5')(), 0)
+        self.assertRaises(ValueError, latency.parse, 'gamma:1,2')
@@ -0,0 +1,838 @@
+from __future__ import unicode_literals, print_function
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+import mock
+from six import text_type
+from django.contrib import messages
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, SimpleTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from kong.exceptions import ServerError
+from kong.simulator import KongAdminSimulator
+
+from kong_admin import models
+from kong_admin import logic
+from kong_admin import views
+from kong_admin.client import KongClientProvider
+from kong_admin.factory import get_api_sync_engine, get_consumer_sync_engine
+from kong_admin.enums import Plugins
+from kong_admin.sync import writeback
+from kong_admin.sync.base import get_payload_hash
+from kong_admin.sync.executor import execute
+from kong_admin.sync.pagination import iterate
+from kong_admin.sync.plan import load_kong_ids, iterate_chunks
+from kong_admin.sync.retry import ResilientClient, RetryPolicy, RetryBudget, CircuitBreaker, CircuitOpenError, \
+    get_circuit_breaker, reset_circuit_breakers
+from kong_admin.sync.session import SyncSession
+from kong_admin.testing.adapter import FakeKongAdapter
+
+from .factories import APIReferenceFactory, PluginConfigurationReferenceFactory, ConsumerReferenceFactory, \
+    BasicAuthReferenceFactory
+from .fake import fake
+
+
+class APISyncPlanTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def _create_api_ref(self, publish=False):
+        api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+        if publish:
+            logic.publish_api(self.client, api_ref)
+            api_ref = models.APIReference.objects.get(id=api_ref.id)  # reloads!!
+        return api_ref
+
+    def test_plan(self):
+        unchanged_ref = self._create_api_ref(publish=True)
+        updated_ref = self._create_api_ref(publish=True)
+        new_ref = self._create_api_ref()
+
+        # A reference that has been published once, but is unknown to kong
+        stale_ref = self._create_api_ref()
+        models.APIReference.objects.filter(id=stale_ref.id).update(kong_id=uuid.uuid4(), synchronized=True)
+
+        # Update
+        updated_ref.upstream_url = fake.url()
+        updated_ref.save()
+
+        # A remote api without a local reference
+        orphan_struct = self.client.apis.create(fake.url(), request_host=fake.domain_name())
+
+        plan = get_api_sync_engine().plan(self.client, delete=True)
+
+        self.assertEqual(sorted(obj.id for obj in plan.create), sorted([new_ref.id, stale_ref.id]))
+        self.assertEqual([obj.id for obj in plan.update], [updated_ref.id])
+        self.assertEqual([obj.id for obj in plan.unchanged], [unchanged_ref.id])
+        self.assertEqual(plan.delete, [(orphan_struct['id'], None)])
+
+    def test_reconcile(self):
+        unchanged_ref = self._create_api_ref(publish=True)
+        new_ref = self._create_api_ref()
+        orphan_struct = self.client.apis.create(fake.url(), request_host=fake.domain_name())
+
+        logic.synchronize_apis(self.client, reconcile=True)
+
+        new_ref = models.APIReference.objects.get(id=new_ref.id)  # reloads!!
+        self.assertTrue(new_ref.synchronized)
+        self.assertIsNotNone(self.client.apis.retrieve(new_ref.kong_id))
+        self.assertIsNotNone(self.client.apis.retrieve(unchanged_ref.kong_id))
+        self.assertIsNone(self.client.apis.retrieve(orphan_struct['id']))
+
+        # Nothing left to do
+        plan = get_api_sync_engine().plan(self.client, delete=True)
+        self.assertEqual(len(plan), 0)
+        self.assertEqual(len(plan.unchanged), 2)
+
+    def test_reconcile_changed_in_kong(self):
+        api_ref = self._create_api_ref(publish=True)
+        self._create_api_ref(publish=True)
+
+        # Changed in Kong, but not locally
+        self.client.apis.update(text_type(api_ref.kong_id), upstream_url=fake.url())
+
+        plan = get_api_sync_engine().plan(self.client)
+        self.assertEqual([obj.id for obj in plan.update], [api_ref.id])
+        self.assertEqual(len(plan.unchanged), 1)
+
+        result = logic.synchronize_apis(self.client, reconcile=True)
+        self.assertEqual(result.published, 1)
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(self.client.apis.retrieve(text_type(api_ref.kong_id))['upstream_url'], api_ref.upstream_url)
+
+
+class OrphanSyncTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def test_load_kong_ids_in_chunks(self):
+        api_refs = [APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name()) for _ in range(5)]
+        for api_ref in api_refs:
+            models.APIReference.objects.filter(id=api_ref.id).update(kong_id=uuid.uuid4())
+        APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+
+        kong_ids = set(text_type(kong_id) for kong_id in models.APIReference.objects.exclude(
+            kong_id=None).values_list('kong_id', flat=True))
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(load_kong_ids(models.APIReference.objects.all(), chunk_size=2), kong_ids)
+        self.assertEqual(len(context.captured_queries), 3)
+
+    def test_delete_pass_is_set_based(self):
+        api_refs = [APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name()) for _ in range(2)]
+        for api_ref in api_refs:
+            logic.publish_api(self.client, api_ref)
+
+        for _ in range(3):
+            self.client.apis.create(fake.url(), request_host=fake.domain_name())
+
+        with CaptureQueriesContext(connection) as context:
+            result = get_api_sync_engine().synchronize(self.client, delete=True)
+
+        self.assertEqual(result.withdrawn, 3)
+        self.assertEqual(self.client.apis.count(), 2)
+
+        # The local objects are not looked up one by one
+        lookups = [query['sql'] for query in context.captured_queries
+                   if 'SELECT ' in query['sql'] and '"kong_id" = ' in query['sql']]
+        self.assertEqual(lookups, [])
+
+
+class IncrementalSyncTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def test_synchronize_changed_only(self):
+        api_refs = [APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name()) for _ in range(3)]
+
+        self.assertEqual(logic.synchronize_apis(self.client, incremental=True).published, 3)
+        self.assertEqual(logic.synchronize_apis(self.client, incremental=True).published, 0)
+
+        # Saved
+        api_ref = models.APIReference.objects.get(id=api_refs[0].id)
+        api_ref.upstream_url = fake.url()
+        api_ref.save()
+
+        # Updated after the last synchronization, without resetting the synchronized flag
+        models.APIReference.objects.filter(id=api_refs[1].id).update(
+            updated_at=timezone.now() + timedelta(seconds=1))
+
+        result = logic.synchronize_apis(self.client, incremental=True)
+        self.assertEqual(set(outcome.obj.id for outcome in result.outcomes), set([api_refs[0].id, api_refs[1].id]))
+        self.assertEqual(self.client.apis.retrieve(api_ref.name)['upstream_url'], api_ref.upstream_url)
+
+        # Full by default, the unchanged objects are not written to Kong again
+        result = logic.synchronize_apis(self.client)
+        self.assertEqual((result.published, result.skipped), (0, 3))
+
+    def test_admin_action_is_full(self):
+        for _ in range(3):
+            APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+        logic.synchronize_apis(self.client)
+
+        request = RequestFactory().get('/', HTTP_REFERER='/admin/')
+        request.user = mock.Mock(is_active=True, is_staff=True)
+
+        with override_settings(KONG_ADMIN_SYNC_INCREMENTAL=True), \
+                mock.patch('kong_admin.views.factory.get_kong_client', return_value=self.client), \
+                mock.patch.object(self.client, 'close'), \
+                mock.patch('kong_admin.views.messages.add_message') as add_message:
+            views.synchronize_api_references(request)
+
+        self.assertIn('published: 0, withdrawn: 0, skipped: 3,', add_message.call_args[0][2])
+
+
+class PayloadHashTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def test_unchanged_payload_is_not_published(self):
+        api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+        logic.publish_api(self.client, api_ref)
+
+        api_ref = models.APIReference.objects.get(id=api_ref.id)  # reloads!!
+        self.assertIsNotNone(api_ref.payload_hash)
+
+        with mock.patch.object(self.client.apis, 'create_or_update', wraps=self.client.apis.create_or_update) as m:
+            # The synchronized flag is not reliable, the payload is
+            models.APIReference.objects.filter(id=api_ref.id).update(synchronized=False)
+            logic.publish_api(self.client, models.APIReference.objects.get(id=api_ref.id))
+            self.assertEqual(m.call_count, 0)
+            self.assertTrue(models.APIReference.objects.get(id=api_ref.id).synchronized)
+
+            # Changed
+            api_ref.upstream_url = fake.url()
+            api_ref.save()
+            logic.publish_api(self.client, api_ref)
+            self.assertEqual(m.call_count, 1)
+
+        self.assertEqual(self.client.apis.retrieve(api_ref.kong_id)['upstream_url'], api_ref.upstream_url)
+
+    def test_removed_object_is_published(self):
+        api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+        logic.publish_api(self.client, api_ref)
+
+        self.client.apis.delete(api_ref.kong_id)
+        logic.publish_api(self.client, models.APIReference.objects.get(id=api_ref.id))
+
+        api_ref = models.APIReference.objects.get(id=api_ref.id)
+        self.assertEqual(self.client.apis.retrieve(api_ref.kong_id)['upstream_url'], api_ref.upstream_url)
+
+    def test_payload_hash_is_canonical(self):
+        self.assertEqual(
+            get_payload_hash({'a': 1, 'config': {'second': 1, 'minute': 5}}),
+            get_payload_hash({'config': {'minute': 5, 'second': 1}, 'a': 1}))
+        self.assertNotEqual(get_payload_hash({'a': 1}), get_payload_hash({'a': 2}))
+        self.assertIsNone(get_payload_hash(None))
+
+
+class PaginationTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def test_iterate(self):
+        api_structs = [self.client.apis.create(fake.url(), request_host=fake.domain_name()) for _ in range(5)]
+
+        self.assertEqual(
+            [api_struct['id'] for api_struct in iterate(self.client.apis, page_size=2)],
+            [api_struct['id'] for api_struct in api_structs])
+
+    @override_settings(KONG_ADMIN_SYNC_PAGE_SIZE=2)
+    def test_orphans_beyond_first_page(self):
+        consumer_ref = ConsumerReferenceFactory(username=fake.consumer_name(), custom_id=fake.uuid4())
+        logic.publish_consumer(self.client, consumer_ref)
+
+        for _ in range(5):
+            self.client.consumers.basic_auth(consumer_ref.kong_id).create(fake.user_name(), fake.password())
+
+        logic.publish_consumer(self.client, consumer_ref)
+
+        self.assertEqual(self.client.consumers.basic_auth(consumer_ref.kong_id).list(size=100)['data'], [])
+
+
+class SyncSessionTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def test_listing_is_shared_between_engines(self):
+        for _ in range(3):
+            api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+            PluginConfigurationReferenceFactory(api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': 5})
+
+        session = SyncSession(self.client)
+        logic.synchronize_apis(session, incremental=False)
+        logic.synchronize_plugin_configurations(session, incremental=False)
+
+        # The apis are listed once, by the delete pass of the first synchronization
+        self.assertEqual(session.counters['apis.list'], 1)
+        self.assertEqual(session.counters['apis.retrieve'], 0)
+        self.assertGreater(session.counters['apis.cache_hit'], 0)
+
+        for plugin_configuration_ref in models.PluginConfigurationReference.objects.all():
+            self.assertTrue(plugin_configuration_ref.synchronized)
+
+    @override_settings(KONG_ADMIN_SYNC_PAGE_SIZE=2)
+    def test_cache_follows_writes(self):
+        api_structs = [self.client.apis.create(fake.url(), request_host=fake.domain_name()) for _ in range(3)]
+
+        session = SyncSession(self.client)
+        self.assertEqual(len(list(iterate(session.apis))), 3)
+        self.assertEqual(session.counters['apis.list'], 2)
+
+        session.apis.delete(api_structs[0]['id'])
+        created_struct = session.apis.create(fake.url(), request_host=fake.domain_name())
+
+        self.assertEqual(
+            [api_struct['id'] for api_struct in iterate(session.apis)],
+            [api_struct['id'] for api_struct in api_structs[1:]] + [created_struct['id']])
+        self.assertEqual(session.apis.retrieve(api_structs[1]['name'])['id'], api_structs[1]['id'])
+        self.assertEqual(session.counters['apis.list'], 2)
+
+        with self.assertRaises(ValueError):
+            session.apis.retrieve(api_structs[0]['id'])
+
+
+class ResilientClientTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+        self.circuit_breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+        patcher = mock.patch('kong_admin.sync.retry.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_client(self, budget=10):
+        return ResilientClient(
+            self.client, policy=RetryPolicy(max_attempts=3), budget=RetryBudget(budget),
+            circuit_breaker=self.circuit_breaker)
+
+    def test_idempotent_calls_are_retried(self):
+        api_struct = self.client.apis.create(fake.url(), request_host=fake.domain_name())
+        client = self._create_client()
+
+        with mock.patch.object(self.client.apis, 'retrieve', side_effect=[ServerError('Blip'), api_struct]):
+            self.assertEqual(client.apis.retrieve(api_struct['id'])['id'], api_struct['id'])
+
+        self.assertEqual(self.sleep.call_count, 1)
+        self.assertEqual(client.budget.retries, 9)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+    def test_other_calls_are_not_retried(self):
+        client = self._create_client()
+
+        with mock.patch.object(self.client.apis, 'create', side_effect=ServerError('Blip')) as create:
+            self.assertRaises(ServerError, client.apis.create, fake.url(), request_host=fake.domain_name())
+        self.assertEqual(create.call_count, 1)
+
+        with mock.patch.object(self.client.apis, 'retrieve', side_effect=ValueError('Not found')) as retrieve:
+            self.assertRaises(ValueError, client.apis.retrieve, 'unknown')
+        self.assertEqual(retrieve.call_count, 1)
+
+    def test_create_or_update_is_only_retried_with_an_id(self):
+        api_struct = self.client.apis.create(fake.url(), request_host=fake.domain_name())
+        client = self._create_client()
+
+        # Without an id, Kong creates a new api for every attempt
+        with mock.patch.object(self.client.apis, 'create_or_update', side_effect=ServerError('Blip')) as create:
+            self.assertRaises(ServerError, client.apis.create_or_update, fake.url(), api_id=None,
+                              request_host=fake.domain_name())
+        self.assertEqual(create.call_count, 1)
+
+        with mock.patch.object(self.client.apis, 'create_or_update', side_effect=[ServerError('Blip'), api_struct]):
+            self.assertEqual(client.apis.create_or_update(fake.url(), api_id=api_struct['id'])['id'], api_struct['id'])
+
+        # The id of a plugin configuration is not its consumer_id
+        with mock.patch.object(self.client.apis, 'plugins') as plugins:
+            plugins.return_value.create_or_update.side_effect = ServerError('Blip')
+            self.assertRaises(ServerError, client.apis.plugins(api_struct['id']).create_or_update, 'rate-limiting',
+                              consumer_id=text_type(uuid.uuid4()))
+            self.assertEqual(plugins.return_value.create_or_update.call_count, 1)
+
+    def test_every_attempt_is_a_single_request(self):
+        # python-kong retries some calls itself, which ResilientClient bypasses
+        adapter = FakeKongAdapter()
+        kong_client = KongClientProvider('http://localhost:8001', adapter=adapter).get_client()
+        client = ResilientClient(
+            kong_client, policy=RetryPolicy(max_attempts=3), budget=RetryBudget(10),
+            circuit_breaker=CircuitBreaker(failure_threshold=10))
+
+        with mock.patch.object(adapter.fake, 'handle', return_value=(500, {'message': 'An unexpected error occurred'})):
+            self.assertRaises(ServerError, client.apis.retrieve, text_type(uuid.uuid4()))
+            self.assertEqual(adapter.requests, 3)
+            self.assertEqual(client.circuit_breaker._failures, 3)
+
+            adapter.reset_counters()
+            self.assertRaises(ServerError, client.apis.list)
+            self.assertEqual(adapter.requests, 3)
+
+    def test_retry_budget(self):
+        client = self._create_client(budget=1)
+
+        with mock.patch.object(self.client.apis, 'list', side_effect=ServerError('Down')) as list_apis:
+            self.assertRaises(ServerError, client.apis.list)
+        self.assertEqual(list_apis.call_count, 2)
+
+    def test_child_collections(self):
+        api_struct = self.client.apis.create(fake.url(), request_host=fake.domain_name())
+        client = self._create_client()
+
+        with mock.patch.object(self.client.apis, 'plugins') as plugins:
+            plugins.return_value.list.side_effect = [ServerError('Blip'), {'data': []}]
+            self.assertEqual(client.apis.plugins(api_struct['id']).list(), {'data': []})
+
+    def test_circuit_breaker(self):
+        client = self._create_client()
+
+        with mock.patch.object(self.client.apis, 'list', side_effect=ServerError('Down')) as list_apis:
+            self.assertRaises(ServerError, client.apis.list)
+            self.assertEqual(self.circuit_breaker.state, CircuitBreaker.OPEN)
+
+            # Fails fast, without calling Kong
+            self.assertRaises(CircuitOpenError, client.apis.list)
+            self.assertEqual(list_apis.call_count, 3)
+
+        # After the reset timeout, a single call is let through
+        self.circuit_breaker._opened_at -= 30
+        self.assertEqual(client.apis.list()['data'], [])
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_non_transient_error(self):
+        client = self._create_client()
+
+        with mock.patch.object(self.client.apis, 'list', side_effect=ServerError('Down')):
+            self.assertRaises(ServerError, client.apis.list)
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.OPEN)
+
+        # The trial call fails with an error of the request itself, which shows that Kong is answering again
+        self.circuit_breaker._opened_at -= 30
+        with mock.patch.object(self.client.apis, 'retrieve', side_effect=ValueError('Not found')):
+            self.assertRaises(ValueError, client.apis.retrieve, 'unknown')
+        self.assertEqual(self.circuit_breaker.state, CircuitBreaker.CLOSED)
+
+        self.assertEqual(client.apis.list()['data'], [])
+
+    def test_reset_circuit_breakers(self):
+        circuit_breaker = get_circuit_breaker('http://localhost:8001')
+        self.assertIs(get_circuit_breaker('http://localhost:8001'), circuit_breaker)
+
+        reset_circuit_breakers()
+        self.assertIsNot(get_circuit_breaker('http://localhost:8001'), circuit_breaker)
+
+    def test_synchronize_survives_blips(self):
+        api_refs = [APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name()) for _ in range(3)]
+        get_api_sync_engine().synchronize(self.client, incremental=False)
+
+        # Updates (a PUT with the id of the api) can safely be retried
+        for api_ref in models.APIReference.objects.all():
+            api_ref.upstream_url = fake.url()
+            api_ref.save()
+        client = self._create_client()
+
+        create_or_update = self.client.apis.create_or_update
+        calls = []
+
+        def flaky_create_or_update(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise ServerError('Blip')
+            return create_or_update(*args, **kwargs)
+
+        with mock.patch.object(self.client.apis, 'create_or_update', side_effect=flaky_create_or_update):
+            result = get_api_sync_engine().synchronize(client, incremental=False)
+
+        self.assertEqual(result.published, 3)
+        for api_ref in api_refs:
+            self.assertTrue(models.APIReference.objects.get(id=api_ref.id).synchronized)
+
+
+class ContinueOnErrorTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def _create_api_refs(self, count=3):
+        return [APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name()) for _ in range(count)]
+
+    def _fail_on(self, bad_ref):
+        engine = get_api_sync_engine()
+        publish = engine._publish
+
+        def failing_publish(client, obj, *args, **kwargs):
+            if obj.id == bad_ref.id:
+                raise ValueError('Invalid upstream url')
+            return publish(client, obj, *args, **kwargs)
+
+        return engine, mock.patch.object(engine, '_publish', side_effect=failing_publish)
+
+    def test_stops_at_first_error(self):
+        api_refs = self._create_api_refs()
+        engine, patcher = self._fail_on(api_refs[0])
+
+        with patcher:
+            self.assertRaises(ValueError, engine.synchronize, self.client)
+
+    def test_failed_objects_are_reported(self):
+        api_refs = self._create_api_refs()
+        engine, patcher = self._fail_on(api_refs[1])
+
+        with patcher:
+            result = engine.synchronize(self.client, continue_on_error=True)
+
+        self.assertEqual(result.published, 2)
+        self.assertEqual(result.failed, 1)
+        self.assertEqual(len(result.errors), 1)
+        self.assertEqual(result.errors[0].obj, api_refs[1])
+        self.assertEqual(str(result.errors[0].error), 'Invalid upstream url')
+        for outcome in result.outcomes:
+            self.assertGreaterEqual(outcome.duration, 0)
+
+        self.assertFalse(models.APIReference.objects.get(id=api_refs[1].id).synchronized)
+        self.assertTrue(models.APIReference.objects.get(id=api_refs[2].id).synchronized)
+
+    def test_reconcile_and_stream(self):
+        api_refs = self._create_api_refs()
+        engine, patcher = self._fail_on(api_refs[2])
+
+        with patcher:
+            result = engine.synchronize(self.client, reconcile=True, continue_on_error=True)
+        self.assertEqual((result.published, result.failed), (2, 1))
+
+        with patcher:
+            result = engine.synchronize(self.client, stream=True, continue_on_error=True)
+        # The objects that have been published by the reconciliation are unchanged
+        self.assertEqual((result.published, result.skipped, result.failed), (0, 2, 1))
+        self.assertIsNone(result.outcomes)
+        self.assertEqual(result.errors[0].obj.id, api_refs[2].id)
+
+    def test_view_reports_failed_objects(self):
+        api_refs = self._create_api_refs()
+        engine, patcher = self._fail_on(api_refs[0])
+        request = RequestFactory().get('/', HTTP_REFERER='/admin/')
+        request.user = mock.Mock(is_active=True, is_staff=True)
+
+        with patcher, mock.patch('kong_admin.logic.get_api_sync_engine', return_value=engine), \
+                mock.patch('kong_admin.views.factory.get_kong_client', return_value=self.client), \
+                mock.patch.object(self.client, 'close'), \
+                mock.patch('kong_admin.views.messages.add_message') as add_message:
+            views.synchronize_api_references(request)
+
+        levels = [call[0][1] for call in add_message.call_args_list]
+        self.assertEqual(levels, [messages.WARNING, messages.ERROR])
+        self.assertIn('published: 2', add_message.call_args_list[0][0][2])
+        self.assertIn('failed: 1', add_message.call_args_list[0][0][2])
+        self.assertIn('Invalid upstream url', add_message.call_args_list[1][0][2])
+
+
+class StreamingSyncTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def test_iterate_chunks(self):
+        api_refs = [APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name()) for _ in range(5)]
+        queryset = models.APIReference.objects.all()
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual([obj.id for obj in iterate_chunks(queryset, chunk_size=2)], [obj.id for obj in api_refs])
+
+        self.assertEqual(len(context.captured_queries), 3)
+        self.assertIsNone(queryset._result_cache)
+
+    @override_settings(KONG_ADMIN_SYNC_CHUNK_SIZE=2)
+    def test_synchronize_stream(self):
+        for _ in range(5):
+            APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+
+        result = get_api_sync_engine().synchronize(self.client, delete=True, stream=True)
+
+        self.assertEqual(result.published, 5)
+        self.assertEqual(len(result), 5)
+        self.assertIsNone(result.outcomes)
+        self.assertEqual(models.APIReference.objects.filter(synchronized=True).count(), 5)
+
+        with self.assertRaises(ValueError):
+            get_api_sync_engine().synchronize(self.client, stream=True, reconcile=True)
+
+
+class PluginConfigurationSyncTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def test_publish_api_only_reconciles_own_plugins(self):
+        api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+        other_api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+        logic.publish_api(self.client, api_ref)
+        logic.publish_api(self.client, other_api_ref)
+
+        # Remote plugin configurations without a local reference
+        orphan_struct = self.client.apis.plugins(api_ref.kong_id).create('cors')
+        other_orphan_struct = self.client.apis.plugins(other_api_ref.kong_id).create('cors')
+
+        plugin_configuration_ref = PluginConfigurationReferenceFactory(
+            api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': 5})
+
+        logic.publish_api(self.client, api_ref)
+
+        plugin_configuration_ref = models.PluginConfigurationReference.objects.get(id=plugin_configuration_ref.id)
+        self.assertTrue(plugin_configuration_ref.synchronized)
+        self.assertIsNotNone(
+            self.client.apis.plugins(api_ref.kong_id).retrieve(plugin_configuration_ref.kong_id))
+
+        # Only the orphans of the published api are removed
+        self.assertIsNone(self.client.apis.plugins(api_ref.kong_id).retrieve(orphan_struct['id']))
+        self.assertIsNotNone(self.client.apis.plugins(other_api_ref.kong_id).retrieve(other_orphan_struct['id']))
+
+
+class ConsumerAuthSyncTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def test_publish_consumer_only_reconciles_own_credentials(self):
+        consumer_ref = ConsumerReferenceFactory(username=fake.consumer_name(), custom_id=fake.uuid4())
+        other_consumer_ref = ConsumerReferenceFactory(username=fake.consumer_name(), custom_id=fake.uuid4())
+        logic.publish_consumer(self.client, consumer_ref)
+        logic.publish_consumer(self.client, other_consumer_ref)
+
+        # Remote credentials without a local reference
+        orphan_struct = self.client.consumers.basic_auth(consumer_ref.kong_id).create(
+            fake.user_name(), fake.password())
+        other_orphan_struct = self.client.consumers.basic_auth(other_consumer_ref.kong_id).create(
+            fake.user_name(), fake.password())
+
+        auth_ref = BasicAuthReferenceFactory(consumer=consumer_ref)
+
+        logic.publish_consumer(self.client, consumer_ref)
+
+        auth_ref = models.BasicAuthReference.objects.get(id=auth_ref.id)
+        self.assertTrue(auth_ref.synchronized)
+        self.assertIsNotNone(self.client.consumers.basic_auth(consumer_ref.kong_id).retrieve(auth_ref.kong_id))
+
+        # Only the orphans of the published consumer are removed
+        self.assertIsNone(self.client.consumers.basic_auth(consumer_ref.kong_id).retrieve(orphan_struct['id']))
+        self.assertIsNotNone(
+            self.client.consumers.basic_auth(other_consumer_ref.kong_id).retrieve(other_orphan_struct['id']))
+
+
+class RelatedFieldsTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def assertConstantQueries(self, create, synchronize, batches=(2, 3)):
+        """
+        Creates objects in batches, and asserts that synchronizing all objects takes the same number of SELECT
+        queries after every batch
+        """
+        counts = []
+        for size in batches:
+            for _ in range(size):
+                create()
+
+            with CaptureQueriesContext(connection) as context:
+                synchronize()
+            counts.append(len([query for query in context.captured_queries if 'SELECT ' in query['sql']]))
+
+        self.assertEqual(len(set(counts)), 1, 'SELECT queries per batch: %s' % counts)
+
+    def test_synchronize_plugin_configurations(self):
+        def create():
+            api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+            PluginConfigurationReferenceFactory(api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': 5})
+            logic.publish_api(self.client, api_ref)
+
+        self.assertConstantQueries(
+            create, lambda: logic.synchronize_plugin_configurations(self.client, incremental=False))
+
+    def test_synchronize_consumer_credentials(self):
+        def create():
+            consumer_ref = ConsumerReferenceFactory(username=fake.consumer_name(), custom_id=fake.uuid4())
+            BasicAuthReferenceFactory(consumer=consumer_ref)
+            logic.publish_consumer(self.client, consumer_ref)
+
+        self.assertConstantQueries(
+            create, lambda: get_consumer_sync_engine().basic_auth().synchronize(self.client, delete=True))
+
+
+class WriteBackTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        self.client = KongAdminSimulator()
+
+    def test_publish_writes_once(self):
+        api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name(), enabled=False)
+
+        with CaptureQueriesContext(connection) as context:
+            logic.publish_api(self.client, api_ref)
+
+        updates = [query['sql'] for query in context.captured_queries if 'UPDATE ' in query['sql']]
+        self.assertEqual(len(updates), 1)
+
+        api_ref = models.APIReference.objects.get(id=api_ref.id)
+        self.assertTrue(api_ref.enabled)
+        self.assertTrue(api_ref.synchronized)
+        self.assertIsNotNone(api_ref.synchronized_at)
+        self.assertEqual(text_type(api_ref.kong_id), self.client.apis.retrieve(api_ref.name)['id'])
+
+    def test_flush_per_batch(self):
+        api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+        plugin_refs = [PluginConfigurationReferenceFactory(
+            api=APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())) for _ in range(3)]
+        kong_ids = [uuid.uuid4() for _ in plugin_refs]
+
+        with writeback.buffered(batch_size=2) as buffer:
+            for plugin_ref, kong_id in zip(plugin_refs, kong_ids):
+                writeback.update(
+                    models.PluginConfigurationReference, plugin_ref.id, kong_id=kong_id, synchronized=True,
+                    config={'second': plugin_ref.id})
+
+            # The first two objects have been flushed
+            self.assertEqual(len(buffer), 1)
+            self.assertEqual(models.PluginConfigurationReference.objects.filter(synchronized=True).count(), 2)
+
+        for plugin_ref, kong_id in zip(plugin_refs, kong_ids):
+            plugin_ref = models.PluginConfigurationReference.objects.get(id=plugin_ref.id)
+            self.assertEqual(plugin_ref.kong_id, kong_id)
+            self.assertTrue(plugin_ref.synchronized)
+            self.assertEqual(plugin_ref.config, {'second': plugin_ref.id})
+
+        # Without an active buffer, updates are written immediately
+        writeback.update(models.APIReference, api_ref.id, enabled=False)
+        self.assertFalse(models.APIReference.objects.get(id=api_ref.id).enabled)
+
+
+class ExecutorTestCase(SimpleTestCase):
+    def test_bounded_concurrency(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'max_running': 0, 'done': []}
+
+        def func(item):
+            with lock:
+                state['running'] += 1
+                state['max_running'] = max(state['max_running'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+                state['done'].append(item)
+
+        execute(func, range(20), workers=4)
+
+        self.assertEqual(sorted(state['done']), list(range(20)))
+        self.assertLessEqual(state['max_running'], 4)
+        self.assertGreater(state['max_running'], 1)
+
+    def test_first_error_is_raised(self):
+        done = []
+
+        def func(item):
+            if item == 3:
+                raise ValueError('Item %d' % item)
+            done.append(item)
+
+        with self.assertRaises(ValueError):
+            execute(func, range(100), workers=4)
+
+        self.assertLess(len(done), 99)
+
+
+def can_share_test_db():
+    """
+    Whether the test database can be used from other threads. An in-memory SQLite database is private to a connection,
+    unless it can be opened as a shared (URI) database, which Python 2 does not support.
+    """
+    db = connections['default']
+    return db.vendor != 'sqlite' or not db.is_in_memory_db(db.settings_dict['NAME']) or \
+        db.features.can_share_in_memory_db
+
+
+class ThreadedSyncTestCase(TransactionTestCase):
+    """
+    Synchronizes on a pool of worker threads, which use database connections of their own. The objects are committed,
+    so the worker threads can see them.
+    """
+
+    def setUp(self):
+        # The name of the test database is only known once it has been created
+        if not can_share_test_db():
+            self.skipTest('The worker threads can not use the in-memory test database')
+
+        self.addCleanup(reset_circuit_breakers)
+        self.adapter = FakeKongAdapter()
+        self.provider = KongClientProvider('http://localhost:8001', adapter=self.adapter)
+        self.client = self.provider.get_client()
+
+        # The threads that synchronized objects, and the threads that closed their connection
+        self.publishing_threads = set()
+        self.closing_threads = []
+        lock = threading.Lock()
+
+        db_wrapper = type(connections['default'])
+        close = db_wrapper.close
+
+        def record_close(wrapper):
+            with lock:
+                self.closing_threads.append(threading.current_thread().name)
+            return close(wrapper)
+
+        patcher = mock.patch.object(db_wrapper, 'close', autospec=True, side_effect=record_close)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _record_thread(self, engine_class):
+        publish = engine_class._publish
+
+        def record_thread(engine, client, obj, *args, **kwargs):
+            self.publishing_threads.add(threading.current_thread().name)
+            return publish(engine, client, obj, *args, **kwargs)
+
+        return mock.patch.object(engine_class, '_publish', autospec=True, side_effect=record_thread)
+
+    def _assert_connections_closed(self):
+        main_thread = threading.current_thread().name
+        self.assertNotIn(main_thread, self.publishing_threads)
+        self.assertGreater(len(self.publishing_threads), 1)
+        for thread in self.publishing_threads:
+            self.assertEqual(self.closing_threads.count(thread), 1)
+
+    def test_synchronize_apis(self):
+        for i in range(8):
+            api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+            PluginConfigurationReferenceFactory(api=api_ref, plugin=Plugins.RATE_LIMITING, config={'second': i + 1})
+
+        with self._record_thread(get_api_sync_engine().__class__):
+            result = logic.synchronize_apis(self.client, workers=4, incremental=False)
+
+        self.assertEqual(result.published, 8)
+        self.assertEqual(self.adapter.fake.count('apis'), 8)
+        self.assertEqual(self.adapter.fake.count('plugins'), 8)
+        for model in (models.APIReference, models.PluginConfigurationReference):
+            self.assertFalse(model.objects.filter(synchronized=False).exists())
+            self.assertFalse(model.objects.filter(kong_id=None).exists())
+        self._assert_connections_closed()
+
+    def test_synchronize_consumers(self):
+        for _ in range(8):
+            consumer_ref = ConsumerReferenceFactory(username=fake.user_name(), custom_id=fake.uuid4())
+            BasicAuthReferenceFactory(consumer=consumer_ref, username=fake.user_name(), password=fake.password())
+
+        with self._record_thread(get_consumer_sync_engine().__class__):
+            result = logic.synchronize_consumers(self.client, workers=4, incremental=False)
+
+        self.assertEqual(result.published, 8)
+        self.assertEqual(self.adapter.fake.count('consumers'), 8)
+        self.assertEqual(self.adapter.fake.count('basicauth'), 8)
+        for model in (models.ConsumerReference, models.BasicAuthReference):
+            self.assertFalse(model.objects.filter(synchronized=False).exists())
+            self.assertFalse(model.objects.filter(kong_id=None).exists())
+        self._assert_connections_closed()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, print_function
+import io
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from benchmarks.seed import seed_apis, seed_consumers
+from kong_admin import logic
+from kong_admin.client import KongClientProvider
+from kong_admin.models import APIReference, PluginConfigurationReference
+from kong_admin.sync.retry import reset_circuit_breakers
+from kong_admin.testing.adapter import FakeKongAdapter
+from kong_admin.testing.trace import Trace, TraceEntry, RecordingAdapter, ReplayAdapter, get_template, diff, \
+    format_diff
+
+from .factories import APIReferenceFactory, PluginConfigurationReferenceFactory, ConsumerReferenceFactory, \
+    BasicAuthReferenceFactory, KeyAuthReferenceFactory, OAuth2ReferenceFactory
+from .fake import fake
+
+API_URL = 'http://localhost:8001'
+
+# The admin calls of the synchronizations in CheckedInTraceTestCase
+TRACE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces', 'synchronize.jsonl.gz')
+
+
+def get_client(adapter):
+    return KongClientProvider(API_URL, adapter=adapter).get_client()
+
+
+class TraceTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+        for _ in range(2):
+            api_ref = APIReferenceFactory(upstream_url=fake.url(), request_host=fake.domain_name())
+            PluginConfigurationReferenceFactory(api=api_ref)
+
+    def _record(self):
+        self.recorder = RecordingAdapter(FakeKongAdapter())
+        logic.synchronize_apis(get_client(self.recorder), workers=1)
+        return self.recorder.trace
+
+    def _reset(self):
+        for model in (APIReference, PluginConfigurationReference):
+            model.objects.update(kong_id=None, synchronized=False, synchronized_at=None, payload_hash=None)
+
+    def test_save_and_load(self):
+        trace = self._record()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        for name in ('trace.jsonl', 'trace.jsonl.gz'):
+            path = os.path.join(directory, name)
+            trace.save(path)
+            self.assertEqual(Trace.load(path).entries, [
+                entry._replace(started_at=round(entry.started_at, 4), duration=round(entry.duration, 4))
+                for entry in trace.entries])
+
+    def test_replay(self):
+        trace = self._record()
+        self._reset()
+
+        replay = ReplayAdapter(trace, latency_scale=0)
+        result = logic.synchronize_apis(get_client(replay), workers=1)
+
+        self.assertEqual(result.published, 2)
+        self.assertEqual(replay.diff(), [])
+
+        # The objects got the ids of the recorded responses
+        _, apis = self.recorder.adapter.fake.handle('GET', '/apis/')
+        self.assertEqual(set(str(kong_id) for kong_id in APIReference.objects.values_list('kong_id', flat=True)),
+                         set(api['id'] for api in apis['data']))
+
+    def test_not_recorded(self):
+        replay = ReplayAdapter(Trace(), latency_scale=0)
+
+        self.assertRaises(ValueError, get_client(replay).apis.retrieve, 'unknown')
+        self.assertEqual(replay.diff(), [('GET /apis/unknown/', 0, 1)])
+
+    def test_diff(self):
+        def entry(method, path):
+            return TraceEntry(0, 0, method, path, {}, 200, '{}')
+
+        recorded = Trace([entry('GET', '/apis/'), entry('GET', '/apis/%s/plugins/' % fake.uuid4())])
+        actual = Trace([entry('GET', '/apis/')] + [entry('GET', '/apis/%s/plugins/' % fake.uuid4()) for _ in range(3)])
+
+        differences = diff(recorded, actual)
+        self.assertEqual(differences, [('GET /apis/{id}/plugins/', 1, 3)])
+        self.assertEqual(format_diff(differences), 'GET /apis/{id}/plugins/: 3 calls, 1 recorded (+2)')
+
+    def test_secrets_are_redacted(self):
+        password, key, client_secret = fake.uuid4(), fake.uuid4(), fake.uuid4()
+        consumer_ref = ConsumerReferenceFactory(username=fake.consumer_name())
+        BasicAuthReferenceFactory(consumer=consumer_ref, password=password)
+        KeyAuthReferenceFactory(consumer=consumer_ref, key=key)
+        OAuth2ReferenceFactory(consumer=consumer_ref, client_secret=client_secret)
+
+        recorder = RecordingAdapter(FakeKongAdapter())
+        logic.publish_consumer(get_client(recorder), consumer_ref)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'trace.jsonl')
+        recorder.trace.save(path)
+
+        with io.open(path, encoding='utf-8') as f:
+            content = f.read()
+        self.assertIn('[redacted]', content)
+        for secret in (password, key, client_secret):
+            self.assertNotIn(secret, content)
+
+    def test_template(self):
+        self.assertEqual(get_template('GET', '/apis/0b9a1f8e-53c4-4dbf-a4b7-5e5b5f8a3c0d/plugins/?size=100'),
+                         'GET /apis/{id}/plugins/')
+
+
+class CheckedInTraceTestCase(TestCase):
+    """
+    Replays the admin calls of the synchronization of a fixed data set, recorded in TRACE_PATH. When a change alters
+    the admin calls of the sync engines (e.g. an additional GET per object), this test fails with the difference. If
+    the change is intended, record the trace again by running the test with KONG_ADMIN_RECORD_TRACES=1.
+    """
+
+    def setUp(self):
+        self.addCleanup(reset_circuit_breakers)
+
+    def test_synchronize(self):
+        seed_apis(3, 2)
+        seed_consumers(3, 3)
+
+        recording = bool(os.environ.get('KONG_ADMIN_RECORD_TRACES'))
+        if recording:
+            adapter = RecordingAdapter(FakeKongAdapter())
+        else:
+            adapter = ReplayAdapter(Trace.load(TRACE_PATH), latency_scale=0)
+        client = get_client(adapter)
+
+        # The second synchronization only publishes the changed objects, like 'manage.py kong_sync' does
+        for _ in range(2):
+            logic.synchronize_apis(client, workers=1, incremental=True)
+            logic.synchronize_consumers(client, workers=1, incremental=True)
+        logic.publish_api(client, APIReference.objects.order_by('id').first())
+
+        if recording:
+            adapter.trace.save(TRACE_PATH)
+        else:
+            differences = adapter.diff()
+            self.assertEqual(differences, [], 'The admin calls differ from %s:\n%s' % (
+                TRACE_PATH, format_diff(differences)))